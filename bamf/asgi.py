@@ -0,0 +1,29 @@
+"""
+ASGI config for bamf project.
+
+It exposes the ASGI callable as a module-level variable named ``application``,
+e.g. for ``uvicorn bamf.asgi:application``. Issue pages and covers are served
+by comics.asgi without tying up a worker while the archives are read. The rest
+of the site is the WSGI application, which is only served here if asgiref is
+installed; otherwise route the rest of the site to bamf.wsgi.
+"""
+
+import os
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:
+    WsgiToAsgi = None
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "bamf.settings")
+
+wsgi_application = get_wsgi_application()
+
+from comics.asgi import READ_WORKERS, ReaderApplication  # noqa: E402
+
+application = ReaderApplication(
+    WsgiToAsgi(wsgi_application) if WsgiToAsgi is not None else None,
+    workers=getattr(settings, 'ASGI_READ_WORKERS', READ_WORKERS))
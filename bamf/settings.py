@@ -143,8 +143,42 @@ HUEY = {
     'always_eager': False,
 }
 
+# Number of processes used to read the comic archives during an import.
+IMPORT_WORKERS = os.cpu_count() or 1
+
+# Number of concurrent requests made to Comic Vine, and the number of requests
+# allowed for each resource type (issue, volume, etc.) per hour.
+COMICVINE_WORKERS = 8
+COMICVINE_REQUESTS_PER_HOUR = 200
+
+# Comic Vine responses are kept here, so they don't need to be requested
+# again. With COMICVINE_OFFLINE only the stored responses are used.
+COMICVINE_CACHE_DIR = os.path.join(BASE_DIR, 'cv-cache')
+COMICVINE_OFFLINE = False
+
+# Number of Comic Vine images each task worker downloads at the same time.
+IMAGE_DOWNLOADS = 4
+
+# Seconds between checks for new series, characters, etc. to suggest while
+# a name is being typed.
+AUTOCOMPLETE_REFRESH_INTERVAL = 60
+
+# Number of pages read ahead of each reader, and the memory (in bytes) used to
+# keep them for all the readers. Each process serving pages has its own cache,
+# so at most PAGE_CACHE_SIZE times the number of processes is used.
+PAGE_PREFETCH = 4
+PAGE_CACHE_SIZE = 128 * 1024 * 1024
+
+# Pages scaled down to the size they are shown at are kept here, using at most
+# PAGE_RESIZE_CACHE_SIZE bytes.
+PAGE_RESIZE_CACHE_DIR = os.path.join(BASE_DIR, 'page-cache')
+PAGE_RESIZE_CACHE_SIZE = 1024 * 1024 * 1024
+
+# Number of threads reading pages when they are served by bamf.asgi.
+ASGI_READ_WORKERS = 8
+
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    'DEFAULT_PAGINATION_CLASS': 'comics.pagination.IdCursorPagination',
     'PAGE_SIZE': 100
 }
 
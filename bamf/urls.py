@@ -12,6 +12,7 @@ from comics.urls import (
     issue as issue_urls,
     publisher as publisher_urls,
     router as router_urls,
+    search as search_urls,
     series as series_urls,
     server_settings as settings_urls,
     team as team_urls,
@@ -32,6 +33,7 @@ urlpatterns = [
     path('publisher/', include(publisher_urls)),
     path('api/', include(router_urls)),
     path('api-auth/', include('rest_framework.urls')),
+    path('search/', include(search_urls)),
     path('series/', include(series_urls)),
     path('server-settings/', include(settings_urls)),
     path('team/', include(team_urls)),
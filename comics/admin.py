@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.utils import timezone
 
 from .models import (Arc, Character, Creator,
                      Issue, Publisher, Series,
@@ -116,14 +117,14 @@ class IssueAdmin(admin.ModelAdmin):
     raw_id_fields = ('arcs', 'characters', 'teams')
 
     def mark_as_read(self, request, queryset):
-        rows_updated = queryset.update(status=READ)
+        rows_updated = queryset.update(status=READ, modified=timezone.now())
         message_bit = create_msg(rows_updated)
         self.message_user(
             request, "%s successfully marked as read." % message_bit)
     mark_as_read.short_description = 'Mark selected issues as read'
 
     def mark_as_unread(self, request, queryset):
-        rows_updated = queryset.update(status=UNREAD)
+        rows_updated = queryset.update(status=UNREAD, modified=timezone.now())
         message_bit = create_msg(rows_updated)
         self.message_user(
             request, "%s successfully marked as unread." % message_bit)
@@ -169,7 +170,7 @@ class PublisherAdmin(admin.ModelAdmin):
 @admin.register(Series)
 class SeriesAdmin(admin.ModelAdmin):
     search_fields = ('name',)
-    list_display = ('name', 'year', 'issue_count')
+    list_display = ('name', 'year', 'issue_count', 'rating')
     list_filter = ('publisher',)
     readonly_fields = ('cvid', 'cvurl')
     actions = ['mark_as_read', 'mark_as_unread',
@@ -183,14 +184,14 @@ class SeriesAdmin(admin.ModelAdmin):
     )
 
     def get_queryset(self, request):
-        queryset = Series.objects.prefetch_related('issue_set')
+        queryset = Series.objects.with_counts()
         return queryset
 
     def mark_as_read(self, request, queryset):
         issues_count = 0
         for i in range(queryset.count()):
             issues_updated = Issue.objects.filter(
-                series=queryset[i]).update(status=READ)
+                series=queryset[i]).update(status=READ, modified=timezone.now())
             issues_count += issues_updated
         message_bit = create_msg(issues_count)
         self.message_user(
@@ -201,7 +202,7 @@ class SeriesAdmin(admin.ModelAdmin):
         issues_count = 0
         for i in range(queryset.count()):
             issues_updated = Issue.objects.filter(
-                series=queryset[i]).update(status=UNREAD)
+                series=queryset[i]).update(status=UNREAD, modified=timezone.now())
             issues_count += issues_updated
         message_bit = create_msg(issues_count)
         self.message_user(
@@ -1,8 +1,10 @@
 from django.apps import AppConfig
-from django.db.models.signals import pre_delete
+from django.db.models.signals import post_delete, post_save, pre_delete
 
-from comics.signals import (pre_delete_character, pre_delete_image,
-                            pre_delete_issue, pre_delete_publisher)
+from comics.signals import (post_delete_issue, post_delete_tombstone,
+                            post_save_rating, pre_delete_character,
+                            pre_delete_image, pre_delete_issue,
+                            pre_delete_publisher)
 
 
 class ComicsConfig(AppConfig):
@@ -32,3 +34,17 @@ class ComicsConfig(AppConfig):
         issue = self.get_model('Issue')
         pre_delete.connect(pre_delete_issue, sender=issue,
                            dispatch_uid='pre_delete_issue')
+        post_delete.connect(post_delete_issue, sender=issue,
+                            dispatch_uid='post_delete_issue')
+
+        for model_name in ('Arc', 'Character', 'Creator', 'Issue',
+                           'Publisher', 'Series', 'Team'):
+            post_delete.connect(post_delete_tombstone, sender=self.get_model(model_name),
+                                dispatch_uid='post_delete_tombstone_%s' % model_name.lower())
+
+        # Issue ratings are averaged into their series' rating.
+        from star_ratings.models import Rating
+        post_save.connect(post_save_rating, sender=Rating,
+                          dispatch_uid='post_save_rating')
+        post_delete.connect(post_save_rating, sender=Rating,
+                            dispatch_uid='post_delete_rating')
@@ -0,0 +1,232 @@
+'''
+Serves the pages and covers of issues over ASGI.
+
+Reading a page means decompressing it from its archive (or rendering it, for
+a PDF), which ties up a WSGI worker for as long as that takes. Here the reads
+and the database queries are run by a pool of ASGI_READ_WORKERS threads, so
+one process can stream pages to many readers at once while the rest of the
+site stays responsive. Everything else is passed on to the fallback
+application, normally Django's (see bamf.asgi).
+'''
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from importlib import import_module
+import logging
+import os
+import re
+from urllib.parse import parse_qsl, quote
+
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections
+from django.http import Http404, HttpRequest
+from django.http.cookie import parse_cookie
+from django.shortcuts import resolve_url
+from django.utils.http import parse_etags
+
+from comics.models import Issue
+from comics.utils import pageresize
+from comics.utils.reader import get_byte_range
+from comics.views.issue import (get_cover_etag, get_cover_file, get_page_etag,
+                                get_page_image)
+
+
+READ_WORKERS = 8
+
+# The size of each part of a response's body.
+CHUNK_SIZE = 64 * 1024
+
+PAGE_RE = re.compile(r'^/issue/(?P<slug>[-\w]+)/page/(?P<page>\d+)/$')
+COVER_RE = re.compile(r'^/issue/(?P<slug>[-\w]+)/cover/$')
+
+logger = logging.getLogger('bamf')
+
+
+def call(fn, *args):
+    # Like a Django request, don't hold on to a connection that has expired.
+    close_old_connections()
+    try:
+        return fn(*args)
+    finally:
+        close_old_connections()
+
+
+def get_user_id(cookie):
+    ''' Returns the id of the user logged in to the session in cookie, if any. '''
+    session_key = parse_cookie(cookie).get(settings.SESSION_COOKIE_NAME)
+    if not session_key:
+        return None
+
+    # Just enough of a request for the session and auth middleware's checks.
+    request = HttpRequest()
+    request.session = import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+    user = get_user(request)
+    if not user.is_authenticated:
+        return None
+
+    return user.pk
+
+
+def get_issue(slug, *fields):
+    try:
+        return Issue.objects.only(*fields).get(slug=slug)
+    except Issue.DoesNotExist:
+        raise Http404('Issue not found.')
+
+
+def load_page(user_id, slug, page, params, etags):
+    '''
+    Returns the ETag, data and content type of the page, with no data if the
+    client already has it.
+    '''
+    issue = get_issue(slug, 'file')
+    try:
+        st = os.stat(issue.file)
+    except OSError:
+        raise Http404('Comic archive not found.')
+
+    size = pageresize.get_target_size(params)
+    etag = get_page_etag(issue.file, st, page, size)
+    if etag in etags or '*' in etags:
+        return etag, None, None
+
+    data, content_type = get_page_image(user_id, issue, page, st, size)
+    return etag, data, content_type
+
+
+def load_cover(slug, size_name, accept, etags):
+    issue = get_issue(slug, 'cover')
+    path, content_type = get_cover_file(issue, size_name, accept)
+    etag = get_cover_etag(path)
+    if etag in etags or '*' in etags:
+        return etag, None, None
+
+    with open(path, 'rb') as f:
+        return etag, f.read(), content_type
+
+
+class ReaderApplication(object):
+    '''
+    An ASGI application for the issue page and cover views, which work like
+    the ones in comics.views.issue.
+    '''
+
+    def __init__(self, fallback=None, executor=None, workers=READ_WORKERS):
+        self.fallback = fallback
+        self.executor = executor or ThreadPoolExecutor(max_workers=workers)
+        self.routes = ((PAGE_RE, self.page), (COVER_RE, self.cover))
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+
+        if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+            for regex, handler in self.routes:
+                match = regex.match(scope['path'])
+                if match is None:
+                    continue
+                try:
+                    return await handler(scope, send, **match.groupdict())
+                except Http404:
+                    return await self.respond(scope, send, 404, b'Not Found')
+                except Exception:
+                    logger.exception('Error serving %s' % scope['path'])
+                    return await self.respond(scope, send, 500, b'Server Error')
+
+        if self.fallback is not None:
+            return await self.fallback(scope, receive, send)
+
+        if scope['type'] == 'http':
+            return await self.respond(scope, send, 404, b'Not Found')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def run(self, fn, *args):
+        ''' Runs fn in the executor, so that it doesn't block the event loop. '''
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(call, fn, *args))
+
+    async def page(self, scope, send, slug, page):
+        headers = get_headers(scope)
+        user_id = await self.run(get_user_id, headers.get('cookie', ''))
+        if user_id is None:
+            return await self.redirect_to_login(scope, send)
+
+        params = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+        etag, data, content_type = await self.run(
+            load_page, user_id, slug, int(page), params,
+            parse_etags(headers.get('if-none-match', '')))
+        await self.send_image(scope, send, headers, etag, data, content_type)
+
+    async def cover(self, scope, send, slug):
+        headers = get_headers(scope)
+        user_id = await self.run(get_user_id, headers.get('cookie', ''))
+        if user_id is None:
+            return await self.redirect_to_login(scope, send)
+
+        params = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+        etag, data, content_type = await self.run(
+            load_cover, slug, params.get('size', ''), headers.get('accept', ''),
+            parse_etags(headers.get('if-none-match', '')))
+        await self.send_image(scope, send, headers, etag, data, content_type,
+                              vary='Accept')
+
+    async def send_image(self, scope, send, headers, etag, data, content_type, vary=None):
+        response_headers = [(b'etag', etag.encode('latin-1')),
+                            (b'cache-control', b'private, max-age=86400')]
+        if vary is not None:
+            response_headers.append((b'vary', vary.encode('latin-1')))
+
+        if data is None:
+            return await self.respond(scope, send, 304, b'', response_headers)
+
+        size = len(data)
+        status = 200
+        try:
+            byte_range = get_byte_range(headers.get('range', ''), size)
+        except ValueError:
+            return await self.respond(scope, send, 416, b'',
+                                      [(b'content-range', b'bytes */%d' % size)])
+
+        if byte_range is not None:
+            start, end = byte_range
+            data = data[start:end + 1]
+            status = 206
+            response_headers.append((b'content-range',
+                                     b'bytes %d-%d/%d' % (start, end, size)))
+
+        response_headers += [(b'content-type', content_type.encode('latin-1')),
+                             (b'accept-ranges', b'bytes')]
+        await self.respond(scope, send, status, data, response_headers)
+
+    async def redirect_to_login(self, scope, send):
+        url = '%s?next=%s' % (resolve_url(settings.LOGIN_URL), quote(scope['path']))
+        await self.respond(scope, send, 302, b'', [(b'location', url.encode('latin-1'))])
+
+    async def respond(self, scope, send, status, body, headers=()):
+        headers = list(headers) + [(b'content-length', str(len(body)).encode('latin-1'))]
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        if scope['method'] == 'HEAD':
+            body = b''
+
+        # Large pages are sent in parts, so the server can start sending them
+        # before it has all of the body.
+        for i in range(0, len(body), CHUNK_SIZE):
+            await send({'type': 'http.response.body', 'body': body[i:i + CHUNK_SIZE],
+                        'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+
+def get_headers(scope):
+    return dict((name.decode('latin-1').lower(), value.decode('latin-1'))
+                for name, value in scope.get('headers', []))
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core import management
+
+from comics.utils import imagestore
+
+
+class Command(management.BaseCommand):
+    help = 'Deletes the images that no longer belong to anything.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='List the unused images without deleting them.')
+        parser.add_argument('--grace-period', type=int, default=imagestore.GRACE_PERIOD,
+                            help='Keep files newer than this many seconds.')
+
+    def handle(self, *args, **options):
+        removed = imagestore.collect_garbage(settings.MEDIA_ROOT,
+                                             grace_period=options['grace_period'],
+                                             dry_run=options['dry_run'])
+        for name in removed:
+            self.stdout.write(name)
+
+        if options['dry_run']:
+            self.stdout.write('Found %d unused files.' % len(removed))
+        else:
+            self.stdout.write('Deleted %d unused files.' % len(removed))
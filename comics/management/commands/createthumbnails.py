@@ -0,0 +1,29 @@
+import os
+
+from django.conf import settings
+from django.core import management
+
+from comics.utils import imagestore, thumbnails
+
+
+class Command(management.BaseCommand):
+    help = 'Creates any missing thumbnails for the existing images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int,
+                            default=getattr(settings, 'IMPORT_WORKERS', 1),
+                            help='Number of processes used to create the thumbnails.')
+
+    def handle(self, *args, **options):
+        pool = thumbnails.ThumbnailPool(settings.MEDIA_ROOT, options['workers'])
+        count = 0
+        for model, field in imagestore.get_image_fields():
+            names = model.objects.exclude(**{field: ''}).values_list(field, flat=True)
+            for name in names.distinct():
+                data = thumbnails.read_image(os.path.join(settings.MEDIA_ROOT, name))
+                if data is not None:
+                    pool.submit(data, name)
+                    count += 1
+
+        pool.wait()
+        self.stdout.write('Created thumbnails for %d images.' % count)
@@ -0,0 +1,13 @@
+from huey.contrib.djhuey.management.commands import run_huey
+
+from comics import tasks
+
+
+class Command(run_huey.Command):
+    help = 'Run the queue consumer, releasing any import lock left behind.'
+
+    def handle(self, *args, **options):
+        # No import can be running before the consumer starts, so a held lock
+        # belongs to a consumer that was killed during one.
+        tasks.release_import_lock()
+        super().handle(*args, **options)
@@ -0,0 +1,32 @@
+from django.core import management
+
+from comics.models import Settings
+from comics.tasks import import_comic_paths_task
+from comics.utils.watcher import ComicWatcher
+
+
+class Command(management.BaseCommand):
+    help = 'Watches the comics directory and imports any new or changed comics.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--settle', type=int, default=5,
+                            help='Seconds a file must be unchanged before it is imported.')
+        parser.add_argument('--poll', action='store_true',
+                            help='Poll the comics directory instead of using inotify.')
+        parser.add_argument('--poll-interval', type=int, default=30,
+                            help='Seconds between each poll of the comics directory.')
+
+    def handle(self, *args, **options):
+        directory = Settings.get_solo().comics_directory
+        if not directory:
+            raise management.CommandError(
+                'The comics directory has not been set.')
+
+        watcher = ComicWatcher(directory, import_comic_paths_task,
+                               settle=options['settle'],
+                               poll_interval=options['poll_interval'],
+                               use_polling=options['poll'])
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,26 @@
+# Generated by Django 2.1.2 on 2026-10-18 14:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comics', '0012_settings_plural_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComicFile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=300, unique=True, verbose_name='File Path')),
+                ('size', models.BigIntegerField(verbose_name='File Size')),
+                ('mtime', models.BigIntegerField(verbose_name='Modification Time (ns)')),
+                ('inode', models.BigIntegerField(verbose_name='Inode')),
+            ],
+            options={
+                'ordering': ['path'],
+            },
+        ),
+    ]
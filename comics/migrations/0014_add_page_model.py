@@ -0,0 +1,32 @@
+# Generated by Django 2.1.2 on 2026-10-18 14:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comics', '0013_add_comicfile_model'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Page',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveSmallIntegerField(verbose_name='Page Index')),
+                ('name', models.CharField(max_length=300, verbose_name='File Name')),
+                ('size', models.PositiveIntegerField(default=0, verbose_name='File Size')),
+                ('offset', models.BigIntegerField(blank=True, null=True, verbose_name='Header Offset')),
+                ('width', models.PositiveIntegerField(blank=True, null=True)),
+                ('height', models.PositiveIntegerField(blank=True, null=True)),
+                ('media_type', models.CharField(blank=True, max_length=25, verbose_name='Media Type')),
+                ('issue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='comics.Issue')),
+            ],
+            options={
+                'ordering': ['issue', 'index'],
+                'unique_together': {('issue', 'index')},
+            },
+        ),
+    ]
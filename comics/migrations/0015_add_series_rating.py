@@ -0,0 +1,48 @@
+# Generated by Django 2.1.2 on 2026-10-18 15:34
+
+from django.db import migrations, models
+from django.db.models import Avg
+
+
+def add_series_ratings(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Issue = apps.get_model('comics', 'Issue')
+    Rating = apps.get_model('star_ratings', 'Rating')
+    Series = apps.get_model('comics', 'Series')
+
+    issue_type = ContentType.objects.filter(app_label='comics', model='issue').first()
+    if issue_type is None:
+        return
+
+    for series in Series.objects.all():
+        rating = Rating.objects.filter(
+            content_type=issue_type,
+            object_id__in=Issue.objects.filter(series=series).values('pk')).exclude(
+            average=0).aggregate(Avg('average'))
+        series.rating = rating['average__avg']
+        series.save(update_fields=['rating'])
+
+
+def remove_series_ratings(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comics', '0014_add_page_model'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('star_ratings', '0003_auto_20160721_1127'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='series',
+            name='rating',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=3, editable=False, max_digits=6, null=True, verbose_name='Average Issue Rating'),
+        ),
+        migrations.RunPython(
+            add_series_ratings,
+            remove_series_ratings
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 2.1.2 on 2026-10-18 16:02
+
+from django.db import migrations
+
+
+# The search documents, which have to match comics.utils.search.get_document_sql
+# for the indexes to be used.
+NAME_DESC = "setweight(to_tsvector('simple', coalesce(\"name\", '')), 'A') || " \
+    "setweight(to_tsvector('simple', coalesce(\"desc\", '')), 'C')"
+ISSUE = "setweight(to_tsvector('simple', coalesce(\"name\", '')), 'A') || " \
+    "setweight(to_tsvector('simple', coalesce(\"number\", '')), 'B') || " \
+    "setweight(to_tsvector('simple', coalesce(\"desc\", '')), 'C')"
+
+DOCUMENTS = (
+    ('comics_arc', NAME_DESC),
+    ('comics_character', NAME_DESC),
+    ('comics_creator', NAME_DESC),
+    ('comics_issue', ISSUE),
+    ('comics_publisher', NAME_DESC),
+    ('comics_series', NAME_DESC),
+    ('comics_team', NAME_DESC),
+)
+
+
+def add_search_indexes(apps, schema_editor):
+    # The indexes only exist on PostgreSQL, other databases search without them.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, document in DOCUMENTS:
+        schema_editor.execute('CREATE INDEX %s_search ON %s USING gin ((%s))'
+                              % (table, table, document))
+        # Used by name__icontains, which is UPPER("name") LIKE UPPER(%s).
+        schema_editor.execute('CREATE INDEX %s_name_trgm ON %s USING gin (UPPER("name") gin_trgm_ops)'
+                              % (table, table))
+
+
+def remove_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for table, document in DOCUMENTS:
+        schema_editor.execute('DROP INDEX IF EXISTS %s_search' % table)
+        schema_editor.execute('DROP INDEX IF EXISTS %s_name_trgm' % table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comics', '0015_add_series_rating'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            add_search_indexes,
+            remove_search_indexes
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 2.1.2 on 2026-10-18 15:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comics', '0016_add_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=25)),
+                ('object_id', models.PositiveIntegerField()),
+                ('deleted', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Date Deleted')),
+            ],
+            options={
+                'ordering': ['deleted'],
+            },
+        ),
+        migrations.AddField(
+            model_name='arc',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Date Modified'),
+        ),
+        migrations.AddField(
+            model_name='character',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Date Modified'),
+        ),
+        migrations.AddField(
+            model_name='creator',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Date Modified'),
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Date Modified'),
+        ),
+        migrations.AddField(
+            model_name='publisher',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Date Modified'),
+        ),
+        migrations.AddField(
+            model_name='series',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Date Modified'),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Date Modified'),
+        ),
+    ]
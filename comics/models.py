@@ -1,9 +1,11 @@
 import datetime
 
+from django.contrib.contenttypes.models import ContentType
 from django.core.validators import RegexValidator
 from django.db import models
-from django.db.models import Avg
+from django.db.models import Avg, Count, OuterRef, Q, Subquery
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.functional import cached_property
 from solo.models import SingletonModel
 from star_ratings.models import Rating
@@ -48,6 +50,7 @@ class Arc(models.Model):
     desc = models.TextField('Description', max_length=500, blank=True)
     image = models.ImageField(upload_to='images/arcs/',
                               max_length=150, blank=True)
+    modified = models.DateTimeField('Date Modified', auto_now=True, db_index=True)
 
     def get_absolute_url(self):
         return reverse('arc:detail', args=[self.slug])
@@ -67,6 +70,7 @@ class Team(models.Model):
     desc = models.TextField('Description', max_length=500, blank=True)
     image = models.ImageField(
         upload_to='images/teams/', max_length=150, blank=True)
+    modified = models.DateTimeField('Date Modified', auto_now=True, db_index=True)
 
     def get_absolute_url(self):
         return reverse('team:detail', args=[self.slug])
@@ -87,6 +91,7 @@ class Character(models.Model):
     teams = models.ManyToManyField(Team, blank=True)
     image = models.ImageField(
         upload_to='images/characters/', max_length=150, blank=True)
+    modified = models.DateTimeField('Date Modified', auto_now=True, db_index=True)
 
     def get_absolute_url(self):
         return reverse('character:detail', args=[self.slug])
@@ -106,6 +111,7 @@ class Creator(models.Model):
     desc = models.TextField('Description', max_length=500, blank=True)
     image = models.ImageField(
         upload_to='images/creators/', max_length=150, blank=True)
+    modified = models.DateTimeField('Date Modified', auto_now=True, db_index=True)
 
     def get_absolute_url(self):
         return reverse('creator:detail', args=[self.slug])
@@ -117,6 +123,13 @@ class Creator(models.Model):
         ordering = ['name']
 
 
+class PublisherQuerySet(models.QuerySet):
+
+    def with_counts(self):
+        ''' Annotates each publisher with its number of series (num_series). '''
+        return self.annotate(num_series=Count('series'))
+
+
 class Publisher(models.Model):
     cvid = models.PositiveIntegerField('Comic Vine ID', null=True)
     cvurl = models.URLField('Comic Vine URL', max_length=200)
@@ -125,12 +138,18 @@ class Publisher(models.Model):
     desc = models.TextField('Description', max_length=500, blank=True)
     logo = models.ImageField(
         upload_to='images/publishers/', max_length=150, blank=True)
+    modified = models.DateTimeField('Date Modified', auto_now=True, db_index=True)
+
+    objects = PublisherQuerySet.as_manager()
 
     def get_absolute_url(self):
         return reverse('publisher:detail', args=[self.slug])
 
     def series_count(self):
+        if hasattr(self, 'num_series'):
+            return self.num_series
         return self.series_set.all().count()
+    series_count.admin_order_field = 'num_series'
 
     def __str__(self):
         return self.name
@@ -139,6 +158,32 @@ class Publisher(models.Model):
         ordering = ['name']
 
 
+class SeriesQuerySet(models.QuerySet):
+
+    def with_counts(self):
+        '''
+        Annotates each series with its number of issues (num_issues) and unread
+        issues (num_unread_issues), and the cover of its first issue
+        (first_cover), so that lists of series don't need a query per row.
+        '''
+        first_issue = Issue.objects.filter(series=OuterRef('pk')).order_by('date', 'number')
+        return self.annotate(
+            num_issues=Count('issue'),
+            num_unread_issues=Count('issue', filter=~Q(issue__status=2)),
+            first_cover=Subquery(first_issue.values('cover')[:1]))
+
+    def update_ratings(self):
+        ''' Recalculates the rating of each series from its issues' ratings. '''
+        issue_type = ContentType.objects.get_for_model(Issue)
+        for series in self:
+            rating = Rating.objects.filter(
+                content_type=issue_type,
+                object_id__in=series.issue_set.values('pk')).exclude(
+                average=0).aggregate(Avg('average'))
+            self.model.objects.filter(pk=series.pk).update(
+                rating=rating['average__avg'], modified=timezone.now())
+
+
 class Series(models.Model):
     YEAR_CHOICES = [(r, r)
                     for r in range(1837, datetime.date.today().year + 1)]
@@ -153,6 +198,12 @@ class Series(models.Model):
     year = models.PositiveSmallIntegerField(
         'year', choices=YEAR_CHOICES, default=datetime.datetime.now().year, blank=True)
     desc = models.TextField('Description', max_length=500, blank=True)
+    # The average rating of its rated issues, kept up to date by the signals.
+    rating = models.DecimalField('Average Issue Rating', max_digits=6, decimal_places=3,
+                                 null=True, blank=True, editable=False, db_index=True)
+    modified = models.DateTimeField('Date Modified', auto_now=True, db_index=True)
+
+    objects = SeriesQuerySet.as_manager()
 
     def get_absolute_url(self):
         return reverse('series:detail', args=[self.slug])
@@ -162,25 +213,18 @@ class Series(models.Model):
 
     @property
     def issue_count(self):
+        if hasattr(self, 'num_issues'):
+            return self.num_issues
         return self.issue_set.all().count()
 
     @cached_property
     def unread_issue_count(self):
+        if hasattr(self, 'num_unread_issues'):
+            return self.num_unread_issues
         if hasattr(self, '_prefetched_objects_cache') and 'issue' in self._prefetched_objects_cache:
             return len([x for x in self.issue_set.all() if x.status is not 2])
         return self.issue_set.exclude(status=2).count()
 
-    @property
-    def average_rating(self):
-        l = []
-        for issue in self.issue_set.all():
-            l.append(issue.id)
-
-        rating = Rating.objects.filter(object_id__in=l).exclude(
-            average=0).aggregate(Avg('average'))
-
-        return rating['average__avg']
-
     class Meta:
         verbose_name_plural = "Series"
         ordering = ['sort_title', 'year']
@@ -216,6 +260,7 @@ class Issue(models.Model):
     mod_ts = models.DateTimeField()
     import_date = models.DateTimeField('Date Imported',
                                        auto_now_add=True)
+    modified = models.DateTimeField('Date Modified', auto_now=True, db_index=True)
 
     def get_absolute_url(self):
         return reverse('issue:detail', args=[self.slug])
@@ -227,6 +272,37 @@ class Issue(models.Model):
         ordering = ['series__name', 'date', 'number']
 
 
+class Page(models.Model):
+    issue = models.ForeignKey(Issue, on_delete=models.CASCADE)
+    index = models.PositiveSmallIntegerField('Page Index')
+    name = models.CharField('File Name', max_length=300)
+    size = models.PositiveIntegerField('File Size', default=0)
+    offset = models.BigIntegerField('Header Offset', null=True, blank=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    media_type = models.CharField('Media Type', max_length=25, blank=True)
+
+    def __str__(self):
+        return str(self.issue) + ' - Page ' + str(self.index + 1)
+
+    class Meta:
+        unique_together = ('issue', 'index')
+        ordering = ['issue', 'index']
+
+
+class ComicFile(models.Model):
+    path = models.CharField('File Path', max_length=300, unique=True)
+    size = models.BigIntegerField('File Size')
+    mtime = models.BigIntegerField('Modification Time (ns)')
+    inode = models.BigIntegerField('Inode')
+
+    def __str__(self):
+        return self.path
+
+    class Meta:
+        ordering = ['path']
+
+
 class Role(models.Model):
     name = models.CharField(max_length=25)
 
@@ -245,3 +321,17 @@ class Roles(models.Model):
     class Meta:
         verbose_name_plural = "Roles"
         ordering = ['creator__name']
+
+
+class Tombstone(models.Model):
+    # Records deleted objects, so that clients syncing their copy of the
+    # catalog know to remove them.
+    model = models.CharField(max_length=25)
+    object_id = models.PositiveIntegerField()
+    deleted = models.DateTimeField('Date Deleted', auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return '%s %d' % (self.model, self.object_id)
+
+    class Meta:
+        ordering = ['deleted']
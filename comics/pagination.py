@@ -0,0 +1,34 @@
+from collections import OrderedDict
+
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class IdCursorPagination(CursorPagination):
+    '''
+    Pages through a list by its primary key, so that every page takes the
+    same time to fetch however far into the list it is, and rows added while
+    a client is paging don't move the others between pages.
+
+    The total number of rows is only counted when ?count=true is given.
+    '''
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ('1', 'true'):
+            self.count = queryset.count()
+        return super(IdCursorPagination, self).paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ])
+        if self.count is not None:
+            response['count'] = self.count
+        response['results'] = data
+        return Response(response)
@@ -22,21 +22,24 @@ class IssueSerializer(serializers.HyperlinkedModelSerializer):
 
 
 class PublisherSerializer(serializers.HyperlinkedModelSerializer):
+    series_count = serializers.ReadOnlyField()
 
     class Meta:
         model = Publisher
-        fields = ('slug', 'cvurl', 'name', 'desc', 'logo')
+        fields = ('slug', 'cvurl', 'name', 'desc', 'logo', 'series_count')
         lookup_field = 'slug'
 
 
 class SeriesSerializer(serializers.HyperlinkedModelSerializer):
     publisher = serializers.HyperlinkedRelatedField(
         many=False, read_only=True, view_name='api:publisher-detail', lookup_field='slug')
+    issue_count = serializers.ReadOnlyField()
+    unread_issue_count = serializers.ReadOnlyField()
 
     class Meta:
         model = Series
         fields = ('slug', 'cvurl', 'name', 'sort_title',
-                  'publisher', 'year', 'desc')
+                  'publisher', 'year', 'desc', 'issue_count', 'unread_issue_count')
         lookup_field = 'slug'
 
 
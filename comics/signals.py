@@ -1,12 +1,17 @@
 
+from django.apps import apps
+from django.conf import settings
+
+from comics.utils import imagestore
+
+
 def pre_delete_image(sender, instance, **kwargs):
-    if (instance.image):
-        instance.image.delete(False)
+    # The image is only deleted if no other object uses it.
+    imagestore.release(instance.image.name, settings.MEDIA_ROOT, references=1)
 
 
 def pre_delete_character(sender, instance, **kwargs):
-    if (instance.image):
-        instance.image.delete(False)
+    imagestore.release(instance.image.name, settings.MEDIA_ROOT, references=1)
 
     # Delete related team if this is the only
     # character related to that team.
@@ -16,13 +21,11 @@ def pre_delete_character(sender, instance, **kwargs):
 
 
 def pre_delete_publisher(sender, instance, **kwargs):
-    if (instance.logo):
-        instance.logo.delete(False)
+    imagestore.release(instance.logo.name, settings.MEDIA_ROOT, references=1)
 
 
 def pre_delete_issue(sender, instance, **kwargs):
-    if (instance.cover):
-        instance.cover.delete(False)
+    imagestore.release(instance.cover.name, settings.MEDIA_ROOT, references=1)
 
     # Delete related arc if this is the only
     # issue related to that arc.
@@ -41,3 +44,23 @@ def pre_delete_issue(sender, instance, **kwargs):
     for team in instance.teams.all():
         if team.issue_set.count() == 1:
             team.delete()
+
+
+def post_delete_issue(sender, instance, **kwargs):
+    Series = apps.get_model('comics', 'Series')
+    Series.objects.filter(pk=instance.series_id).update_ratings()
+
+
+def post_save_rating(sender, instance, **kwargs):
+    # Keep the rating of the issue's series up to date.
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Issue = apps.get_model('comics', 'Issue')
+    Series = apps.get_model('comics', 'Series')
+    if instance.content_type_id == ContentType.objects.get_for_model(Issue).pk:
+        Series.objects.filter(issue__pk=instance.object_id).update_ratings()
+
+
+def post_delete_tombstone(sender, instance, **kwargs):
+    # Remember the deletion for the clients that sync the catalog.
+    Tombstone = apps.get_model('comics', 'Tombstone')
+    Tombstone.objects.create(model=sender._meta.model_name, object_id=instance.pk)
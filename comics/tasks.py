@@ -1,12 +1,61 @@
-from huey.contrib.djhuey import task
+import logging
 
+from django.apps import apps
+from django.conf import settings
+from django.utils import timezone
+from huey import crontab
+from huey.contrib.djhuey import HUEY, periodic_task, task
+from huey.exceptions import TaskLockedException
+import requests
+
+from .utils import images, imagestore, pageresize
 from .utils.comicimporter import ComicImporter
 
 
+logger = logging.getLogger('bamf')
+
+# Only one import runs at a time, since two could both see the same new file
+# and import it twice. This is the name of the lock they share.
+IMPORT_LOCK = 'import-comics'
+
+# Seconds to wait before trying an import again while another is running.
+IMPORT_RETRY_DELAY = 30
+
+
+def release_import_lock():
+    '''
+    Releases the import lock. The lock never expires, so a consumer killed
+    during an import leaves it held, and run_huey releases it on startup.
+    '''
+    HUEY.lock_task(IMPORT_LOCK).__exit__(None, None, None)
+
+
+def defer_import(task, **kwargs):
+    logger.info('Another import is running, trying again in %d seconds.'
+                % IMPORT_RETRY_DELAY)
+    task.schedule(delay=IMPORT_RETRY_DELAY, **kwargs)
+
+
 @task()
 def import_comic_files_task():
-    ci = ComicImporter()
-    ci.import_comic_files()
+    try:
+        with HUEY.lock_task(IMPORT_LOCK):
+            ci = ComicImporter()
+            ci.import_comic_files()
+    except TaskLockedException:
+        defer_import(import_comic_files_task)
+
+    return
+
+
+@task()
+def import_comic_paths_task(paths):
+    try:
+        with HUEY.lock_task(IMPORT_LOCK):
+            ci = ComicImporter()
+            ci.import_comic_paths(paths)
+    except TaskLockedException:
+        defer_import(import_comic_paths_task, args=(paths,))
 
     return
 
@@ -65,3 +114,46 @@ def refresh_arc_task(cvid):
     success = ci.refreshArcData(cvid)
 
     return success
+
+
+@task()
+def download_image_task(model_name, pk, field, url, folder, attempt=0):
+    '''
+    Downloads the image at url and saves it to the field of the object, in
+    place of any image it had before. A failed download is scheduled to be
+    tried again later.
+    '''
+    try:
+        data = images.download_image(url)
+    except requests.exceptions.RequestException as e:
+        if attempt < images.RETRIES:
+            delay = images.get_retry_delay(attempt)
+            logger.warning('Retrying %s in %d seconds: %s' % (url, delay, e))
+            download_image_task.schedule(
+                args=(model_name, pk, field, url, folder, attempt + 1), delay=delay)
+        else:
+            logger.error('Unable to download %s: %s' % (url, e))
+        return False
+
+    try:
+        name = images.save_image(data, folder, settings.MEDIA_ROOT)
+    except (OSError, SyntaxError, ValueError) as e:
+        logger.error('Bad image %s: %s' % (url, e))
+        return False
+
+    model = apps.get_model('comics', model_name)
+    old_name = model.objects.filter(pk=pk).values_list(field, flat=True).first()
+    # A refresh that finds the same image has nothing to do.
+    if old_name is None or old_name == name:
+        return old_name is not None
+
+    model.objects.filter(pk=pk).update(**{field: name, 'modified': timezone.now()})
+    imagestore.release(old_name, settings.MEDIA_ROOT)
+
+    return True
+
+
+@periodic_task(crontab(minute='30'))
+def prune_page_cache_task():
+    pageresize.prune(pageresize.get_cache_dir(),
+                     getattr(settings, 'PAGE_RESIZE_CACHE_SIZE', pageresize.CACHE_SIZE))
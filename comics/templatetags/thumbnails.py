@@ -0,0 +1,36 @@
+from django import template
+from django.core.files.storage import default_storage
+
+from comics.utils import thumbnails
+
+
+register = template.Library()
+
+
+@register.inclusion_tag('comics/picture.html')
+def picture(image, alt, sizes='(max-width: 480px) 100vw, 16vw'):
+    '''
+    Renders an image field (or the name of an image, e.g. from an annotation)
+    as a <picture> with a srcset for each thumbnail format, so browsers only
+    download the size and format they can use. Images without thumbnails are
+    rendered as a plain <img>.
+    '''
+    name = getattr(image, 'name', image)
+    context = {'url': default_storage.url(name) if name else '', 'alt': alt,
+               'sizes': sizes, 'sources': [], 'srcset': ''}
+
+    if not name or not default_storage.exists(
+            thumbnails.get_thumbnail_name(name, thumbnails.GRID, thumbnails.JPEG)):
+        return context
+
+    for fmt in thumbnails.FORMATS:
+        srcset = ', '.join(
+            '%s %dw' % (default_storage.url(thumbnails.get_thumbnail_name(name, size, fmt)),
+                        size.width)
+            for size in thumbnails.SIZES)
+        if fmt is thumbnails.JPEG:
+            context['srcset'] = srcset
+        else:
+            context['sources'].append({'media_type': fmt.media_type, 'srcset': srcset})
+
+    return context
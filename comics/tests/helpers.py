@@ -0,0 +1,72 @@
+from concurrent.futures import Future
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from PIL import Image
+
+from comics.models import Issue, Publisher, Series
+
+
+def create_image(width, height, fmt='JPEG', mode='RGB'):
+    data = io.BytesIO()
+    Image.new(mode, (width, height), 'red').save(data, fmt)
+    return data.getvalue()
+
+
+class ImmediateExecutor(object):
+    ''' Runs each function as soon as it's submitted, in the caller's thread. '''
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class IssueArchiveTestCase(TestCase):
+    '''
+    Creates the issue batman-1, with an archive of one page for each size in
+    page_sizes, and the user brian, who is logged in for each test.
+    '''
+
+    page_sizes = ((20, 30),)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='brian')
+        cls.user.set_password('1234')
+        cls.user.save()
+
+        cls.directory = tempfile.mkdtemp()
+        cls.comic = os.path.join(cls.directory, 'batman-1.cbz')
+        cls.pages = cls.createPages()
+        with zipfile.ZipFile(cls.comic, 'w') as zf:
+            for i, data in enumerate(cls.pages):
+                zf.writestr('%02d.jpg' % i, data)
+
+        publisher = Publisher.objects.create(name='DC Comics', slug='dc-comics')
+        series = Series.objects.create(cvid='1234', name='Batman', slug='batman',
+                                       publisher=publisher)
+        cls.issue = Issue.objects.create(cvid='4321', cvurl='http://2.com', slug='batman-1',
+                                         file=cls.comic, mod_ts=timezone.now(),
+                                         date=timezone.now().date(), number='1', series=series)
+
+    @classmethod
+    def createPages(cls):
+        return [create_image(width, height) for width, height in cls.page_sizes]
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+        super(IssueArchiveTestCase, cls).tearDownClass()
+
+    def setUp(self):
+        self.client.login(username='brian', password='1234')
@@ -54,6 +54,21 @@ class GetAllIssueTest(TestCaseBase):
         resp = self.client.get(reverse('api:issue-list'))
         self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
 
+    def test_cursor_pagination(self):
+        resp = self.client.get(reverse('api:issue-list'), {'page_size': 1})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', resp.data)
+        self.assertEqual(resp.data['results'][0]['slug'], 'superman-1')
+
+        resp = self.client.get(resp.data['next'])
+        self.assertEqual(resp.data['results'][0]['slug'], 'batman-1')
+        self.assertIsNone(resp.data['next'])
+
+    def test_count(self):
+        resp = self.client.get(reverse('api:issue-list'), {'count': 'true'})
+        self.assertEqual(resp.data['count'], 2)
+        self.assertEqual(len(resp.data['results']), 2)
+
 
 class GetSingleIssueTest(TestCaseBase):
 
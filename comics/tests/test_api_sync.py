@@ -0,0 +1,95 @@
+import datetime
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from comics.models import (Character, Creator, Issue, Publisher,
+                           Role, Roles, Series, Team, Tombstone)
+
+
+issue_date = timezone.now().date()
+mod_time = timezone.now()
+
+
+class SyncTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username='brian')
+        user.set_password('1234')
+        user.save()
+
+        cls.publisher = Publisher.objects.create(name='DC Comics', slug='dc-comics')
+        cls.series = Series.objects.create(cvid=1, cvurl='http://1.com', name='Superman',
+                                           slug='superman', publisher=cls.publisher)
+        cls.issue = Issue.objects.create(cvid=1, cvurl='http://1.com', slug='superman-1',
+                                         file='/home/a.cbz', mod_ts=mod_time,
+                                         date=issue_date, number='1', series=cls.series,
+                                         cover='images/issues/a.jpg')
+        cls.team = Team.objects.create(cvid=1, name='Justice League', slug='justice-league')
+        cls.character = Character.objects.create(cvid=1, name='Superman', slug='superman')
+        cls.character.teams.add(cls.team)
+        cls.issue.characters.add(cls.character)
+        cls.creator = Creator.objects.create(cvid=1, name='John Byrne', slug='john-byrne')
+        roles = Roles.objects.create(creator=cls.creator, issue=cls.issue)
+        roles.role.add(Role.objects.create(name='Writer'), Role.objects.create(name='Artist'))
+
+    def setUp(self):
+        self.client.login(username='brian', password='1234')
+
+    def sync(self, since=None):
+        data = {'since': since} if since is not None else {}
+        resp = self.client.get(reverse('api:sync'), data)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp['Content-Type'], 'application/x-ndjson')
+        return [json.loads(line) for line in b''.join(resp.streaming_content).splitlines()]
+
+    def test_login_required(self):
+        self.client.logout()
+        resp = self.client.get(reverse('api:sync'))
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_bad_since(self):
+        resp = self.client.get(reverse('api:sync'), {'since': 'yesterday'})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_everything(self):
+        lines = self.sync()
+        self.assertEqual(lines[0]['type'], 'sync')
+        self.assertEqual([line['type'] for line in lines[1:]],
+                         ['publisher', 'series', 'team', 'character', 'creator', 'issue'])
+
+        series = lines[2]
+        self.assertEqual(series['id'], self.series.pk)
+        self.assertEqual(series['publisher'], self.publisher.pk)
+        self.assertEqual(lines[4]['teams'], [self.team.pk])
+
+        issue = lines[-1]
+        self.assertEqual(issue['series'], self.series.pk)
+        self.assertEqual(issue['cover'], '/media/images/issues/a.jpg')
+        self.assertEqual(issue['characters'], [self.character.pk])
+        self.assertEqual(issue['arcs'], [])
+        self.assertEqual(issue['credits'],
+                         [{'creator': self.creator.pk, 'roles': ['Artist', 'Writer']}])
+
+    def test_changes(self):
+        timestamp = self.sync()[0]['timestamp']
+        self.assertEqual(self.sync(timestamp)[1:], [])
+
+        self.series.desc = 'The Man of Steel.'
+        self.series.save()
+        Team.objects.get(pk=self.team.pk).delete()
+
+        lines = self.sync(timestamp)[1:]
+        self.assertEqual(lines[0], {'type': 'deleted', 'model': 'team', 'id': self.team.pk})
+        self.assertEqual([line['type'] for line in lines[1:]], ['series'])
+        self.assertEqual(lines[1]['desc'], 'The Man of Steel.')
+
+        # Deletions older than since aren't sent again.
+        Tombstone.objects.update(deleted=timezone.now() - datetime.timedelta(days=1))
+        Series.objects.update(modified=timezone.now() - datetime.timedelta(days=1))
+        self.assertEqual(self.sync(timestamp)[1:], [])
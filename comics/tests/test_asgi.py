@@ -0,0 +1,154 @@
+import asyncio
+import io
+import os
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import override_settings
+from PIL import Image
+
+from comics.asgi import CHUNK_SIZE, ReaderApplication
+from comics.utils import thumbnails
+
+from .helpers import ImmediateExecutor, IssueArchiveTestCase
+
+
+@mock.patch('comics.asgi.close_old_connections', mock.Mock())
+class TestReaderApplication(IssueArchiveTestCase):
+
+    @classmethod
+    def createPages(cls):
+        # A page big enough to be sent in several parts.
+        img = io.BytesIO()
+        Image.effect_noise((300, 400), 100).convert('RGB').save(img, format='JPEG')
+        return [img.getvalue()]
+
+    @classmethod
+    def setUpTestData(cls):
+        super(TestReaderApplication, cls).setUpTestData()
+        cls.image_data = cls.pages[0]
+        cls.media_root = os.path.join(cls.directory, 'media')
+        cls.issue.cover = thumbnails.get_image_name(cls.image_data, 'issues')
+        thumbnails.create_thumbnails(cls.image_data, cls.issue.cover.name, cls.media_root)
+        cls.issue.save()
+
+    def setUp(self):
+        super(TestReaderApplication, self).setUp()
+        self.cookie = '%s=%s' % (settings.SESSION_COOKIE_NAME,
+                                 self.client.cookies[settings.SESSION_COOKIE_NAME].value)
+        self.app = ReaderApplication(executor=ImmediateExecutor())
+
+    def request(self, path, headers=(), query_string=b'', method='GET'):
+        scope = {'type': 'http', 'method': method, 'path': path,
+                 'query_string': query_string,
+                 'headers': [(name.encode(), value.encode()) for name, value in headers]}
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self.app(scope, receive, send))
+        finally:
+            loop.close()
+
+        start = messages[0]
+        body = b''.join(message.get('body', b'') for message in messages[1:])
+        return start['status'], dict(start['headers']), body, messages
+
+    def test_page(self):
+        status, headers, body, messages = self.request('/issue/batman-1/page/0/',
+                                                       [('cookie', self.cookie)])
+        self.assertEqual(status, 200)
+        self.assertEqual(headers[b'content-type'], b'image/jpeg')
+        self.assertEqual(body, self.image_data)
+        self.assertEqual(len(messages) - 2, -(-len(self.image_data) // CHUNK_SIZE))
+
+        # The same ETag as the view, so either can serve the page.
+        resp = self.client.get('/issue/batman-1/page/0/')
+        self.assertEqual(headers[b'etag'], resp['ETag'].encode())
+
+        status, headers, body, messages = self.request(
+            '/issue/batman-1/page/0/', [('cookie', self.cookie),
+                                        ('if-none-match', resp['ETag'])])
+        self.assertEqual(status, 304)
+        self.assertEqual(body, b'')
+
+    def test_page_range(self):
+        status, headers, body, messages = self.request(
+            '/issue/batman-1/page/0/', [('cookie', self.cookie), ('range', 'bytes=0-9')])
+        self.assertEqual(status, 206)
+        self.assertEqual(body, self.image_data[:10])
+        self.assertEqual(headers[b'content-range'],
+                         b'bytes 0-9/%d' % len(self.image_data))
+
+    def test_missing_page(self):
+        status, headers, body, messages = self.request('/issue/batman-1/page/1/',
+                                                       [('cookie', self.cookie)])
+        self.assertEqual(status, 404)
+        status, headers, body, messages = self.request('/issue/superman-1/page/0/',
+                                                       [('cookie', self.cookie)])
+        self.assertEqual(status, 404)
+
+    def test_login_required(self):
+        status, headers, body, messages = self.request('/issue/batman-1/page/0/')
+        self.assertEqual(status, 302)
+        self.assertEqual(headers[b'location'],
+                         b'/accounts/login/?next=/issue/batman-1/page/0/')
+
+        status, headers, body, messages = self.request(
+            '/issue/batman-1/page/0/', [('cookie', settings.SESSION_COOKIE_NAME + '=bad')])
+        self.assertEqual(status, 302)
+
+    def test_password_changed(self):
+        # Changing the password logs out the user's other sessions.
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('5678')
+        user.save()
+        status, headers, body, messages = self.request('/issue/batman-1/page/0/',
+                                                       [('cookie', self.cookie)])
+        self.assertEqual(status, 302)
+        self.assertFalse(self.client.session.exists(self.client.session.session_key))
+
+    def test_cover(self):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            status, headers, body, messages = self.request(
+                '/issue/batman-1/cover/', [('cookie', self.cookie)])
+            self.assertEqual(status, 200)
+            self.assertEqual(headers[b'content-type'], b'image/jpeg')
+            with open(os.path.join(self.media_root, self.issue.cover.name), 'rb') as f:
+                self.assertEqual(body, f.read())
+
+            resp = self.client.get('/issue/batman-1/cover/')
+            self.assertEqual(b''.join(resp.streaming_content), body)
+            self.assertEqual(resp['ETag'].encode(), headers[b'etag'])
+
+            if thumbnails.WEBP in thumbnails.FORMATS:
+                status, headers, body, messages = self.request(
+                    '/issue/batman-1/cover/', [('cookie', self.cookie),
+                                               ('accept', 'image/webp,*/*')],
+                    query_string=b'size=grid')
+                self.assertEqual(headers[b'content-type'], b'image/webp')
+                self.assertEqual(Image.open(io.BytesIO(body)).size,
+                                 (thumbnails.GRID.width, thumbnails.GRID.height))
+
+    def test_head(self):
+        status, headers, body, messages = self.request(
+            '/issue/batman-1/page/0/', [('cookie', self.cookie)], method='HEAD')
+        self.assertEqual(status, 200)
+        self.assertEqual(headers[b'content-length'], str(len(self.image_data)).encode())
+        self.assertEqual(body, b'')
+
+    def test_fallback(self):
+        async def fallback(scope, receive, send):
+            await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+            await send({'type': 'http.response.body', 'body': b'django'})
+
+        self.app.fallback = fallback
+        status, headers, body, messages = self.request('/series/page1/')
+        self.assertEqual(body, b'django')
@@ -1,9 +1,16 @@
+import io
 import os
+import shutil
+import tempfile
+from unittest import mock
+import zipfile
 
 from django.conf import settings
 from django.test import SimpleTestCase
+from PIL import Image
 
-from comics.utils.comicapi.comicarchive import ComicArchive
+from comics.utils.comicapi import comicarchive, sevenzipcache
+from comics.utils.comicapi.comicarchive import ComicArchive, ZipArchiver
 
 TEST_DATA = settings.BASE_DIR + os.sep + \
     'comics/fixtures/Captain Atom #078 (1965).cbz'
@@ -55,3 +62,175 @@ class TestComicArchive(SimpleTestCase):
         ca = ComicArchive(TEST_DATA)
         md = ca.readCIX()
         self.assertIsNotNone(md)
+
+
+class TestComicArchivePageInfo(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'comic.cbz')
+        img = io.BytesIO()
+        Image.new('RGB', (20, 30)).save(img, format='PNG')
+        self.image_data = img.getvalue()
+        with zipfile.ZipFile(self.path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr('ComicInfo.xml', '<ComicInfo></ComicInfo>')
+            zf.writestr('10.png', self.image_data)
+            zf.writestr('9.png', self.image_data)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_get_page_info_list(self):
+        ca = ComicArchive(self.path)
+        page_info = ca.getPageInfoList()
+        self.assertEqual([p['name'] for p in page_info], ['9.png', '10.png'])
+        self.assertEqual(page_info[0]['size'], len(self.image_data))
+        self.assertEqual(page_info[0]['width'], 20)
+        self.assertEqual(page_info[0]['height'], 30)
+        self.assertEqual(page_info[0]['media_type'], 'image/png')
+
+    def test_read_archive_file_at(self):
+        page = ComicArchive(self.path).getPageInfoList()[1]
+        archiver = ZipArchiver(self.path)
+        data = archiver.readArchiveFileAt(
+            page['name'], page['offset'], page['size'])
+        self.assertEqual(data, self.image_data)
+
+    def test_read_archive_file_at_wrong_offset(self):
+        page = ComicArchive(self.path).getPageInfoList()[1]
+        archiver = ZipArchiver(self.path)
+        data = archiver.readArchiveFileAt(page['name'], 0, page['size'])
+        self.assertEqual(data, self.image_data)
+
+
+class FakeInfo(object):
+
+    def __init__(self, filename, directory=False, size=6):
+        self.filename = filename
+        self.is_directory = directory
+        self.uncompressed = size
+
+    def isdir(self):
+        return self.is_directory
+
+
+class FakeRarFile(object):
+    # Stands in for rarfile.RarFile, which needs unrar to read anything.
+    files = {'02.jpg': b'page 2', '01.jpg': b'page 1'}
+
+    def __init__(self, path, mode='r'):
+        self.comment = None
+
+    def infolist(self):
+        return [FakeInfo('scans', True)] + [FakeInfo(name) for name in self.files]
+
+    def read(self, name):
+        return self.files[name]
+
+    def close(self):
+        pass
+
+
+class FakeSevenZipFile(FakeRarFile):
+    files = {'01.jpg': b'page 1', '02.jpg': b'page 2', '03.jpg': b'page 3'}
+    opened = 0
+    reads = []
+
+    def __init__(self, path, mode='r'):
+        super().__init__(path, mode)
+        FakeSevenZipFile.opened += 1
+
+    def list(self):
+        return self.infolist()
+
+    def reset(self):
+        pass
+
+    def read(self, targets):
+        self.reads.append(targets)
+        return dict((name, io.BytesIO(self.files[name])) for name in targets)
+
+
+class TestOtherArchives(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'batman-1.cbr')
+        with open(self.path, 'wb') as f:
+            f.write(b'Rar!\x1a\x07\x00')
+        comicarchive.rar_cache.clear()
+        comicarchive.sevenzip_cache.clear()
+        FakeSevenZipFile.opened = 0
+        FakeSevenZipFile.reads = []
+
+    def tearDown(self):
+        comicarchive.rar_cache.clear()
+        comicarchive.sevenzip_cache.clear()
+        shutil.rmtree(self.directory)
+
+    def test_folder(self):
+        folder = os.path.join(self.directory, 'batman-2')
+        os.makedirs(os.path.join(folder, 'scans'))
+        for name, data in (('02.jpg', b'page 2'), ('scans/01.jpg', b'page 1')):
+            with open(os.path.join(folder, name), 'wb') as f:
+                f.write(data)
+
+        ca = ComicArchive(folder)
+        self.assertTrue(ca.isFolder())
+        self.assertTrue(ca.seemsToBeAComicArchive())
+        self.assertEqual(ca.getPageNameList(), ['02.jpg', 'scans/01.jpg'])
+        self.assertEqual(ca.getPage(1), b'page 1')
+        self.assertFalse(ca.hasCBI())
+        with self.assertRaises(IOError):
+            ca.archiver.readArchiveFile('03.jpg')
+
+    def test_rar(self):
+        rarfile = mock.Mock(RarFile=FakeRarFile)
+        rarfile.is_rarfile.return_value = True
+        with mock.patch.object(comicarchive, 'rarfile', rarfile):
+            ca = ComicArchive(self.path)
+            self.assertTrue(ca.isRar())
+            self.assertFalse(ca.isWritable())
+            self.assertTrue(ca.seemsToBeAComicArchive())
+            self.assertEqual(ca.getPageNameList(), ['01.jpg', '02.jpg'])
+            self.assertEqual(ca.getPage(1), b'page 2')
+            self.assertFalse(ca.hasCIX())
+            self.assertFalse(ca.hasCBI())
+
+    def test_rar_without_rarfile(self):
+        with mock.patch.object(comicarchive, 'rarfile', None):
+            ca = ComicArchive(self.path)
+            self.assertFalse(ca.isRar())
+            self.assertFalse(ca.seemsToBeAComicArchive())
+
+    def test_seven_zip(self):
+        py7zr = mock.Mock(SevenZipFile=FakeSevenZipFile)
+        py7zr.is_7zfile.return_value = True
+        with mock.patch.object(comicarchive, 'py7zr', py7zr), \
+                mock.patch.object(comicarchive, 'rarfile', None):
+            ca = ComicArchive(self.path)
+            self.assertTrue(ca.isSevenZip())
+            self.assertTrue(ca.seemsToBeAComicArchive())
+            self.assertEqual(ca.getNumberOfPages(), 3)
+            self.assertEqual(ca.getPage(0), b'page 1')
+            self.assertEqual(ca.getPage(1), b'page 2')
+            self.assertEqual(ca.getPage(2), b'page 3')
+            with self.assertRaises(IOError):
+                ca.archiver.readArchiveFile('04.jpg')
+
+        # The archive was only opened once, and the pages after the first
+        # were read along with it.
+        self.assertEqual(FakeSevenZipFile.opened, 1)
+        self.assertEqual(FakeSevenZipFile.reads, [['01.jpg', '02.jpg', '03.jpg']])
+
+    def test_seven_zip_read_ahead(self):
+        cache = sevenzipcache.SevenZipFileCache(FakeSevenZipFile, read_ahead=6,
+                                                max_file_memory=12)
+        self.assertEqual(cache.readFile(self.path, '02.jpg'), b'page 2')
+        self.assertEqual(cache.readFile(self.path, '03.jpg'), b'page 3')
+        self.assertEqual(cache.readFile(self.path, '01.jpg'), b'page 1')
+        self.assertEqual(FakeSevenZipFile.reads, [['02.jpg', '03.jpg'], ['01.jpg', '02.jpg']])
+
+        # Only the most recently used max_file_memory bytes are kept.
+        self.assertEqual([key[-1] for key in cache.files], ['03.jpg', '01.jpg'])
+        cache.clear()
@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+from PIL import Image
+
+from comics.utils.comicapi import pdfcache
+from comics.utils.comicapi.comicarchive import ComicArchive
+
+
+class FakeDocument(list):
+
+    def close(self):
+        self.closed = True
+
+
+class TestPdfDocumentCache(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'batman-1.pdf')
+        pages = [Image.new('RGB', (60, 90), color) for color in ('red', 'green', 'blue')]
+        pages[0].save(self.path, 'PDF', save_all=True, append_images=pages[1:])
+        self.cache = pdfcache.PdfDocumentCache(max_page_memory=10)
+
+    def tearDown(self):
+        self.cache.clear()
+        shutil.rmtree(self.directory)
+
+    @mock.patch.object(pdfcache, 'fitz', None)
+    def test_page_count(self):
+        with mock.patch.object(pdfcache, 'PdfFileReader',
+                               wraps=pdfcache.PdfFileReader) as reader:
+            self.assertEqual(self.cache.getPageCount(self.path), 3)
+            self.assertEqual(self.cache.getPageCount(self.path), 3)
+        self.assertEqual(reader.call_count, 1)
+
+        # The count is read again when the file changes.
+        with open(self.path, 'ab') as f:
+            f.write(b'\n')
+        with mock.patch.object(pdfcache, 'PdfFileReader') as reader:
+            reader.return_value.getNumPages.return_value = 4
+            self.assertEqual(self.cache.getPageCount(self.path), 4)
+
+    @mock.patch.object(pdfcache, 'fitz', None)
+    @mock.patch('subprocess.check_output')
+    def test_render_with_mudraw(self, check_output):
+        check_output.return_value = b'page 2'
+        self.assertEqual(self.cache.renderPage(self.path, 1), b'page 2')
+        self.assertEqual(self.cache.renderPage(self.path, 1), b'page 2')
+        check_output.assert_called_once_with(
+            ['mudraw', '-r', str(pdfcache.DPI), '-o', '-', self.path, '2'])
+
+        # Pages can be rendered to fit the size they're shown at.
+        self.cache.renderPage(self.path, 1, (640, None))
+        check_output.assert_called_with(
+            ['mudraw', '-w', '640', '-o', '-', self.path, '2'])
+
+    def test_zoom(self):
+        self.assertEqual(pdfcache.get_zoom(600, 800, None), pdfcache.DPI / 72.0)
+        self.assertEqual(pdfcache.get_zoom(600, 800, (1200, None)), 2)
+        self.assertEqual(pdfcache.get_zoom(600, 800, (1200, 800)), 1)
+
+    def test_render_with_pymupdf(self):
+        fitz = mock.Mock()
+        fitz.open.return_value = FakeDocument(['page 1', 'page 2', 'page 3'])
+        with mock.patch.object(pdfcache, 'fitz', fitz), \
+                mock.patch.object(pdfcache, 'render') as render:
+            render.side_effect = lambda doc, index, size: doc[index].encode()
+            self.assertEqual(self.cache.renderPage(self.path, 0), b'page 1')
+            self.assertEqual(self.cache.renderPage(self.path, 2, (300, None)), b'page 3')
+            self.assertEqual(self.cache.getPageCount(self.path), 3)
+            with self.assertRaises(IOError):
+                self.cache.renderPage(self.path, 3)
+
+        # The document was only opened once, and stays open.
+        fitz.open.assert_called_once_with(self.path)
+        render.assert_any_call(fitz.open.return_value, 2, (300, None))
+
+        # Only the pages that fit in max_page_memory are kept.
+        self.assertEqual(list(self.cache.pages), [self.cache.getKey(self.path) + (2, (300, None))])
+
+    @mock.patch.object(pdfcache, 'fitz', None)
+    @mock.patch('subprocess.check_output')
+    def test_comic_archive(self, check_output):
+        check_output.return_value = b'page 1'
+        ca = ComicArchive(self.path)
+        self.assertTrue(ca.isPdf())
+        self.assertTrue(ca.seemsToBeAComicArchive())
+        self.assertEqual(ca.getNumberOfPages(), 3)
+        self.assertEqual(ca.getPage(0), b'page 1')
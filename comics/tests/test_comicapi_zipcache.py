@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import zipfile
+
+from django.test import SimpleTestCase
+
+from comics.utils.comicapi.zipcache import ZipFileCache
+
+
+class TestZipFileCache(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.paths = []
+        for num in range(3):
+            path = os.path.join(self.directory, '%s.cbz' % num)
+            with zipfile.ZipFile(path, 'w') as zf:
+                zf.writestr('01.jpg', 'page %s' % num)
+            self.paths.append(path)
+        self.cache = ZipFileCache(max_handles=2)
+
+    def tearDown(self):
+        self.cache.clear()
+        shutil.rmtree(self.directory)
+
+    def test_reuses_handle(self):
+        with self.cache.checkout(self.paths[0]) as zf:
+            first = zf
+        with self.cache.checkout(self.paths[0]) as zf:
+            self.assertIs(zf, first)
+            self.assertEqual(zf.read('01.jpg'), b'page 0')
+
+    def test_invalidated_when_file_changes(self):
+        with self.cache.checkout(self.paths[0]) as zf:
+            first = zf
+        with zipfile.ZipFile(self.paths[0], 'a') as zf:
+            zf.writestr('02.jpg', 'new page')
+        with self.cache.checkout(self.paths[0]) as zf:
+            self.assertIsNot(zf, first)
+            self.assertEqual(zf.namelist(), ['01.jpg', '02.jpg'])
+        self.assertIsNone(first.fp)
+
+    def test_evicts_least_recently_used(self):
+        for path in self.paths:
+            with self.cache.checkout(path):
+                pass
+        self.assertEqual(list(self.cache.entries), self.paths[1:])
+
+    def test_evicts_by_memory(self):
+        cache = ZipFileCache(max_memory=1)
+        for path in self.paths:
+            with cache.checkout(path):
+                pass
+        self.assertEqual(list(cache.entries), self.paths[2:])
+        cache.clear()
+
+    def test_checked_out_handle_not_closed(self):
+        with self.cache.checkout(self.paths[0]) as zf:
+            self.cache.invalidate(self.paths[0])
+            self.assertEqual(zf.read('01.jpg'), b'page 0')
+        self.assertIsNone(zf.fp)
+
+    def test_is_zip_file(self):
+        not_zip = os.path.join(self.directory, 'notes.txt')
+        with open(not_zip, 'w') as f:
+            f.write('Not a zip file')
+        self.assertTrue(self.cache.isZipFile(self.paths[0]))
+        self.assertFalse(self.cache.isZipFile(not_zip))
+        self.assertFalse(self.cache.isZipFile(
+            os.path.join(self.directory, 'missing.cbz')))
@@ -0,0 +1,175 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.test import TestCase
+
+from comics.utils.comicvine import (ComicVineSession, OfflineError, RateLimiter,
+                                    ResponseStore, TokenBucket)
+
+from .helpers import ImmediateExecutor
+
+
+class TestTokenBucket(TestCase):
+
+    def test_burst(self):
+        bucket = TokenBucket(rate=1000, capacity=3)
+        start = time.monotonic()
+        for _ in range(3):
+            bucket.acquire()
+        self.assertLess(time.monotonic() - start, 0.1)
+
+    def test_waits_for_refill(self):
+        bucket = TokenBucket(rate=20, capacity=1)
+        bucket.acquire()
+        start = time.monotonic()
+        bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+
+
+class TestRateLimiter(TestCase):
+
+    def test_resource(self):
+        limiter = RateLimiter(200)
+        self.assertEqual(limiter.getResource(
+            'https://comicvine.gamespot.com/api/issue/4000-1234/'), 'issue')
+        self.assertEqual(limiter.getResource(
+            'https://comicvine.gamespot.com/api/volume/4050-1/'), 'volume')
+
+
+class TestComicVineSession(TestCase):
+
+    def setUp(self):
+        self.cv = ComicVineSession(workers=4)
+        self.calls = []
+        self.release = threading.Event()
+
+        def request(url, params, headers, refresh=False):
+            self.calls.append(url)
+            self.release.wait(5)
+            return {'url': url, 'params': params}
+
+        self.cv.request = request
+
+    def test_coalesces_identical_requests(self):
+        params = {'field_list': 'id'}
+        first = self.cv.fetch('http://example.com/a', params)
+        second = self.cv.fetch('http://example.com/a', dict(params))
+        self.release.set()
+        self.assertIs(first, second)
+        self.assertEqual(first.result()['url'], 'http://example.com/a')
+        self.assertEqual(len(self.calls), 1)
+
+    def test_different_params(self):
+        first = self.cv.fetch('http://example.com/a', {'field_list': 'id'})
+        second = self.cv.fetch('http://example.com/a', {'field_list': 'name'})
+        self.release.set()
+        self.assertIsNot(first, second)
+        first.result()
+        second.result()
+        self.assertEqual(len(self.calls), 2)
+
+    def test_finished_request(self):
+        self.cv.executor = ImmediateExecutor()
+        self.release.set()
+        future = self.cv.fetch('http://example.com/a', {'field_list': 'id'})
+        self.assertEqual(future.result()['url'], 'http://example.com/a')
+        self.assertEqual(self.cv.in_flight, {})
+
+
+class FakeResponse(object):
+
+    def __init__(self, data, status_code=200, headers=None):
+        self.data = data
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def json(self):
+        return self.data
+
+
+class TestResponseStore(TestCase):
+
+    url = 'https://comicvine.gamespot.com/api/issue/4000-1234/'
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = ResponseStore(self.directory)
+        self.cv = ComicVineSession(workers=1, store=self.store)
+        self.downloads = []
+        self.responses = []
+
+        def download(url, params, headers):
+            self.downloads.append((url, params, headers))
+            return self.responses.pop(0)
+
+        self.cv.download = download
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def respond(self, results, **kwargs):
+        self.responses.append(FakeResponse({'status_code': 1, 'results': results},
+                                           **kwargs))
+
+    def test_key(self):
+        self.assertEqual(self.store.getKey(self.url), ('issue', '1234'))
+        self.assertIsNone(self.store.getKey('https://comicvine.gamespot.com/api/search/'))
+
+    def test_stored_response(self):
+        self.respond({'id': 1234, 'name': 'Batman'})
+        first = self.cv.get(self.url, {'field_list': 'id,name'})
+        second = self.cv.get(self.url, {'field_list': 'name'})
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.downloads), 1)
+        self.assertTrue(os.path.exists(
+            os.path.join(self.directory, 'issue', '1234.json')))
+
+    def test_merges_fields(self):
+        self.respond({'id': 1234, 'name': 'Batman'})
+        self.respond({'id': 1234, 'deck': 'The Dark Knight'})
+        self.cv.get(self.url, {'field_list': 'id,name'})
+        self.cv.get(self.url, {'field_list': 'id,deck'})
+        response = self.cv.get(self.url, {'field_list': 'deck,name'})
+        self.assertEqual(response['results']['name'], 'Batman')
+        self.assertEqual(response['results']['deck'], 'The Dark Knight')
+        self.assertEqual(len(self.downloads), 2)
+
+    def test_revalidates_expired_response(self):
+        self.respond({'id': 1234, 'name': 'Batman'}, headers={'ETag': '"abc"'})
+        self.cv.get(self.url, {'field_list': 'name'})
+
+        self.store.ttls['issue'] = 0
+        self.responses.append(FakeResponse(None, status_code=304))
+        response = self.cv.get(self.url, {'field_list': 'name'})
+        self.assertEqual(response['results']['name'], 'Batman')
+        self.assertEqual(self.downloads[1][2]['If-None-Match'], '"abc"')
+
+    def test_refresh(self):
+        self.respond({'id': 1234, 'name': 'Batman'})
+        self.respond({'id': 1234, 'name': 'Batman Begins'})
+        self.cv.get(self.url, {'field_list': 'name'})
+        response = self.cv.get(self.url, {'field_list': 'name'}, refresh=True)
+        self.assertEqual(response['results']['name'], 'Batman Begins')
+        self.assertEqual(len(self.downloads), 2)
+
+    def test_offline(self):
+        self.respond({'id': 1234, 'name': 'Batman'})
+        self.cv.get(self.url, {'field_list': 'name'})
+
+        self.store.offline = True
+        self.store.ttls['issue'] = 0
+        response = self.cv.get(self.url, {'field_list': 'name'})
+        self.assertEqual(response['results']['name'], 'Batman')
+        self.assertRaises(OfflineError, self.cv.get,
+                          'https://comicvine.gamespot.com/api/issue/4000-1/', {})
+        self.assertEqual(len(self.downloads), 1)
+
+    def test_errors_are_not_stored(self):
+        self.responses.append(FakeResponse({'status_code': 100, 'error': 'Invalid API Key'}))
+        self.respond({'id': 1234, 'name': 'Batman'})
+        self.cv.get(self.url, {'field_list': 'name'})
+        self.cv.get(self.url, {'field_list': 'name'})
+        self.assertEqual(len(self.downloads), 2)
@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase
+
+from comics.models import ComicFile
+from comics.utils.fileindex import (ADDED, MODIFIED, REMOVED, FileState,
+                                    diff_file_index, get_file_states,
+                                    get_folder_comic, get_path_states,
+                                    load_file_index, update_file_index)
+
+
+class TestFileIndex(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.directory, 'Batman'))
+        self.paths = []
+        for name in ('a.cbz', 'b.cbz', os.path.join('Batman', 'c.cbz')):
+            path = os.path.join(self.directory, name)
+            with open(path, 'w') as f:
+                f.write(name)
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_get_file_states(self):
+        states = get_file_states(self.directory)
+        self.assertEqual(sorted(states), sorted(self.paths))
+        self.assertEqual(states[self.paths[0]].size, len('a.cbz'))
+
+    def test_get_file_states_missing_directory(self):
+        states = get_file_states(os.path.join(self.directory, 'missing'))
+        self.assertEqual(states, {})
+
+    def test_diff_file_index(self):
+        indexed = {
+            '/a.cbz': FileState(1, 1, 1),
+            '/b.cbz': FileState(1, 1, 2),
+            '/c.cbz': FileState(1, 1, 3),
+        }
+        current = {
+            '/a.cbz': FileState(1, 1, 1),
+            '/b.cbz': FileState(2, 2, 2),
+            '/d.cbz': FileState(1, 1, 4),
+        }
+        changes = sorted(diff_file_index(indexed, current))
+        self.assertEqual(changes, [(ADDED, '/d.cbz'),
+                                   (MODIFIED, '/b.cbz'),
+                                   (REMOVED, '/c.cbz')])
+
+    def test_diff_file_index_no_changes(self):
+        current = get_file_states(self.directory)
+        update_file_index(current, current.keys(), [])
+        changes = list(diff_file_index(load_file_index(), current))
+        self.assertEqual(changes, [])
+
+    def test_update_file_index(self):
+        current = get_file_states(self.directory)
+        update_file_index(current, current.keys(), [])
+        self.assertEqual(ComicFile.objects.count(), 3)
+
+        os.remove(self.paths[0])
+        with open(self.paths[1], 'a') as f:
+            f.write('modified')
+        current = get_file_states(self.directory)
+        changes = dict((path, change) for change, path in
+                       diff_file_index(load_file_index(), current))
+        self.assertEqual(changes, {self.paths[0]: REMOVED,
+                                   self.paths[1]: MODIFIED})
+
+        update_file_index(current, [self.paths[1]], [self.paths[0]])
+        self.assertEqual(load_file_index(), current)
+
+    def create_folder_comic(self):
+        folder = os.path.join(self.directory, 'Batman', 'batman-2')
+        os.makedirs(os.path.join(folder, 'scans'))
+        for name in ('01.jpg', os.path.join('scans', '02.jpg')):
+            with open(os.path.join(folder, name), 'wb') as f:
+                f.write(b'page')
+        return folder
+
+    def test_folder_comic(self):
+        folder = self.create_folder_comic()
+        states = get_file_states(self.directory)
+        self.assertEqual(sorted(states), sorted(self.paths + [folder]))
+        self.assertEqual(states[folder].size, 8)
+
+        # Changing any of its pages changes the folder.
+        with open(os.path.join(folder, 'scans', '02.jpg'), 'ab') as f:
+            f.write(b'more')
+        self.assertEqual(get_path_states([folder])[folder].size, 12)
+
+    def test_get_folder_comic(self):
+        folder = self.create_folder_comic()
+        page = os.path.join(folder, 'scans', '02.jpg')
+        self.assertEqual(get_folder_comic(page, self.directory), folder)
+        self.assertEqual(get_folder_comic(os.path.join(folder, 'scans'), self.directory),
+                         folder)
+        # Even once the page is gone.
+        os.remove(page)
+        self.assertEqual(get_folder_comic(page, self.directory), folder)
+
+        # A directory with comic archives in it isn't a folder comic.
+        self.assertIsNone(get_folder_comic(self.paths[2], self.directory))
+        self.assertIsNone(get_folder_comic(self.directory, self.directory))
+
+    def test_image_next_to_archives(self):
+        # A logo next to a directory of comics doesn't make it a folder comic.
+        logo = os.path.join(self.directory, 'Batman', 'logo.png')
+        with open(logo, 'wb') as f:
+            f.write(b'logo')
+        nested = os.path.join(self.directory, 'DC')
+        os.makedirs(os.path.join(nested, 'Batman'))
+        with open(os.path.join(nested, 'logo.png'), 'wb') as f:
+            f.write(b'logo')
+        comic = os.path.join(nested, 'Batman', 'Batman 001.cbz')
+        with open(comic, 'w') as f:
+            f.write('comic')
+
+        states = get_file_states(self.directory)
+        self.assertIn(self.paths[2], states)
+        self.assertIn(comic, states)
+        self.assertNotIn(nested, states)
+        self.assertIsNone(get_folder_comic(comic, self.directory))
+        self.assertEqual(sorted(get_path_states([nested])),
+                         sorted([comic, os.path.join(nested, 'logo.png')]))
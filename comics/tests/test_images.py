@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+import requests
+
+from comics.models import Character
+from comics.tasks import download_image_task
+from comics.utils import images
+
+from .helpers import create_image
+
+
+class TestDownloadImage(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.character = Character.objects.create(cvid=1, name='Superman',
+                                                  slug='superman')
+        self.url = 'https://comicvine.gamespot.com/api/image/superman.jpg'
+
+    def tearDown(self):
+        shutil.rmtree(self.media_root)
+
+    def download(self, attempt=0):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            return download_image_task.call_local(
+                'character', self.character.pk, 'image', self.url, 'characters', attempt)
+
+    @mock.patch.object(images, 'download_image')
+    def test_download(self, download_image):
+        download_image.return_value = create_image(400, 600)
+        self.assertTrue(self.download())
+        download_image.assert_called_once_with(self.url)
+
+        self.character.refresh_from_db()
+        self.assertTrue(self.character.image.name.startswith('images/characters/'))
+        self.assertTrue(os.path.exists(os.path.join(self.media_root,
+                                                    self.character.image.name)))
+
+    @mock.patch.object(download_image_task, 'schedule')
+    @mock.patch.object(images, 'download_image')
+    def test_retry(self, download_image, schedule):
+        download_image.side_effect = requests.exceptions.ConnectionError()
+        self.assertFalse(self.download(attempt=1))
+
+        args = ('character', self.character.pk, 'image', self.url, 'characters', 2)
+        schedule.assert_called_once_with(args=args, delay=images.get_retry_delay(1))
+
+        schedule.reset_mock()
+        self.assertFalse(self.download(attempt=images.RETRIES))
+        schedule.assert_not_called()
+
+    @mock.patch.object(download_image_task, 'schedule')
+    @mock.patch.object(images, 'download_image')
+    def test_bad_image(self, download_image, schedule):
+        download_image.return_value = b'<html>Not Found</html>'
+        self.assertFalse(self.download())
+        schedule.assert_not_called()
+
+        self.character.refresh_from_db()
+        self.assertFalse(self.character.image)
+        self.assertEqual(os.listdir(self.media_root), [])
+
+    @mock.patch('comics.tasks.imagestore.release')
+    @mock.patch.object(images, 'download_image')
+    def test_refresh(self, download_image, release):
+        download_image.return_value = create_image(400, 600)
+        self.assertTrue(self.download())
+        self.character.refresh_from_db()
+        name = self.character.image.name
+
+        # The same image again changes nothing.
+        release.reset_mock()
+        self.assertTrue(self.download())
+        release.assert_not_called()
+
+        download_image.return_value = create_image(300, 600)
+        self.assertTrue(self.download())
+        self.character.refresh_from_db()
+        self.assertNotEqual(self.character.image.name, name)
+        release.assert_called_once_with(name, self.media_root)
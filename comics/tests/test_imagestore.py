@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.test import TestCase, override_settings
+
+from comics.models import Arc, Character
+from comics.utils import imagestore, thumbnails
+
+from .helpers import create_image
+
+
+class TestImageStore(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.name = self.saveImage(create_image(400, 600), 'characters')
+
+    def tearDown(self):
+        shutil.rmtree(self.media_root)
+
+    def saveImage(self, data, folder):
+        name = thumbnails.get_image_name(data, folder)
+        thumbnails.create_thumbnails(data, name, self.media_root)
+        return name
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(self.media_root, name))
+
+    def test_name_includes_transform(self):
+        data = create_image(10, 10)
+        name = thumbnails.get_image_name(data, 'issues')
+        transform = thumbnails.TRANSFORM
+        try:
+            thumbnails.TRANSFORM = b'other'
+            self.assertNotEqual(name, thumbnails.get_image_name(data, 'issues'))
+        finally:
+            thumbnails.TRANSFORM = transform
+
+    def test_release_shared_image(self):
+        superman = Character.objects.create(cvid=1, name='Superman', slug='superman',
+                                            image=self.name)
+        Character.objects.create(cvid=2, name='Clark Kent', slug='clark-kent',
+                                 image=self.name)
+        self.assertEqual(imagestore.count_references(self.name), 2)
+
+        with override_settings(MEDIA_ROOT=self.media_root):
+            superman.delete()
+            self.assertTrue(self.exists(self.name))
+
+            Character.objects.get(cvid=2).delete()
+            for name in thumbnails.get_thumbnail_names(self.name):
+                self.assertFalse(self.exists(name))
+
+    def test_collect_garbage(self):
+        Arc.objects.create(cvid=1, name='Blackest Night', slug='blackest-night',
+                           image=self.name)
+        unused = self.saveImage(create_image(300, 300), 'arcs')
+        download = os.path.join(self.media_root, 'images', 'superman.jpg')
+        with open(download, 'wb') as f:
+            f.write(create_image(10, 10))
+
+        # New files might still be waiting for their object to be saved.
+        self.assertEqual(imagestore.collect_garbage(self.media_root), [])
+
+        old = time.time() - imagestore.GRACE_PERIOD - 1
+        for root, dirs, files in os.walk(self.media_root):
+            for filename in files:
+                os.utime(os.path.join(root, filename), (old, old))
+
+        removed = imagestore.collect_garbage(self.media_root, dry_run=True)
+        self.assertIn(unused, removed)
+        self.assertIn('images/superman.jpg', removed)
+        self.assertTrue(self.exists(unused))
+
+        self.assertEqual(sorted(imagestore.collect_garbage(self.media_root)), sorted(removed))
+        self.assertFalse(self.exists(unused))
+        self.assertFalse(os.path.exists(download))
+        for name in thumbnails.get_thumbnail_names(self.name):
+            if os.path.splitext(name)[1] in [fmt.ext for fmt in thumbnails.FORMATS]:
+                self.assertTrue(self.exists(name))
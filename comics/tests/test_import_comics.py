@@ -1,5 +1,6 @@
 from datetime import datetime
 import os
+from unittest import mock
 
 from django.conf import settings
 from django.test import TestCase
@@ -7,7 +8,7 @@ from django.utils import timezone
 
 from comics.models import (Settings, Issue, Publisher,
                            Creator, Series, Team, Arc,
-                           Character)
+                           Character, Role, Roles)
 from comics.utils.comicimporter import ComicImporter
 
 
@@ -115,3 +116,64 @@ class TestImportComics(TestCase):
         self.assertEqual(str(issue), 'Captain Atom #078')
         self.assertEqual(issue.date, datetime.date(cover_date))
         self.assertTrue(issue.cover)
+
+
+class TestAddCredits(TestCase):
+
+    def setUp(self):
+        self.ci = ComicImporter()
+        # Don't go to Comic Vine for the details of the new credits.
+        self.ci.getDetailInfo = mock.Mock(return_value=False)
+        self.ci.getTeamCharacters = mock.Mock(return_value={
+            'results': {'characters': [{'id': 1}, {'id': 2}]}})
+
+        self.series = Series.objects.create(cvid=1, name='Batman', slug='batman')
+        self.robin = Character.objects.create(cvid=1, name='Robin', slug='robin')
+        self.issues = [
+            Issue.objects.create(series=self.series, cvid=cvid, slug='batman-%d' % cvid,
+                                 mod_ts=timezone.now(), date=timezone.now().date(),
+                                 number=str(cvid))
+            for cvid in (1, 2)]
+
+    def credit(self, cvid, name, **kwargs):
+        kwargs.update({'id': cvid, 'name': name, 'api_detail_url': 'url-%d' % cvid})
+        return kwargs
+
+    def test_add_credits(self):
+        results = {
+            'character_credits': [self.credit(1, 'Robin'), self.credit(2, 'Robin')],
+            'story_arc_credits': [self.credit(3, 'Knightfall')],
+            'team_credits': [self.credit(4, 'Outsiders')],
+            'person_credits': [self.credit(5, 'Chuck Dixon', role='writer, penciler')],
+        }
+        other = dict(results, person_credits=[self.credit(5, 'Chuck Dixon', role='writer')])
+        self.ci.addCredits([(self.issues[0], results), (self.issues[1], other)])
+
+        self.assertEqual(Character.objects.count(), 2)
+        new_robin = Character.objects.get(cvid=2)
+        self.assertEqual(new_robin.slug, 'robin-1')
+        self.assertEqual(self.issues[0].characters.count(), 2)
+        self.assertEqual(self.issues[1].arcs.get().name, 'Knightfall')
+
+        team = Team.objects.get(cvid=4)
+        self.assertEqual(set(team.character_set.all()), {self.robin, new_robin})
+
+        creator = Creator.objects.get(cvid=5)
+        roles = Roles.objects.get(issue=self.issues[0], creator=creator)
+        self.assertEqual(set(roles.role.values_list('name', flat=True)),
+                         {'Writer', 'Penciler'})
+        self.assertEqual(Role.objects.filter(name='Writer').count(), 1)
+        self.assertEqual(Roles.objects.filter(creator=creator).count(), 2)
+
+    def test_existing_credits(self):
+        results = {
+            'character_credits': [self.credit(1, 'Robin')],
+            'story_arc_credits': [],
+            'team_credits': [],
+            'person_credits': [],
+        }
+        self.ci.addCredits([(self.issues[0], results)])
+
+        self.assertEqual(Character.objects.count(), 1)
+        self.assertEqual(list(self.issues[0].characters.all()), [self.robin])
+        self.ci.getDetailInfo.assert_not_called()
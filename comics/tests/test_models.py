@@ -2,9 +2,11 @@ import os
 
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
 from django.test import TestCase
 from django.utils import timezone
 from django.utils.text import slugify
+from star_ratings.models import Rating
 
 from comics.models import (Publisher, Arc, Team, Character,
                            Creator, Series, Issue, Settings)
@@ -97,6 +99,11 @@ class PublisherTest(TestCaseBase):
     def test_series_count(self):
         self.assertEqual(self.publisher.series_count(), 1)
 
+    def test_series_count_annotation(self):
+        publisher = Publisher.objects.with_counts().get(pk=self.publisher.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(publisher.series_count(), 1)
+
     def test_publisher_creation(self):
         self.assertTrue(isinstance(self.publisher, Publisher))
         self.assertEqual(str(self.publisher), self.name)
@@ -273,6 +280,29 @@ class SeriesTest(TestCaseBase):
         issue_count = self.series.issue_count
         self.assertEqual(issue_count, 10)
 
+    def test_count_annotations(self):
+        series = Series.objects.with_counts().get(pk=self.series.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(series.issue_count, 10)
+            self.assertEqual(series.unread_issue_count, 9)
+        self.assertEqual(series.first_cover, '')
+
+    def test_rating(self):
+        user = User.objects.get(username='brian')
+        issues = list(self.series.issue_set.all())
+        Rating.objects.rate(issues[0], 4, user=user)
+        Rating.objects.rate(issues[1], 2, user=user)
+        # Ratings of other objects with the same id aren't the issue's.
+        Rating.objects.create(content_type=ContentType.objects.get_for_model(Publisher),
+                              object_id=issues[0].pk, average=5)
+
+        self.series.refresh_from_db()
+        self.assertEqual(self.series.rating, 3)
+
+        issues[1].delete()
+        self.series.refresh_from_db()
+        self.assertEqual(self.series.rating, 4)
+
     def test_absolute_url(self):
         resp = self.client.get(self.series.get_absolute_url())
         self.assertEqual(resp.status_code, HTML_OK_CODE)
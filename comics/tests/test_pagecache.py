@@ -0,0 +1,129 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from comics.utils import pagecache, pageresize
+
+from .helpers import ImmediateExecutor, IssueArchiveTestCase
+
+
+class TestPageCache(TestCase):
+
+    def setUp(self):
+        self.cache = pagecache.PageCache(cache_size=10, executor=ImmediateExecutor())
+
+    def test_put(self):
+        self.cache.put(1, 'a', b'12345', 'image/jpeg')
+        self.assertEqual(self.cache.get(1, 'a'), (b'12345', 'image/jpeg'))
+        self.assertIsNone(self.cache.get(1, 'b'))
+        self.assertIsNone(self.cache.get(2, 'a'))
+
+        # Pages too big for the cache aren't kept.
+        self.cache.put(1, 'b', b'12345678901', 'image/jpeg')
+        self.assertIsNone(self.cache.get(1, 'b'))
+
+    def test_size(self):
+        self.cache.put(1, 'a', b'1234', 'image/jpeg')
+        self.cache.put(1, 'b', b'1234', 'image/jpeg')
+        self.cache.get(1, 'a')
+        self.cache.put(1, 'c', b'1234', 'image/jpeg')
+
+        # The least recently used page goes first.
+        self.assertIsNone(self.cache.get(1, 'b'))
+        self.assertIsNotNone(self.cache.get(1, 'a'))
+        self.assertEqual(self.cache.size, 8)
+
+    def test_users(self):
+        self.cache.put(1, 'a', b'1234', 'image/jpeg')
+        self.cache.put(2, 'a', b'5678', 'image/jpeg')
+        self.assertEqual(self.cache.get(2, 'a'), (b'5678', 'image/jpeg'))
+        self.cache.get(1, 'a')
+
+        # All the users share the same budget.
+        self.cache.put(3, 'a', b'9012', 'image/jpeg')
+        self.assertIsNone(self.cache.get(2, 'a'))
+        self.assertIsNotNone(self.cache.get(1, 'a'))
+        self.assertEqual(self.cache.size, 8)
+
+
+class TestPrefetch(IssueArchiveTestCase):
+
+    page_sizes = [(200 + i, 300) for i in range(8)]
+
+    def setUp(self):
+        super(TestPrefetch, self).setUp()
+        self.cache = pagecache.PageCache(prefetch=2, executor=ImmediateExecutor())
+        patcher = mock.patch.object(pagecache, '_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user_id = self.user.pk
+
+    def cached(self, size=None):
+        st = os.stat(self.comic)
+        return [index for index in range(len(self.pages))
+                if self.cache.get(self.user_id,
+                                  pagecache.get_page_key(self.comic, st, index, size))]
+
+    def test_page(self):
+        resp = self.client.get(reverse('issue:page', args=(self.issue.slug, 0)))
+        self.assertEqual(resp.content, self.pages[0])
+        self.assertEqual(self.cached(), [1, 2])
+
+        # The next page comes from the cache.
+        with mock.patch('comics.views.issue.read_page') as read_page:
+            resp = self.client.get(reverse('issue:page', args=(self.issue.slug, 1)))
+        read_page.assert_not_called()
+        self.assertEqual(resp.content, self.pages[1])
+        self.assertEqual(resp['Content-Type'], 'image/jpeg')
+        self.assertEqual(self.cached(), [1, 2, 3])
+
+    def test_resized_page(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        url = reverse('issue:page', args=(self.issue.slug, 0))
+        with override_settings(PAGE_RESIZE_CACHE_DIR=cache_dir):
+            self.client.get(url, {'w': '64'})
+
+            # The next pages are scaled down in the background, and saved for
+            # the page view.
+            self.assertEqual(self.cached(), [])
+            self.assertEqual(self.cached((64, None)), [1, 2])
+            st = os.stat(self.comic)
+            cached = self.cache.get(self.user_id,
+                                    pagecache.get_page_key(self.comic, st, 1, (64, None)))
+            with mock.patch('comics.views.issue.read_page') as read_page:
+                resp = self.client.get(reverse('issue:page', args=(self.issue.slug, 1)),
+                                       {'w': '64'})
+            read_page.assert_not_called()
+
+        self.assertEqual(resp.content, cached[0])
+        self.assertEqual(resp['Content-Type'], pageresize.FORMAT.media_type)
+        self.assertEqual(Image.open(io.BytesIO(resp.content)).size, (64, 96))
+        # Pages 0 to 3 have been scaled down.
+        self.assertEqual(sum(len(files) for root, dirs, files in os.walk(cache_dir)), 4)
+
+    def test_update_status(self):
+        # Make the page index.
+        self.client.get(reverse('issue:page', args=(self.issue.slug, 0)))
+
+        url = reverse('issue:update_issue_status', args=(self.issue.slug,))
+        self.client.get(url, {'leaf': 5})
+        self.assertEqual(self.cached(), [1, 2, 5, 6])
+
+        # The reader sends the size it shows the pages at.
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        with override_settings(PAGE_RESIZE_CACHE_DIR=cache_dir):
+            self.client.get(url, {'leaf': 3, 'w': '64'})
+        self.assertEqual(self.cached((64, None)), [3, 4])
+
+    def test_end_of_issue(self):
+        resp = self.client.get(reverse('issue:page', args=(self.issue.slug, 7)))
+        self.assertEqual(resp.content, self.pages[7])
+        self.assertEqual(self.cached(), [])
@@ -0,0 +1,147 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from comics.models import Issue, Page
+from comics.utils import pagecache, pageresize
+from comics.utils.reader import ImageAPIHandler
+
+from .helpers import ImmediateExecutor, IssueArchiveTestCase, create_image
+
+
+class TestTargetSize(TestCase):
+
+    def test_size(self):
+        self.assertIsNone(pageresize.get_target_size({}))
+        self.assertEqual(pageresize.get_target_size({'w': '600'}), (640, None))
+        self.assertEqual(pageresize.get_target_size({'h': '640', 'dpr': '2'}), (None, 1280))
+        self.assertEqual(pageresize.get_target_size({'w': '100000'}),
+                         (pageresize.MAX_SIZE, None))
+
+    def test_bad_size(self):
+        self.assertIsNone(pageresize.get_target_size({'w': 'wide', 'h': '-5'}))
+        self.assertEqual(pageresize.get_target_size({'w': '64', 'dpr': 'nan'}), (64, None))
+        self.assertEqual(pageresize.get_target_size({'w': '64', 'dpr': '100'}),
+                         (64 * pageresize.MAX_DPR, None))
+
+
+class TestResize(TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_scale(self):
+        img = pageresize.scale(create_image(2000, 3000), 640, None)
+        self.assertEqual(img.size, (640, 960))
+        img = pageresize.scale(create_image(2000, 3000), 640, 640)
+        self.assertEqual(img.size, (427, 640))
+        self.assertIsNone(pageresize.scale(create_image(200, 300), 640, None))
+
+    def test_resized_page(self):
+        data = create_image(2000, 3000)
+        read = mock.Mock(return_value=(data, 'image/jpeg'))
+        key = ('/comics/a.cbz', 1, 2, 0)
+        resized, content_type = pageresize.get_resized_page(key, (640, None), read,
+                                                            self.cache_dir)
+        self.assertEqual(content_type, pageresize.FORMAT.media_type)
+        self.assertEqual(Image.open(io.BytesIO(resized)).size, (640, 960))
+
+        # The second time it comes from the cache.
+        read.reset_mock()
+        self.assertEqual(pageresize.get_resized_page(key, (640, None), read, self.cache_dir),
+                         (resized, content_type))
+        read.assert_not_called()
+
+        # Small pages are left alone.
+        read.return_value = (create_image(200, 300), 'image/jpeg')
+        self.assertEqual(pageresize.get_resized_page(key, (1280, None), read, self.cache_dir),
+                         read.return_value)
+
+    def test_prune(self):
+        for i in range(4):
+            path = os.path.join(self.cache_dir, '%d.webp' % i)
+            with open(path, 'wb') as f:
+                f.write(b'x' * 100)
+            os.utime(path, (i, i))
+
+        self.assertEqual(pageresize.prune(self.cache_dir, 250), 2)
+        self.assertEqual(sorted(os.listdir(self.cache_dir)), ['2.webp', '3.webp'])
+
+    def test_resize_image(self):
+        data = ImageAPIHandler().resizeImage(300, create_image(400, 600))
+        self.assertEqual(Image.open(io.BytesIO(data)).size, (200, 300))
+
+
+class TestPageView(IssueArchiveTestCase):
+
+    page_sizes = ((1000, 1500),)
+
+    def setUp(self):
+        super(TestPageView, self).setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+
+    def test_resized(self):
+        url = reverse('issue:page', args=(self.issue.slug, 0))
+        with override_settings(PAGE_RESIZE_CACHE_DIR=self.cache_dir):
+            original = self.client.get(url)
+            resp = self.client.get(url, {'w': '320', 'dpr': '2'})
+
+        self.assertEqual(original.content, self.pages[0])
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Type'], pageresize.FORMAT.media_type)
+        self.assertEqual(Image.open(io.BytesIO(resp.content)).size, (640, 960))
+        self.assertNotEqual(resp['ETag'], original['ETag'])
+
+    @mock.patch('comics.utils.comicapi.pdfcache.fitz', None)
+    @mock.patch('subprocess.check_output')
+    def test_pdf(self, check_output):
+        path = os.path.join(self.cache_dir, 'batman-2.pdf')
+        Image.new('RGB', (60, 90)).save(path, 'PDF')
+        issue = Issue.objects.create(cvid='4322', cvurl='http://3.com', slug='batman-2',
+                                     file=path, mod_ts=timezone.now(),
+                                     date=timezone.now().date(), number='2',
+                                     series=self.issue.series)
+
+        # PDF pages are rendered at the size asked for, not scaled down.
+        check_output.return_value = create_image(640, 960)
+        url = reverse('issue:page', args=(issue.slug, 0))
+        with override_settings(PAGE_RESIZE_CACHE_DIR=self.cache_dir):
+            resp = self.client.get(url, {'w': '320', 'dpr': '2'})
+        self.assertEqual(resp.content, check_output.return_value)
+        check_output.assert_called_once_with(
+            ['mudraw', '-w', '640', '-o', '-', path, '1'])
+
+    @mock.patch('comics.utils.comicapi.pdfcache.fitz', None)
+    @mock.patch('subprocess.check_output')
+    def test_pdf_prefetch(self, check_output):
+        path = os.path.join(self.cache_dir, 'batman-3.pdf')
+        Image.new('RGB', (60, 90)).save(path, 'PDF', save_all=True,
+                                         append_images=[Image.new('RGB', (60, 90))])
+        issue = Issue.objects.create(cvid='4323', cvurl='http://4.com', slug='batman-3',
+                                     file=path, mod_ts=timezone.now(),
+                                     date=timezone.now().date(), number='3',
+                                     series=self.issue.series)
+        for index in range(2):
+            Page.objects.create(issue=issue, index=index, name='%d.jpg' % (index + 1))
+
+        check_output.return_value = create_image(640, 960)
+        cache = pagecache.PageCache(executor=ImmediateExecutor())
+        url = reverse('issue:page', args=(issue.slug, 0))
+        with override_settings(PAGE_RESIZE_CACHE_DIR=self.cache_dir), \
+                mock.patch.object(pagecache, '_cache', cache):
+            self.client.get(url, {'w': '320', 'dpr': '2'})
+
+        # The next page is rendered at the size it will be shown at too.
+        self.assertEqual(check_output.call_count, 2)
+        check_output.assert_called_with(['mudraw', '-w', '640', '-o', '-', path, '2'])
@@ -0,0 +1,147 @@
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+import zipfile
+
+from django.test import SimpleTestCase
+from PIL import Image
+
+from comics.utils import scanner, thumbnails
+from comics.utils.scanner import read_comic_metadata, scan_comic_files
+
+
+CIX = ('<?xml version="1.0"?>'
+       '<ComicInfo><Series>Captain Atom</Series><Number>78</Number>'
+       '<Year>1965</Year><Month>12</Month></ComicInfo>')
+
+
+def create_comic(path, pages=3):
+    img = io.BytesIO()
+    Image.new('RGB', (20, 30)).save(img, format='JPEG')
+    with zipfile.ZipFile(path, 'w') as zf:
+        for page in range(pages):
+            zf.writestr('%03d.jpg' % page, img.getvalue())
+        zf.writestr('ComicInfo.xml', CIX)
+
+
+class BrokenExecutor(object):
+    ''' An executor whose worker dies reading the first file it is given. '''
+
+    instances = []
+
+    def __init__(self, max_workers):
+        self.instances.append(self)
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        if len(self.instances) == 1 and not self.submitted:
+            future.set_exception(BrokenProcessPool('A worker died'))
+        else:
+            future.set_result(fn(*args))
+        self.submitted.append(args[0])
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class TestScanner(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.comics = []
+        for num in range(4):
+            path = os.path.join(self.directory, 'comic-%s.cbz' % num)
+            create_comic(path)
+            self.comics.append(path)
+
+        self.not_comic = os.path.join(self.directory, 'notes.txt')
+        with open(self.not_comic, 'w') as f:
+            f.write('Not a comic')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_read_comic_metadata(self):
+        md = read_comic_metadata(self.comics[0])
+        self.assertEqual(md.series, 'Captain Atom')
+        self.assertEqual(md.path, self.comics[0])
+        self.assertEqual(md.page_count, 3)
+
+    def test_read_comic_metadata_not_comic(self):
+        md = read_comic_metadata(self.not_comic)
+        self.assertIsNone(md)
+
+    def test_scan_comic_files(self):
+        filelist = self.comics + [self.not_comic]
+        md_list = list(scan_comic_files(filelist))
+        self.assertEqual(sorted(md.path for md in md_list), self.comics)
+
+    def test_scan_comic_files_workers(self):
+        filelist = self.comics + [self.not_comic]
+        md_list = list(scan_comic_files(filelist, workers=2, queue_size=2))
+        self.assertEqual(sorted(md.path for md in md_list), self.comics)
+
+    def test_scan_comic_files_bad_archive(self):
+        bad = os.path.join(self.directory, 'bad.cbz')
+        with zipfile.ZipFile(bad, 'w') as zf:
+            zf.writestr('000.jpg', b'')
+            zf.writestr('ComicInfo.xml', '<ComicInfo><Series>')
+
+        with self.assertRaises(Exception):
+            read_comic_metadata(bad)
+
+        filelist = [bad, self.not_comic] + self.comics
+        for workers in (1, 2):
+            failed = set()
+            md_list = list(scan_comic_files(filelist, workers=workers, queue_size=2,
+                                            failed=failed))
+            self.assertEqual(sorted(md.path for md in md_list), self.comics)
+            self.assertEqual(failed, {bad})
+
+    def test_scan_comic_files_broken_pool(self):
+        BrokenExecutor.instances = []
+        with mock.patch.object(scanner, 'ProcessPoolExecutor', BrokenExecutor):
+            failed = set()
+            md_list = list(scan_comic_files(self.comics, workers=2, queue_size=2,
+                                            failed=failed))
+
+        # The file in flight when the worker died is skipped, and the rest
+        # are read by a new pool.
+        self.assertEqual(len(BrokenExecutor.instances), 2)
+        self.assertEqual(sorted(md.path for md in md_list), self.comics[1:])
+        self.assertEqual(failed, {self.comics[0]})
+
+    def test_read_cover(self):
+        media_root = os.path.join(self.directory, 'media')
+        md = read_comic_metadata(self.comics[0], media_root)
+        self.assertTrue(md.cover.startswith('images/issues/'))
+        self.assertTrue(os.path.exists(os.path.join(media_root, md.cover)))
+
+    def test_read_front_cover(self):
+        pages = []
+        for color in ('red', 'blue'):
+            img = io.BytesIO()
+            Image.new('RGB', (20, 30), color).save(img, format='JPEG')
+            pages.append(img.getvalue())
+
+        path = os.path.join(self.directory, 'cover.cbz')
+        with zipfile.ZipFile(path, 'w') as zf:
+            zf.writestr('000.jpg', pages[0])
+            zf.writestr('001.jpg', pages[1])
+            zf.writestr('ComicInfo.xml', CIX.replace(
+                '</ComicInfo>',
+                '<Pages><Page Image="0" /><Page Image="1" Type="FrontCover" />'
+                '</Pages></ComicInfo>'))
+
+        md = read_comic_metadata(path, os.path.join(self.directory, 'media'))
+        self.assertEqual(md.cover, thumbnails.get_image_name(pages[1], 'issues'))
+
+    def test_no_cover_without_media_root(self):
+        md = read_comic_metadata(self.comics[0])
+        self.assertIsNone(md.cover)
@@ -0,0 +1,95 @@
+import importlib
+from unittest import mock
+
+from django.apps import apps
+from django.test import SimpleTestCase, TestCase
+
+from comics.models import Character, Series, Team
+from comics.utils import autocomplete, search
+
+
+class SearchTest(SimpleTestCase):
+
+    def test_tsquery(self):
+        self.assertEqual(search.get_tsquery('bat sup'), 'bat:* & sup:*')
+        self.assertEqual(search.get_tsquery("spider-man's & !"), 'spider:* & man:* & s:*')
+        self.assertEqual(search.get_tsquery('!'), '')
+
+    def test_documents_match_indexes(self):
+        # The queries can only use the indexes if their expressions are the same.
+        migration = importlib.import_module('comics.migrations.0016_add_search_indexes')
+        documents = dict(migration.DOCUMENTS)
+        for name in search.DOCUMENTS:
+            model = apps.get_model('comics', name)
+            self.assertEqual(search.get_document_sql(model, qualified=False),
+                             documents[model._meta.db_table])
+
+
+class AutocompleteTest(TestCase):
+
+    def setUp(self):
+        Series.objects.create(cvid=1, name='The Amazing Spider-Man',
+                              slug='the-amazing-spider-man', sort_title='Amazing Spider-Man')
+        Character.objects.create(cvid=1, name='Spider-Man', slug='spider-man')
+        Character.objects.create(cvid=2, name='Superman', slug='superman')
+        self.index = autocomplete.AutocompleteIndex()
+        self.index.refresh()
+
+    def test_complete(self):
+        self.assertEqual(self.index.complete('spider-m'),
+                         [('character', 'Spider-Man', 'spider-man'),
+                          ('series', 'The Amazing Spider-Man', 'the-amazing-spider-man')])
+        self.assertEqual(self.index.complete('SUP'), [('character', 'Superman', 'superman')])
+        self.assertEqual(self.index.complete('spider', limit=1),
+                         [('character', 'Spider-Man', 'spider-man')])
+        self.assertEqual(self.index.complete('batman'), [])
+        self.assertEqual(self.index.complete(' - '), [])
+
+    def test_refresh(self):
+        Team.objects.create(cvid=1, name='Superman Family', slug='superman-family')
+        # Nothing is queried until the refresh interval has passed.
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.index.complete('super')), 1)
+
+        Character.objects.get(slug='spider-man').delete()
+        self.index.refresh(force=True)
+        self.assertEqual(self.index.complete('super'),
+                         [('character', 'Superman', 'superman'),
+                          ('team', 'Superman Family', 'superman-family')])
+        self.assertEqual(self.index.complete('spider'),
+                         [('series', 'The Amazing Spider-Man', 'the-amazing-spider-man')])
+
+    def test_refresh_in_background(self):
+        # A stale index is refreshed in another thread, and the lookup is
+        # answered from the current entries meanwhile.
+        self.index.checked -= self.index.refresh_interval
+        with mock.patch.object(self.index, 'refreshInBackground') as refresh:
+            with self.assertNumQueries(0):
+                self.assertEqual(len(self.index.complete('super')), 1)
+        refresh.assert_called_once_with()
+
+    def test_refresh_deleted_and_added(self):
+        # A deletion and an addition between two refreshes are both seen.
+        Character.objects.get(slug='superman').delete()
+        Character.objects.create(cvid=3, name='Supergirl', slug='supergirl')
+        self.index.refresh(force=True)
+        self.assertEqual(self.index.complete('super'),
+                         [('character', 'Supergirl', 'supergirl')])
+
+    def test_refresh_changed_name(self):
+        # The importer creates a series before it knows its name.
+        series = Series.objects.create(cvid=2, name='', slug='')
+        self.index.refresh(force=True)
+
+        series.name = 'Batman'
+        series.slug = 'batman'
+        series.save()
+        self.index.refresh(force=True)
+        self.assertEqual(self.index.complete('bat'), [('series', 'Batman', 'batman')])
+
+        series.name = 'Detective Comics'
+        series.save()
+        self.index.refresh(force=True)
+        self.assertEqual(self.index.complete('bat'), [])
+        self.assertEqual(self.index.complete('detective'),
+                         [('series', 'Detective Comics', 'batman')])
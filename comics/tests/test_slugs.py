@@ -0,0 +1,51 @@
+from django.test import TestCase
+
+from comics.models import Character
+from comics.utils.slugs import SlugAllocator
+
+
+class TestSlugAllocator(TestCase):
+
+    def setUp(self):
+        self.slugs = SlugAllocator(Character)
+
+    def create(self, cvid, slug):
+        return Character.objects.create(cvid=cvid, name='Robin', slug=slug)
+
+    def test_unused_slug(self):
+        self.assertEqual(self.slugs.allocate('Robin'), 'robin')
+        self.assertEqual(self.slugs.allocate('Robin'), 'robin-1')
+
+    def test_existing_suffixes(self):
+        self.create(1, 'robin')
+        self.create(2, 'robin-3')
+        self.create(3, 'robin-hood')
+        self.assertEqual(self.slugs.allocate('Robin'), 'robin-1')
+        self.assertEqual(self.slugs.allocate('Robin'), 'robin-2')
+        self.assertEqual(self.slugs.allocate('Robin'), 'robin-4')
+
+    def test_number_in_name(self):
+        # Numbers that are part of a name aren't counted on from.
+        self.create(1, 'spider-man')
+        self.create(2, 'spider-man-2099')
+        self.assertEqual(self.slugs.allocate('Spider-Man'), 'spider-man-1')
+
+        self.create(3, 'batman-001-2019')
+        self.assertEqual(self.slugs.allocate('Batman 001'), 'batman-001')
+
+    def test_suffixes_are_cached(self):
+        self.create(1, 'robin')
+        self.assertEqual(self.slugs.allocate('Robin'), 'robin-1')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.slugs.allocate('Robin'), 'robin-2')
+
+    def test_save_retries_taken_slug(self):
+        self.create(1, 'robin')
+        obj = self.slugs.save(Character(cvid=2, name='Robin'), 'Robin')
+        self.assertEqual(obj.slug, 'robin-1')
+        # Another process takes the next slugs after they have been cached.
+        self.create(3, 'robin-2')
+        self.create(4, 'robin-3')
+
+        obj = self.slugs.save(Character(cvid=5, name='Robin'), 'Robin')
+        self.assertEqual(obj.slug, 'robin-4')
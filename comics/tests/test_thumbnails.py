@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+
+from django.db.models.fields.files import FieldFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from comics.models import Issue
+from comics.templatetags.thumbnails import picture
+from comics.utils import thumbnails
+
+from .helpers import create_image
+
+
+class TestThumbnails(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.media_root)
+
+    def test_names(self):
+        data = create_image(10, 10)
+        name = thumbnails.get_image_name(data, 'issues')
+        self.assertEqual(name, thumbnails.get_image_name(data, 'issues'))
+        self.assertTrue(name.startswith('images/issues/'))
+        self.assertEqual(thumbnails.get_thumbnail_name(name, thumbnails.DETAIL, thumbnails.JPEG),
+                         name)
+        self.assertEqual(thumbnails.get_thumbnail_name(name, thumbnails.GRID, thumbnails.WEBP),
+                         name[:-4] + '-grid.webp')
+
+    def test_fit(self):
+        img = Image.new('RGB', (1000, 1000))
+        self.assertEqual(thumbnails.fit(img, 320, 487).size, (320, 487))
+
+    def test_fit_does_not_enlarge(self):
+        img = Image.new('RGB', (200, 487))
+        self.assertEqual(thumbnails.fit(img, 640, 974).size, (200, 304))
+
+    def test_create_thumbnails(self):
+        data = create_image(1280, 1948)
+        name = thumbnails.get_image_name(data, 'issues')
+        thumbnails.create_thumbnails(data, name, self.media_root)
+
+        for size in thumbnails.SIZES:
+            for fmt in thumbnails.FORMATS:
+                path = os.path.join(self.media_root,
+                                    thumbnails.get_thumbnail_name(name, size, fmt))
+                img = Image.open(path)
+                self.assertEqual(img.format, fmt.name)
+                self.assertEqual(img.size, (size.width, size.height))
+
+    def test_transparent_image(self):
+        data = create_image(320, 487, fmt='PNG', mode='RGBA')
+        name = thumbnails.get_image_name(data, 'publishers')
+        thumbnails.create_thumbnails(data, name, self.media_root)
+        img = Image.open(os.path.join(self.media_root, name))
+        self.assertEqual(img.mode, 'RGB')
+
+    def test_existing_thumbnails_are_skipped(self):
+        data = create_image(320, 487)
+        name = thumbnails.get_image_name(data, 'issues')
+        thumbnails.create_thumbnails(data, name, self.media_root)
+        path = os.path.join(self.media_root, name)
+        mtime = os.stat(path).st_mtime_ns
+
+        thumbnails.create_thumbnails(data, name, self.media_root)
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+
+    def test_pool(self):
+        pool = thumbnails.ThumbnailPool(self.media_root, workers=2)
+        names = []
+        for width in (100, 200, 300):
+            data = create_image(width, 400)
+            names.append(thumbnails.get_image_name(data, 'issues'))
+            pool.submit(data, names[-1])
+        pool.wait()
+
+        for name in names:
+            self.assertTrue(os.path.exists(os.path.join(self.media_root, name)))
+
+    def test_read_image(self):
+        path = os.path.join(self.media_root, 'bad.jpg')
+        with open(path, 'w') as f:
+            f.write('not an image')
+        self.assertIsNone(thumbnails.read_image(path))
+
+
+class TestPictureTag(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.media_root)
+
+    def get_field(self, name):
+        return FieldFile(Issue(), Issue._meta.get_field('cover'), name)
+
+    def test_srcset(self):
+        data = create_image(640, 974)
+        name = thumbnails.get_image_name(data, 'issues')
+        thumbnails.create_thumbnails(data, name, self.media_root)
+
+        with override_settings(MEDIA_ROOT=self.media_root):
+            context = picture(self.get_field(name), 'Batman #1')
+
+        self.assertIn('-grid.jpg 160w', context['srcset'])
+        self.assertIn('-retina.jpg 640w', context['srcset'])
+        self.assertEqual(len(context['sources']), len(thumbnails.FORMATS) - 1)
+
+    def test_image_name(self):
+        data = create_image(640, 974)
+        name = thumbnails.get_image_name(data, 'issues')
+        thumbnails.create_thumbnails(data, name, self.media_root)
+
+        with override_settings(MEDIA_ROOT=self.media_root):
+            context = picture(name, 'Batman #1')
+        self.assertIn('-grid.jpg 160w', context['srcset'])
+        self.assertTrue(context['url'].endswith(name))
+
+        self.assertEqual(picture('', 'Batman #1')['url'], '')
+
+    def test_without_thumbnails(self):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            context = picture(self.get_field('images/issues/old.jpg'), 'Batman #1')
+        self.assertEqual(context['srcset'], '')
@@ -11,6 +11,8 @@ from comics.models import (Publisher, Series, Creator,
                            Settings)
 from comics.utils.comicimporter import ComicImporter
 
+from .helpers import IssueArchiveTestCase
+
 
 HTML_OK_CODE = 200
 
@@ -99,6 +101,54 @@ class IssueReaderViewTest(TestCaseBase):
         self.assertEqual(resp.status_code, HTML_OK_CODE)
 
 
+class IssuePageViewTest(IssueArchiveTestCase):
+
+    page_sizes = ((20, 30), (20, 30))
+
+    def test_view_page(self):
+        url = reverse('issue:page', args=(self.issue.slug, 1))
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, HTML_OK_CODE)
+        self.assertEqual(resp['Content-Type'], 'image/jpeg')
+        self.assertEqual(resp.content, self.pages[0])
+        self.assertTrue(resp['ETag'])
+
+    def test_view_page_not_modified(self):
+        url = reverse('issue:page', args=(self.issue.slug, 0))
+        etag = self.client.get(url)['ETag']
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+    def test_view_page_range(self):
+        url = reverse('issue:page', args=(self.issue.slug, 0))
+        resp = self.client.get(url, HTTP_RANGE='bytes=0-9')
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp.content, self.pages[0][:10])
+        self.assertEqual(resp['Content-Range'],
+                         'bytes 0-9/%d' % len(self.pages[0]))
+
+    def test_view_page_invalid_range(self):
+        url = reverse('issue:page', args=(self.issue.slug, 0))
+        resp = self.client.get(url, HTTP_RANGE='bytes=100000-')
+        self.assertEqual(resp.status_code, 416)
+
+    def test_view_missing_page(self):
+        url = reverse('issue:page', args=(self.issue.slug, 2))
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 404)
+
+    def test_reader_page_size(self):
+        # The reader fills in the size it shows the pages at.
+        resp = self.client.get(reverse('issue:reader', args=(self.issue.slug,)))
+        self.assertContains(resp, 'data-source="/issue/batman-1/page/0/?w={width}&amp;dpr={dpr}"')
+        self.assertContains(resp, 'data-source="/issue/batman-1/page/1/?w={width}&amp;dpr={dpr}"')
+
+    def test_redirects_to_login_page_on_not_loggedin(self):
+        self.client.logout()
+        resp = self.client.get(reverse('issue:page', args=(self.issue.slug, 0)))
+        self.assertRedirects(resp, '/accounts/login/?next=/issue/batman-1/page/0/')
+
+
 class PublisherDetailViewTest(TestCaseBase):
 
     @classmethod
@@ -133,6 +133,16 @@ class SeriesListViewTest(TestCaseBase):
         resp = self.client.get(reverse('series:list', args=(1,)))
         self.assertRedirects(resp, '/accounts/login/?next=/series/page1/')
 
+    def test_queries_per_page(self):
+        mod_time = timezone.now()
+        for series in Series.objects.all()[:5]:
+            Issue.objects.create(cvid=series.cvid, slug=series.slug, file=series.slug,
+                                 mod_ts=mod_time, date=mod_time.date(), number='1',
+                                 series=series)
+        with self.assertNumQueries(4):
+            resp = self.client.get(reverse('series:list', args=(1,)))
+        self.assertContains(resp, 'Series 1')
+
 
 class CreatorListViewTest(TestCaseBase):
 
@@ -4,8 +4,10 @@ from django.urls import reverse
 
 from comics.models import (Publisher, Series, Creator,
                            Character, Team, Arc)
+from comics.utils import autocomplete
 
 HTML_OK_CODE = 200
+HTML_REDIRECT_FOUND_CODE = 302
 
 PAGINATE_TEST_VAL = 35
 PAGINATE_DEFAULT_VAL = 30
@@ -294,3 +296,60 @@ class ArcSearchViewTest(TestCaseBase):
         self.assertTrue(resp.context['is_paginated'] == True)
         self.assertTrue(
             len(resp.context['arc_list']) == PAGINATE_DIFF_VAL)
+
+
+class SearchAllViewTest(TestCaseBase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls._create_user(cls)
+
+        Publisher.objects.create(name='DC Comics', slug='dc-comics')
+        Character.objects.create(name='Batman', slug='batman', cvid=1)
+        Team.objects.create(name='Batman Incorporated', slug='batman-incorporated', cvid=1)
+        Arc.objects.create(name='Knightfall', slug='knightfall', cvid=1)
+
+    def setUp(self):
+        self._client_login()
+
+    def test_search(self):
+        resp = self.client.get(reverse('search:search'), {'q': 'batman'})
+        self.assertEqual(resp.status_code, HTML_OK_CODE)
+        results = resp.json()['results']
+        self.assertEqual([(r['type'], r['name']) for r in results],
+                         [('character', 'Batman'), ('team', 'Batman Incorporated')])
+        self.assertEqual(results[0]['url'], reverse('character:detail', args=['batman']))
+
+    def test_limit(self):
+        resp = self.client.get(reverse('search:search'), {'q': 'bat', 'limit': 1})
+        self.assertEqual(len(resp.json()['results']), 1)
+
+    def test_empty_query(self):
+        resp = self.client.get(reverse('search:search'), {'q': ' '})
+        self.assertEqual(resp.json()['results'], [])
+
+    def test_redirects_to_login_page_on_not_loggedin(self):
+        self.client.logout()
+        resp = self.client.get(reverse('search:search'))
+        self.assertEqual(resp.status_code, HTML_REDIRECT_FOUND_CODE)
+
+
+class SuggestViewTest(TestCaseBase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls._create_user(cls)
+
+        Character.objects.create(name='Batman', slug='batman', cvid=1)
+        Arc.objects.create(name='Knightfall', slug='knightfall', cvid=1)
+
+    def setUp(self):
+        self._client_login()
+        autocomplete.get_index().refresh(force=True)
+
+    def test_suggest(self):
+        resp = self.client.get(reverse('search:suggest'), {'q': 'kni'})
+        self.assertEqual(resp.status_code, HTML_OK_CODE)
+        self.assertEqual(resp.json()['results'],
+                         [{'type': 'arc', 'name': 'Knightfall',
+                           'url': reverse('arc:detail', args=['knightfall'])}])
@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import TestCase
+from huey.exceptions import TaskLockedException
+
+from comics import tasks
+from comics.utils.watcher import ComicWatcher
+
+
+class TestComicWatcher(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'a.cbz')
+        with open(self.path, 'w') as f:
+            f.write('a')
+        self.batches = []
+        self.watcher = ComicWatcher(self.directory, self.batches.append,
+                                    settle=5, use_polling=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_waits_for_file_to_settle(self):
+        self.watcher.add(self.path, now=100)
+        self.assertEqual(self.watcher.getReady(now=101), [])
+        self.assertEqual(self.watcher.getReady(now=105), [self.path])
+        self.assertEqual(self.watcher.getReady(now=110), [])
+
+    def test_file_still_being_written(self):
+        self.watcher.add(self.path, now=100)
+        with open(self.path, 'a') as f:
+            f.write('more data')
+        self.assertEqual(self.watcher.getReady(now=105), [])
+        self.assertEqual(self.watcher.getReady(now=110), [self.path])
+
+    def test_deleted_file(self):
+        self.watcher.add(self.path, now=100)
+        os.remove(self.path)
+        self.assertEqual(self.watcher.getReady(now=105), [])
+        self.assertEqual(self.watcher.getReady(now=110), [self.path])
+
+    def test_polling(self):
+        self.watcher.runOnce(now=100)
+        self.watcher.runOnce(now=105)
+        self.assertEqual(self.batches, [[self.path]])
+
+        new_path = os.path.join(self.directory, 'b.cbz')
+        with open(new_path, 'w') as f:
+            f.write('b')
+        self.watcher.runOnce(now=200)
+        self.watcher.runOnce(now=205)
+        self.assertEqual(self.batches, [[self.path], [new_path]])
+
+
+@mock.patch('comics.tasks.ComicImporter')
+@mock.patch.object(tasks.HUEY, 'lock_task')
+class TestImportLock(TestCase):
+
+    def test_import(self, lock_task, importer):
+        tasks.import_comic_paths_task.call_local(['/comics/a.cbz'])
+        lock_task.assert_called_once_with(tasks.IMPORT_LOCK)
+        importer.return_value.import_comic_paths.assert_called_once_with(['/comics/a.cbz'])
+
+    @mock.patch.object(tasks.import_comic_paths_task, 'schedule')
+    def test_import_running(self, schedule, lock_task, importer):
+        # While another import runs the batch is tried again later.
+        lock_task.return_value.__enter__.side_effect = TaskLockedException
+        with self.assertLogs('bamf', 'INFO'):
+            tasks.import_comic_paths_task.call_local(['/comics/a.cbz'])
+        importer.assert_not_called()
+        schedule.assert_called_once_with(args=(['/comics/a.cbz'],),
+                                         delay=tasks.IMPORT_RETRY_DELAY)
+
+    @mock.patch.object(tasks.import_comic_files_task, 'schedule')
+    def test_import_files_running(self, schedule, lock_task, importer):
+        lock_task.return_value.__enter__.side_effect = TaskLockedException
+        tasks.import_comic_files_task.call_local()
+        importer.assert_not_called()
+        schedule.assert_called_once_with(delay=tasks.IMPORT_RETRY_DELAY)
+
+    def test_release_import_lock(self, lock_task, importer):
+        tasks.release_import_lock()
+        lock_task.assert_called_once_with(tasks.IMPORT_LOCK)
+        lock_task.return_value.__exit__.assert_called_once_with(None, None, None)
@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework import routers
 
+from comics.views.sync import sync
 from comics.views.viewsets import (ArcViewSet, CharacterViewSet,
                                    CreatorViewSet, IssueViewSet,
                                    PublisherViewSet, SeriesViewSet,
@@ -19,4 +20,5 @@ router.register('team', TeamViewSet)
 app_name = 'api'
 urlpatterns = [
     path('', include(router.urls)),
+    path('sync/', sync, name='sync'),
 ]
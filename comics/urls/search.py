@@ -0,0 +1,10 @@
+from django.urls import path
+
+from comics.views.search import search_all, suggest
+
+
+app_name = 'search'
+urlpatterns = [
+    path('', search_all, name='search'),
+    path('suggest/', suggest, name='suggest'),
+]
@@ -0,0 +1,201 @@
+'''
+Suggests series, characters, creators, teams and story arcs as a name is being
+typed, from a sorted index kept in memory so that no query is needed.
+
+Every word of a name starts an entry in the index, so "spider" finds both
+"Spider-Man" and "The Amazing Spider-Man". The index is checked against the
+database at most once every refresh interval, in a background thread so that
+lookups aren't held up: rows that are new or have been modified since the
+last check are merged in, and rows with a Tombstone are removed.
+'''
+
+from bisect import bisect_left
+from datetime import timedelta
+import heapq
+import logging
+import re
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection
+from django.db.models import Max
+
+
+# Seconds between checks of the database for new, changed or deleted rows.
+REFRESH_INTERVAL = 60
+
+# Rows modified this long before the last one seen are read again, in case
+# their transaction committed after the last check.
+MODIFIED_OVERLAP = timedelta(seconds=60)
+
+logger = logging.getLogger('bamf')
+
+# The types of object that are suggested, and their models in the comics app.
+MODELS = (('series', 'Series'), ('character', 'Character'), ('creator', 'Creator'),
+          ('team', 'Team'), ('arc', 'Arc'))
+
+WORD_RE = re.compile(r'\w+')
+
+
+def normalize(text):
+    return ' '.join(WORD_RE.findall(text.casefold()))
+
+
+def get_keys(name):
+    ''' Returns the index keys for a name, with the position of their first word. '''
+    words = WORD_RE.findall(name.casefold())
+    return [(' '.join(words[i:]), i) for i in range(len(words))]
+
+
+class AutocompleteIndex(object):
+    '''
+    The entries are a sorted list of (key, position, kind, pk) tuples, and
+    names maps (kind, pk) to the object's name and slug. Refreshing builds new
+    ones and swaps them in, so lookups never need the lock.
+    '''
+
+    def __init__(self, refresh_interval=REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.entries = []
+        self.names = {}
+        # The latest modified time loaded for each kind.
+        self.loaded = {}
+        # The latest Tombstone seen, so deletions are only read once.
+        self.deleted = None
+        self.checked = None
+        self.lock = threading.Lock()
+
+    def isFresh(self):
+        return (self.checked is not None and
+                time.monotonic() - self.checked < self.refresh_interval)
+
+    def refresh(self, force=False):
+        if not force and self.isFresh():
+            return
+
+        with self.lock:
+            if not force and self.isFresh():
+                return
+
+            loaded = dict(self.loaded)
+            rows = {}
+            for kind, model_name in MODELS:
+                model = apps.get_model('comics', model_name)
+                latest = model.objects.aggregate(modified=Max('modified'))['modified']
+                modified = loaded.get(kind)
+                if modified is None:
+                    new_rows = model.objects.all()
+                else:
+                    new_rows = model.objects.filter(modified__gte=modified - MODIFIED_OVERLAP)
+                rows[kind] = list(new_rows.values_list('pk', 'name', 'slug'))
+                loaded[kind] = latest or modified
+
+            # Deleted rows are found from the Tombstones that record them. The
+            # first load has nothing to remove.
+            tombstones = apps.get_model('comics', 'Tombstone').objects.filter(model__in=[kind for kind, _ in MODELS])
+            deleted = tombstones.aggregate(deleted=Max('deleted'))['deleted'] or self.deleted
+            removed = set()
+            if self.checked is not None:
+                if self.deleted is not None:
+                    tombstones = tombstones.filter(
+                        deleted__gte=self.deleted - MODIFIED_OVERLAP)
+                removed = set(tombstones.values_list('model', 'object_id'))
+
+            # Changed rows replace their old entries.
+            names = self.names
+            stale = set((kind, row[0]) for kind, kind_rows in rows.items()
+                        for row in kind_rows if (kind, row[0]) in names)
+            stale.update(key for key in removed if key in names)
+            entries = self.entries
+            if stale:
+                entries = [entry for entry in entries if (entry[2], entry[3]) not in stale]
+                names = dict((key, value) for key, value in names.items()
+                             if key not in stale)
+            else:
+                names = dict(names)
+
+            new_entries = []
+            for kind, kind_rows in rows.items():
+                for pk, name, slug in kind_rows:
+                    if (kind, pk) in removed:
+                        continue
+                    names[(kind, pk)] = (name, slug)
+                    new_entries.extend((key, position, kind, pk)
+                                       for key, position in get_keys(name))
+
+            if new_entries:
+                new_entries.sort()
+                entries = list(heapq.merge(entries, new_entries))
+
+            self.entries = entries
+            self.names = names
+            self.loaded = loaded
+            self.deleted = deleted
+            self.checked = time.monotonic()
+
+    def refreshInBackground(self):
+        '''
+        Starts a refresh in another thread, unless one is already running, so
+        that lookups go on using the current entries until it is done.
+        '''
+        if self.lock.locked():
+            return
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error('Unable to refresh the autocomplete index: %s' % e)
+            finally:
+                connection.close()
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def complete(self, query, limit=10):
+        '''
+        Returns up to limit (kind, name, slug) tuples for the objects with a
+        word that starts with query, those whose name starts with it first.
+        '''
+        if self.checked is None:
+            # There is nothing to suggest until the first load is done.
+            self.refresh()
+        elif not self.isFresh():
+            self.refreshInBackground()
+
+        prefix = normalize(query)
+        if not prefix:
+            return []
+
+        entries = self.entries
+        names = self.names
+        matches = {}
+        i = bisect_left(entries, (prefix,))
+        # Only look at a few more entries than needed, the index is sorted by
+        # key and not by how good a match each entry is.
+        while (i < len(entries) and entries[i][0].startswith(prefix) and
+               len(matches) < limit * 4):
+            key, position, kind, pk = entries[i]
+            if (kind, pk) in names:
+                matches[(kind, pk)] = min(position, matches.get((kind, pk), position))
+            i += 1
+
+        results = sorted(matches.items(),
+                         key=lambda match: (match[1], names[match[0]][0].casefold()))
+        return [(kind, names[(kind, pk)][0], names[(kind, pk)][1])
+                for (kind, pk), position in results[:limit]]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    ''' Returns the AutocompleteIndex shared by everything in this process. '''
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = AutocompleteIndex(
+                getattr(settings, 'AUTOCOMPLETE_REFRESH_INTERVAL', REFRESH_INTERVAL))
+        return _index
@@ -15,20 +15,24 @@ limitations under the License.
 '''
 
 from io import StringIO
+import mimetypes
 import os
+import struct
 import sys
 import tempfile
-import subprocess
 import zipfile
+import zlib
 
 from natsort import natsorted
-from PyPDF2 import PdfFileReader
 
 from .comet import CoMet
 from .comicbookinfo import ComicBookInfo
 from .comicinfoxml import ComicInfoXML
 from .filenameparser import FileNameParser
 from .genericmetadata import GenericMetadata, PageType
+from .pdfcache import pdf_cache
+from .sevenzipcache import SevenZipFileCache
+from .zipcache import ZipFileCache, zip_cache
 
 
 try:
@@ -37,6 +41,16 @@ try:
 except ImportError:
     pil_available = False
 
+try:
+    import rarfile
+except ImportError:
+    rarfile = None
+
+try:
+    import py7zr
+except ImportError:
+    py7zr = None
+
 
 class MetaDataStyle:
     CBI = 0
@@ -45,6 +59,19 @@ class MetaDataStyle:
     name = ['ComicBookLover', 'ComicRack', 'CoMet']
 
 
+# The fixed size part of a zip file's local file header.
+LOCAL_HEADER_FORMAT = '<4s2B4HL2L2H'
+LOCAL_HEADER_SIZE = struct.calcsize(LOCAL_HEADER_FORMAT)
+LOCAL_HEADER_SIGNATURE = b'PK\003\004'
+
+
+def guessMediaType(name):
+    media_type = mimetypes.guess_type(name)[0]
+    if media_type is None or not media_type.startswith('image/'):
+        return ''
+    return media_type
+
+
 class ZipArchiver:
     ''' Zip Implementation '''
 
@@ -52,10 +79,8 @@ class ZipArchiver:
         self.path = path
 
     def getArchiveComment(self):
-        zf = zipfile.ZipFile(self.path, "r")
-        comment = zf.comment
-        zf.close()
-        return comment
+        with zip_cache.checkout(self.path) as zf:
+            return zf.comment
 
     def setArchiveComment(self, comment):
         try:
@@ -66,27 +91,85 @@ class ZipArchiver:
             return False
         else:
             return True
+        finally:
+            zip_cache.invalidate(self.path)
 
     def readArchiveFile(self, archive_file):
-        data = ""
-        zf = zipfile.ZipFile(self.path, "r")
-
         try:
-            data = zf.read(archive_file)
-        except zipfile.BadZipfile as e:
-            print >> sys.stderr, u"Bad zipfile [{0}]: {1} :: {2}".format(
-                e, self.path, archive_file)
-            zf.close()
-            raise IOError
+            with zip_cache.checkout(self.path) as zf:
+                return zf.read(archive_file)
         except Exception as e:
-            zf.close()
-            print >> sys.stderr, u"Bad zipfile [{0}]: {1} :: {2}".format(
-                e, self.path, archive_file)
+            print(u"Bad zipfile [{0}]: {1} :: {2}".format(
+                e, self.path, archive_file), file=sys.stderr)
             raise IOError
-        finally:
-            zf.close()
+
+    def readArchiveFileAt(self, archive_file, offset, size):
+        '''
+        Reads a file straight from its local header at offset, without
+        reading the archive's central directory. Falls back to
+        readArchiveFile() if the header doesn't match what we expect.
+        '''
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                (signature, _, _, flags, compress_type, _, _, crc, compress_size,
+                 file_size, name_length, extra_length) = struct.unpack(
+                    LOCAL_HEADER_FORMAT, f.read(LOCAL_HEADER_SIZE))
+                name = f.read(name_length)
+                name = name.decode('utf-8' if flags & 0x800 else 'cp437')
+
+                # Skip anything encrypted, or with the sizes and crc stored
+                # after the data.
+                if (signature != LOCAL_HEADER_SIGNATURE or name != archive_file or
+                        flags & 0x9 or file_size != size):
+                    return self.readArchiveFile(archive_file)
+
+                f.seek(extra_length, os.SEEK_CUR)
+                if compress_type == zipfile.ZIP_STORED:
+                    data = f.read(size)
+                elif compress_type == zipfile.ZIP_DEFLATED:
+                    data = zlib.decompressobj(-15).decompress(
+                        f.read(compress_size))
+                else:
+                    return self.readArchiveFile(archive_file)
+        except (OSError, struct.error, zlib.error):
+            return self.readArchiveFile(archive_file)
+
+        if len(data) != size or zlib.crc32(data) != crc:
+            return self.readArchiveFile(archive_file)
+
         return data
 
+    def getPageInfoList(self, page_list):
+        '''
+        Returns the size and local header offset of each of the pages in
+        page_list, along with its dimensions and media type.
+        '''
+        info_list = []
+        with zip_cache.checkout(self.path) as zf:
+            for name in page_list:
+                zinfo = zf.getinfo(name)
+                info = {'name': name,
+                        'size': zinfo.file_size,
+                        'offset': zinfo.header_offset,
+                        'width': None,
+                        'height': None,
+                        'media_type': guessMediaType(name)}
+                if pil_available:
+                    # Pillow only reads as much of the file as it needs to
+                    # get the dimensions.
+                    try:
+                        with zf.open(zinfo) as f:
+                            im = Image.open(f)
+                            info['width'], info['height'] = im.size
+                            info['media_type'] = Image.MIME.get(
+                                im.format, info['media_type'])
+                    except Exception:
+                        pass
+                info_list.append(info)
+
+        return info_list
+
     def removeArchiveFile(self, archive_file):
         try:
             self.rebuildZipFile([archive_file])
@@ -106,16 +189,16 @@ class ZipArchiver:
             return True
         except:
             return False
+        finally:
+            zip_cache.invalidate(self.path)
 
     def getArchiveFilenameList(self):
         try:
-            zf = zipfile.ZipFile(self.path, "r")
-            namelist = zf.namelist()
-            zf.close()
-            return namelist
+            with zip_cache.checkout(self.path) as zf:
+                return zf.namelist()
         except Exception as e:
-            print >> sys.stderr, u"Unable to get zipfile list [{0}]: {1}".format(
-                e, self.path)
+            print(u"Unable to get zipfile list [{0}]: {1}".format(
+                e, self.path), file=sys.stderr)
             return []
 
     def rebuildZipFile(self, exclude_list):
@@ -143,6 +226,7 @@ class ZipArchiver:
         # Replace with the new file
         os.remove(self.path)
         os.rename(tmp_name, self.path)
+        zip_cache.invalidate(self.path)
 
     def copyFromArchive(self, otherArchive):
         """ Replace the current zip with one copied from another archive. """
@@ -153,6 +237,7 @@ class ZipArchiver:
                 if data is not None:
                     zout.writestr(fname, data)
             zout.close()
+            zip_cache.invalidate(self.path)
 
             # Preserve the old comment
             comment = otherArchive.getArchiveComment()
@@ -176,23 +261,23 @@ class FolderArchiver:
         self.comment_file_name = "ComicTaggerFolderComment.txt"
 
     def getArchiveComment(self):
-        return self.readArchiveFile(self.comment_file_name)
+        try:
+            return self.readArchiveFile(self.comment_file_name).decode('utf-8')
+        except (IOError, UnicodeDecodeError):
+            return ""
 
     def setArchiveComment(self, comment):
         return self.writeArchiveFile(self.comment_file_name, comment)
 
     def readArchiveFile(self, archive_file):
-
-        data = ""
         fname = os.path.join(self.path, archive_file)
         try:
             with open(fname, 'rb') as f:
-                data = f.read()
-                f.close()
-        except IOError:
-            pass
-
-        return data
+                return f.read()
+        except IOError as e:
+            print(u"Bad folder file [{0}]: {1} :: {2}".format(
+                e, self.path, archive_file), file=sys.stderr)
+            raise IOError
 
     def writeArchiveFile(self, archive_file, data):
 
@@ -220,17 +305,102 @@ class FolderArchiver:
         return self.listFiles(self.path)
 
     def listFiles(self, folder):
-
+        # The names are relative to the comic's folder, like an archive's.
         itemlist = list()
 
         for item in os.listdir(folder):
-            itemlist.append(item)
-            if os.path.isdir(item):
-                itemlist.extend(self.listFiles(os.path.join(folder, item)))
+            path = os.path.join(folder, item)
+            if os.path.isdir(path):
+                itemlist.extend(self.listFiles(path))
+            else:
+                itemlist.append(os.path.relpath(path, self.path).replace(os.sep, '/'))
 
         return itemlist
 
 
+def openRarFile(path, mode='r'):
+    return rarfile.RarFile(path, mode)
+
+
+# Open RAR files, so their headers aren't read again for every page.
+rar_cache = ZipFileCache(max_handles=8, opener=openRarFile)
+
+
+class RarArchiver:
+
+    """RAR implementation, using the rarfile package"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def getArchiveComment(self):
+        with rar_cache.checkout(self.path) as rf:
+            return rf.comment or ""
+
+    def setArchiveComment(self, comment):
+        return False
+
+    def readArchiveFile(self, archive_file):
+        try:
+            with rar_cache.checkout(self.path) as rf:
+                return rf.read(archive_file)
+        except Exception as e:
+            print(u"Bad rarfile [{0}]: {1} :: {2}".format(
+                e, self.path, archive_file), file=sys.stderr)
+            raise IOError
+
+    def writeArchiveFile(self, archive_file, data):
+        return False
+
+    def removeArchiveFile(self, archive_file):
+        return False
+
+    def getArchiveFilenameList(self):
+        # Only the headers are read, nothing is decompressed.
+        with rar_cache.checkout(self.path) as rf:
+            return [info.filename for info in rf.infolist() if not info.isdir()]
+
+
+def openSevenZipFile(path, mode='r'):
+    return py7zr.SevenZipFile(path, mode)
+
+
+# Open 7z files, and the pages read from them.
+sevenzip_cache = SevenZipFileCache(opener=openSevenZipFile)
+
+
+class SevenZipArchiver:
+
+    """7z implementation, using the py7zr package"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def getArchiveComment(self):
+        return ""
+
+    def setArchiveComment(self, comment):
+        return False
+
+    def readArchiveFile(self, archive_file):
+        try:
+            return sevenzip_cache.readFile(self.path, archive_file)
+        except Exception as e:
+            print(u"Bad 7z file [{0}]: {1} :: {2}".format(
+                e, self.path, archive_file), file=sys.stderr)
+            raise IOError
+
+    def writeArchiveFile(self, archive_file, data):
+        return False
+
+    def removeArchiveFile(self, archive_file):
+        return False
+
+    def getArchiveFilenameList(self):
+        # Only the headers are read, nothing is decompressed.
+        return sevenzip_cache.getNames(self.path)
+
+
 class UnknownArchiver:
 
     """Unknown implementation"""
@@ -268,9 +438,10 @@ class PdfArchiver:
     def setArchiveComment(self, comment):
         return False
 
-    def readArchiveFile(self, page_num):
-        return subprocess.check_output(
-            ['mudraw', '-o', '-', self.path, str(int(os.path.basename(page_num)[:-4]))])
+    def readArchiveFile(self, page_num, size=None):
+        # The pages are named after their number, counting from 1.
+        index = int(os.path.basename(page_num)[:-4]) - 1
+        return pdf_cache.renderPage(self.path, index, size)
 
     def writeArchiveFile(self, archive_file, data):
         return False
@@ -280,8 +451,7 @@ class PdfArchiver:
 
     def getArchiveFilenameList(self):
         out = []
-        pdf = PdfFileReader(open(self.path, 'rb'))
-        for page in range(1, pdf.getNumPages() + 1):
+        for page in range(1, pdf_cache.getPageCount(self.path) + 1):
             out.append("/%04d.jpg" % (page))
         return out
 
@@ -290,7 +460,7 @@ class ComicArchive:
     logo_data = None
 
     class ArchiveType:
-        Zip, Folder, Pdf, Unknown = range(4)
+        Zip, Folder, Pdf, Unknown, Rar, SevenZip = range(6)
 
     def __init__(self, path, default_image_path=None):
         self.path = path
@@ -301,9 +471,18 @@ class ComicArchive:
         self.archiver = UnknownArchiver(self.path)
         self.default_image_path = default_image_path
 
-        if self.zipTest():
+        if os.path.isdir(self.path):
+            self.archive_type = self.ArchiveType.Folder
+            self.archiver = FolderArchiver(self.path)
+        elif self.zipTest():
             self.archive_type = self.ArchiveType.Zip
             self.archiver = ZipArchiver(self.path)
+        elif self.rarTest():
+            self.archive_type = self.ArchiveType.Rar
+            self.archiver = RarArchiver(self.path)
+        elif self.sevenZipTest():
+            self.archive_type = self.ArchiveType.SevenZip
+            self.archiver = SevenZipArchiver(self.path)
         elif os.path.basename(self.path)[-3:] == 'pdf':
             self.archive_type = self.ArchiveType.Pdf
             self.archiver = PdfArchiver(self.path)
@@ -329,11 +508,36 @@ class ComicArchive:
         self.archiver.path = path
 
     def zipTest(self):
-        return zipfile.is_zipfile(self.path)
+        # Opening the archive through the cache means it doesn't have to be
+        # read again when we start reading files from it.
+        return zip_cache.isZipFile(self.path)
+
+    def rarTest(self):
+        # RAR and 7z archives can only be read if their packages are installed.
+        if rarfile is None:
+            return False
+        try:
+            return rarfile.is_rarfile(self.path)
+        except OSError:
+            return False
+
+    def sevenZipTest(self):
+        if py7zr is None:
+            return False
+        try:
+            return py7zr.is_7zfile(self.path)
+        except OSError:
+            return False
 
     def isZip(self):
         return self.archive_type == self.ArchiveType.Zip
 
+    def isRar(self):
+        return self.archive_type == self.ArchiveType.Rar
+
+    def isSevenZip(self):
+        return self.archive_type == self.ArchiveType.SevenZip
+
     def isPdf(self):
         return self.archive_type == self.ArchiveType.Pdf
 
@@ -341,7 +545,8 @@ class ComicArchive:
         return self.archive_type == self.ArchiveType.Folder
 
     def isWritable(self):
-        if self.archive_type == self.ArchiveType.Unknown:
+        if self.archive_type in (self.ArchiveType.Unknown, self.ArchiveType.Rar,
+                                 self.ArchiveType.SevenZip):
             return False
         elif not os.access(self.path, os.W_OK):
             return False
@@ -358,7 +563,8 @@ class ComicArchive:
 
     def seemsToBeAComicArchive(self):
         if (
-            (self.isZip() or self.isPdf())
+            (self.isZip() or self.isPdf() or self.isRar() or
+             self.isSevenZip() or self.isFolder())
             and
             (self.getNumberOfPages() > 0)
         ):
@@ -414,7 +620,7 @@ class ComicArchive:
             try:
                 image_data = self.archiver.readArchiveFile(filename)
             except IOError:
-                print >> sys.stderr, u"Error reading in page.  Substituting logo page."
+                print(u"Error reading in page.  Substituting logo page.", file=sys.stderr)
                 image_data = ComicArchive.logo_data
 
         return image_data
@@ -509,6 +715,23 @@ class ComicArchive:
 
         return self.page_list
 
+    def getPageInfoList(self):
+        '''
+        Returns a list with the name, size, local header offset, dimensions and
+        media type of every page, in page order. Only zip archives have the
+        offset, size and dimensions set.
+        '''
+        if self.isZip():
+            return self.archiver.getPageInfoList(self.getPageNameList())
+
+        return [{'name': name,
+                 'size': 0,
+                 'offset': None,
+                 'width': None,
+                 'height': None,
+                 'media_type': '' if self.isPdf() else guessMediaType(name)}
+                for name in self.getPageNameList()]
+
     def getNumberOfPages(self):
 
         if self.page_count is None:
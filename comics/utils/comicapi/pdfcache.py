@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+'''
+A process wide pool of open PDF documents, with caches of their page counts
+and rendered pages.
+
+A PDF's pages have to be rendered to be read as images. With PyMuPDF
+installed the documents are kept open between reads, so reading a page only
+costs rendering it, and the most recently rendered pages are kept so turning
+back to them costs nothing. Without it each page is rendered by a mudraw
+process, and the page count is read with PyPDF2.
+
+Pages are rendered at DPI, or to fit the size they are shown at if it's
+given, so they never have to be scaled up or down afterwards.
+'''
+
+from collections import OrderedDict
+import io
+import os
+import subprocess
+import threading
+
+from PyPDF2 import PdfFileReader
+
+from .zipcache import ZipFileCache
+
+try:
+    import fitz
+except ImportError:
+    fitz = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+# The resolution pages are rendered at, unless a size is asked for.
+DPI = 150
+
+# Rough memory used by each page of an open document.
+PAGE_SIZE = 8 * 1024
+
+
+class PdfDocumentEntry:
+
+    def __init__(self, doc, key):
+        self.handle = doc
+        self.key = key
+        self.refs = 0
+        self.evicted = False
+        self.lock = threading.Lock()
+        self.memory = PAGE_SIZE * len(doc)
+
+    def close(self):
+        self.handle.close()
+
+
+def get_zoom(width, height, size):
+    '''
+    Returns the zoom that fits a page of width x height points in size, a
+    (width, height) in pixels either of which can be None, or that renders it
+    at DPI if size is None.
+    '''
+    if size is None:
+        return DPI / 72.0
+    return min(box / float(points) for box, points in zip(size, (width, height)) if box)
+
+
+def render(doc, index, size):
+    ''' Returns the page of the open PyMuPDF document at index as a JPEG. '''
+    page = doc[index]
+    zoom = get_zoom(page.rect.width, page.rect.height, size)
+    # Older versions of PyMuPDF use camelCase names.
+    get_pixmap = getattr(page, 'get_pixmap', None) or page.getPixmap
+    pix = get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    if Image is None:
+        return pix.tobytes('png') if hasattr(pix, 'tobytes') else pix.getPNGData()
+
+    img = Image.frombytes('RGB', (pix.width, pix.height), pix.samples)
+    output = io.BytesIO()
+    img.save(output, 'JPEG', quality=90)
+    return output.getvalue()
+
+
+class PdfDocumentCache(ZipFileCache):
+    '''
+    Bounded LRU pool of open PyMuPDF documents, keyed by (path, mtime), which
+    works like the ZipFileCache. It also keeps the page counts of
+    max_counts documents, and max_page_memory bytes of rendered pages.
+    '''
+
+    def __init__(self, max_handles=8, max_memory=16 * 1024 * 1024, max_counts=1024,
+                 max_page_memory=32 * 1024 * 1024):
+        super().__init__(max_handles=max_handles, max_memory=max_memory)
+        self.max_counts = max_counts
+        self.max_page_memory = max_page_memory
+        self.counts = OrderedDict()
+        self.pages = OrderedDict()
+        self.page_memory = 0
+
+    def openEntry(self, path, key):
+        return PdfDocumentEntry(fitz.open(path), key)
+
+    def getKey(self, path):
+        st = os.stat(path)
+        return (path, st.st_mtime_ns, st.st_size)
+
+    def getPageCount(self, path):
+        key = self.getKey(path)
+        with self.lock:
+            if key in self.counts:
+                self.counts.move_to_end(key)
+                return self.counts[key]
+
+        if fitz is not None:
+            with self.checkout(path) as doc:
+                count = len(doc)
+        else:
+            with open(path, 'rb') as f:
+                count = PdfFileReader(f).getNumPages()
+
+        with self.lock:
+            self.counts[key] = count
+            while len(self.counts) > self.max_counts:
+                self.counts.popitem(last=False)
+
+        return count
+
+    def renderPage(self, path, index, size=None):
+        '''
+        Returns the image of the page at index (counting from 0), fitted to
+        size if it's given.
+        '''
+        key = self.getKey(path) + (index, size)
+        with self.lock:
+            if key in self.pages:
+                self.pages.move_to_end(key)
+                return self.pages[key]
+
+        if fitz is not None:
+            with self.checkout(path) as doc:
+                if not 0 <= index < len(doc):
+                    raise IOError('No page %d in %s' % (index + 1, path))
+                data = render(doc, index, size)
+        else:
+            if size is None:
+                args = ['-r', str(DPI)]
+            else:
+                args = []
+                for option, value in zip(('-w', '-h'), size):
+                    if value:
+                        args += [option, str(value)]
+            try:
+                data = subprocess.check_output(
+                    ['mudraw'] + args + ['-o', '-', path, str(index + 1)])
+            except subprocess.CalledProcessError as e:
+                raise IOError('Unable to render page %d of %s: %s' % (index + 1, path, e))
+
+        if len(data) <= self.max_page_memory:
+            with self.lock:
+                if key not in self.pages:
+                    self.pages[key] = data
+                    self.page_memory += len(data)
+                while self.page_memory > self.max_page_memory:
+                    old_key, old_data = self.pages.popitem(last=False)
+                    self.page_memory -= len(old_data)
+
+        return data
+
+    def clear(self):
+        super().clear()
+        with self.lock:
+            self.counts.clear()
+            self.pages.clear()
+            self.page_memory = 0
+
+
+pdf_cache = PdfDocumentCache()
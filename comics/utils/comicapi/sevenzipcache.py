@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+'''
+A process wide pool of open 7z archives, with a cache of the files read from
+them.
+
+A 7z archive is usually solid: its files are compressed together in one
+block, so reading a file means decompressing the block from its start up to
+that file. Reading each page on its own would decompress the start of the
+issue again for every page. Instead, reading a page also reads the pages
+after it in the same pass, up to READ_AHEAD_SIZE bytes, and keeps them, so
+reading an issue through only decompresses it a few times over.
+'''
+
+from collections import OrderedDict
+import os
+import tempfile
+import threading
+
+from .zipcache import ZipFileCache
+
+
+# Uncompressed bytes of the following files read along with each file.
+READ_AHEAD_SIZE = 32 * 1024 * 1024
+
+# Rough memory used by each file's header.
+FILEINFO_SIZE = 512
+
+
+class SevenZipEntry:
+
+    def __init__(self, zf, key):
+        self.handle = zf
+        self.key = key
+        self.refs = 0
+        self.evicted = False
+        self.lock = threading.Lock()
+        # The files in the order they are stored, which is the order they
+        # are decompressed in.
+        self.infos = [info for info in zf.list() if not info.is_directory]
+        self.names = [info.filename for info in self.infos]
+        self.memory = sum(FILEINFO_SIZE + len(name) for name in self.names)
+
+    def close(self):
+        self.handle.close()
+
+
+def read_files(zf, targets):
+    ''' Returns a dict of the data of each of targets in the open SevenZipFile. '''
+    # A SevenZipFile has to be rewound before each read.
+    if hasattr(zf, 'reset'):
+        zf.reset()
+
+    if hasattr(zf, 'read'):
+        return dict((name, data.read()) for name, data in zf.read(targets=targets).items())
+
+    # Newer versions of py7zr can only extract to a directory.
+    files = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        zf.extract(path=tmp_dir, targets=targets)
+        for name in targets:
+            with open(os.path.join(tmp_dir, name), 'rb') as f:
+                files[name] = f.read()
+    return files
+
+
+class SevenZipFileCache(ZipFileCache):
+    '''
+    Bounded LRU pool of open SevenZipFile handles, which works like the
+    ZipFileCache. It also keeps max_file_memory bytes of the files read from
+    them.
+    '''
+
+    def __init__(self, opener, max_handles=8, max_memory=16 * 1024 * 1024,
+                 max_file_memory=64 * 1024 * 1024, read_ahead=READ_AHEAD_SIZE):
+        super().__init__(max_handles=max_handles, max_memory=max_memory, opener=opener)
+        self.max_file_memory = max_file_memory
+        self.read_ahead = read_ahead
+        self.files = OrderedDict()
+        self.file_memory = 0
+
+    def openEntry(self, path, key):
+        return SevenZipEntry(self.opener(path, 'r'), key)
+
+    def getNames(self, path):
+        entry = self.acquire(path)
+        try:
+            return list(entry.names)
+        finally:
+            self.release(entry)
+
+    def readFile(self, path, name):
+        entry = self.acquire(path)
+        try:
+            key = (path,) + entry.key
+            with self.lock:
+                if key + (name,) in self.files:
+                    self.files.move_to_end(key + (name,))
+                    return self.files[key + (name,)]
+
+            if name not in entry.names:
+                raise IOError('No file %s in %s' % (name, path))
+
+            # The file, and the ones after it up to read_ahead bytes.
+            start = entry.names.index(name)
+            targets = [name]
+            size = 0
+            for info in entry.infos[start + 1:]:
+                size += getattr(info, 'uncompressed', 0) or 0
+                if size > self.read_ahead:
+                    break
+                targets.append(info.filename)
+
+            with entry.lock:
+                files = read_files(entry.handle, targets)
+        finally:
+            self.release(entry)
+
+        with self.lock:
+            for target in targets:
+                data = files.get(target)
+                if data is None or key + (target,) in self.files:
+                    continue
+                self.files[key + (target,)] = data
+                self.file_memory += len(data)
+            while self.file_memory > self.max_file_memory and self.files:
+                old_key, old_data = self.files.popitem(last=False)
+                self.file_memory -= len(old_data)
+
+        if name not in files:
+            raise IOError('Unable to read %s from %s' % (name, path))
+        return files[name]
+
+    def clear(self):
+        super().clear()
+        with self.lock:
+            self.files.clear()
+            self.file_memory = 0
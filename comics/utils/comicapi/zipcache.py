@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+'''
+A process wide pool of open ZipFile handles.
+
+Opening a ZipFile reads and parses the archive's central directory, which is
+wasted work when the same archive is read over and over (like the pages of
+an issue that's being read). The pool keeps the most recently used handles
+open, so a page read only costs a seek and a decompress.
+'''
+
+from collections import OrderedDict
+from contextlib import contextmanager
+import os
+import threading
+import zipfile
+
+
+# Rough memory used by each ZipInfo kept in a ZipFile's directory.
+ZIPINFO_SIZE = 512
+
+
+class ZipFileEntry:
+
+    def __init__(self, zf, key):
+        self.zf = zf
+        self.handle = zf
+        self.key = key
+        self.refs = 0
+        self.evicted = False
+        self.lock = threading.Lock()
+        self.memory = sum(ZIPINFO_SIZE + len(info.filename)
+                          for info in zf.infolist())
+
+    def close(self):
+        self.zf.close()
+
+
+class ZipFileCache:
+    '''
+    Bounded LRU pool of open ZipFile handles, keyed by (path, mtime).
+
+    Any class with the ZipFile interface can be pooled by passing it as the
+    opener, e.g. rarfile.RarFile.
+
+    Handles are evicted when there are more than max_handles of them, or their
+    directories use more than max_memory bytes. A handle is invalidated when
+    the file's mtime or size changes. Evicted handles that are still checked
+    out are only closed once they are returned.
+    '''
+
+    def __init__(self, max_handles=32, max_memory=32 * 1024 * 1024, opener=zipfile.ZipFile):
+        self.max_handles = max_handles
+        self.opener = opener
+        self.max_memory = max_memory
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.memory = 0
+        self.pid = os.getpid()
+
+    @contextmanager
+    def checkout(self, path):
+        ''' Context manager that returns the open ZipFile for path. '''
+        entry = self.acquire(path)
+        try:
+            with entry.lock:
+                yield entry.handle
+        finally:
+            self.release(entry)
+
+    def isZipFile(self, path):
+        try:
+            with self.checkout(path):
+                return True
+        except (OSError, zipfile.BadZipfile):
+            return False
+
+    def acquire(self, path):
+        st = os.stat(path)
+        key = (st.st_mtime_ns, st.st_size)
+
+        with self.lock:
+            self.checkPid()
+            entry = self.entries.get(path)
+            if entry is not None and entry.key == key:
+                self.entries.move_to_end(path)
+                entry.refs += 1
+                return entry
+
+        # Don't hold the lock while reading the archive's directory.
+        new_entry = self.openEntry(path, key)
+
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry.key == key:
+                # Another thread opened it while we were.
+                new_entry.close()
+                self.entries.move_to_end(path)
+                entry.refs += 1
+                return entry
+
+            if entry is not None:
+                self.evict(path)
+            new_entry.refs = 1
+            self.entries[path] = new_entry
+            self.memory += new_entry.memory
+            self.trim()
+
+        return new_entry
+
+    def openEntry(self, path, key):
+        return ZipFileEntry(self.opener(path, 'r'), key)
+
+    def release(self, entry):
+        with self.lock:
+            entry.refs -= 1
+            if entry.evicted and entry.refs == 0:
+                entry.close()
+
+    def invalidate(self, path):
+        ''' Closes any open handle for path, e.g. after it has been written. '''
+        with self.lock:
+            if path in self.entries:
+                self.evict(path)
+
+    def clear(self):
+        with self.lock:
+            for path in list(self.entries):
+                self.evict(path)
+
+    def evict(self, path):
+        # Must be called with the lock held.
+        entry = self.entries.pop(path)
+        self.memory -= entry.memory
+        entry.evicted = True
+        if entry.refs == 0:
+            entry.close()
+
+    def trim(self):
+        # Must be called with the lock held. Always keeps the newest entry.
+        while len(self.entries) > 1 and (len(self.entries) > self.max_handles or
+                                         self.memory > self.max_memory):
+            self.evict(next(iter(self.entries)))
+
+    def checkPid(self):
+        # Handles inherited from a parent process share their file offsets
+        # with it, so a forked process starts with an empty pool.
+        if self.pid != os.getpid():
+            self.entries = OrderedDict()
+            self.memory = 0
+            self.pid = os.getpid()
+
+
+zip_cache = ZipFileCache()
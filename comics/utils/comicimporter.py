@@ -1,26 +1,27 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 import itertools
 import json
 import logging
 import os
 import re
 from urllib.parse import unquote_plus
-from urllib.request import urlretrieve
 
 from django.conf import settings
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from django.utils.text import slugify
 import requests
-import requests_cache
 
 from comics.models import (Arc, Character, Creator, Issue,
                            Publisher, Role, Roles, Series,
                            Team, Settings)
 
-from . import utils
-from .comicapi.comicarchive import MetaDataStyle, ComicArchive
+from . import comicvine, fileindex, utils
+from .comicapi.comicarchive import MetaDataStyle
 from .comicapi.issuestring import IssueString
+from .reader import create_pages
+from .scanner import read_comic_metadata, scan_comic_files
+from .slugs import SlugAllocator
 
 
 ARCS_FOLDER = 'arcs'
@@ -31,16 +32,6 @@ PUBLISHERS_FOLDER = 'publishers'
 TEAMS_FOLDERS = 'teams'
 
 
-def get_recursive_filelist(pathlist):
-    # Get a recursive list of all files under all path items in the list.
-    filelist = []
-    if os.path.isdir(pathlist):
-        for root, dirs, files in os.walk(pathlist):
-            for f in files:
-                filelist.append(os.path.join(root, f))
-    return filelist
-
-
 class CVTypeID:
     Character = '4005'
     Issue = '4000'
@@ -57,15 +48,18 @@ class ComicImporter(object):
         # Configure logging
         logging.getLogger("requests").setLevel(logging.WARNING)
         self.logger = logging.getLogger('bamf')
-        # Setup requests caching
-        expire_after = timedelta(hours=1)
-        requests_cache.install_cache('cv-cache',
-                                     backend='redis',
-                                     expire_after=expire_after)
-        requests_cache.core.remove_expired_responses()
         # temporary values until settings view is created.
         self.api_key = Settings.get_solo().api_key
         self.directory_path = Settings.get_solo().comics_directory
+        self.workers = getattr(settings, 'IMPORT_WORKERS', 1)
+        self.read_count = 0
+        self.failed_paths = set()
+        self.cv = comicvine.get_session()
+        self.issue_futures = {}
+        self.credit_futures = {}
+        # Slugs are allocated from memory for the rest of the import.
+        self.slugs = dict((model, SlugAllocator(model))
+                          for model in (Arc, Character, Creator, Issue, Series, Team))
         # API Strings
         self.baseurl = 'https://comicvine.gamespot.com/api'
         self.imageurl = 'https://comicvine.gamespot.com/api/image/'
@@ -110,14 +104,17 @@ class ComicImporter(object):
                 remove = True
 
         if remove:
-            series = Series.objects.get(id=comic.series.id)
-            s_count = series.issue_count
-            # If this is the only issue for a series, delete the series.
-            if s_count == 1:
-                series.delete()
-                self.logger.info('Deleting series: %s' % series)
-            else:
-                comic.delete()
+            self.removeComic(comic)
+
+    def removeComic(self, comic):
+        series = Series.objects.get(id=comic.series.id)
+        s_count = series.issue_count
+        # If this is the only issue for a series, delete the series.
+        if s_count == 1:
+            series.delete()
+            self.logger.info('Deleting series: %s' % series)
+        else:
+            comic.delete()
 
     def getCVObjectData(self, response):
         '''
@@ -160,7 +157,7 @@ class ComicImporter(object):
                     if response['description']:
                         desc = response['description']
 
-        # Get Image
+        # Get Image url (the image is downloaded later, by queueImage)
         image = ''
         if 'image' in response:
             if response['image']:
@@ -168,12 +165,7 @@ class ComicImporter(object):
                     response['image']['super_url'].rsplit('/', 1)[-1]
                 image_filename = unquote_plus(image_url.split('/')[-1])
                 if image_filename != '1-male-good-large.jpg' and not re.match(".*question_mark_large.*.jpg", image_filename):
-                    try:
-                        image = utils.test_image(urlretrieve(
-                            image_url, 'media/images/' + image_filename)[0])
-                    except OSError as e:
-                        self.logger.error('%s' % e)
-                        image = None
+                    image = image_url
 
         # Create data object
         data = {
@@ -189,72 +181,46 @@ class ComicImporter(object):
         return data
 
     def refreshCharacterData(self, cvid):
-        issue_params = self.base_params
-        issue_params['field_list'] = self.character_fields
-
-        try:
-            resp = requests.get(
-                self.baseurl + '/character/' +
-                CVTypeID.Character + '-' + str(cvid),
-                params=issue_params,
-                headers=self.headers,
-            ).json()
-        except requests.exceptions.RequestException as e:
-            self.logger.error('%s' % e)
+        resp = self.getResponse(self.fetch(
+            self.baseurl + '/character/' + CVTypeID.Character + '-' + str(cvid),
+            self.character_fields, refresh=True))
+        if resp is None:
             return False
 
         data = self.getCVObjectData(resp['results'])
 
-        # Currently I'm not refreshing the image until the
-        # cropping code is refactored, so let's remove the image.
-        os.remove(data['image'])
-
         character = Character.objects.get(cvid=cvid)
         character.desc = data['desc']
         character.save()
+        if data['image']:
+            self.queueImage(character, 'image', data['image'], CHARACTERS_FOLDERS)
         self.logger.info('Refreshed metadata for: %s' % character)
 
         return True
 
     def refreshCreatorData(self, cvid):
-        issue_params = self.base_params
-        issue_params['field_list'] = self.creator_fields
-
-        try:
-            resp = requests.get(
-                self.baseurl + '/person/' + CVTypeID.Person + '-' + str(cvid),
-                params=issue_params,
-                headers=self.headers,
-            ).json()
-        except requests.exceptions.RequestException as e:
-            self.logger.error('%s' % e)
+        resp = self.getResponse(self.fetch(
+            self.baseurl + '/person/' + CVTypeID.Person + '-' + str(cvid),
+            self.creator_fields, refresh=True))
+        if resp is None:
             return False
 
         data = self.getCVObjectData(resp['results'])
 
-        # Currently I'm not refreshing the image until the
-        # cropping code is refactored, so let's remove the image.
-        os.remove(data['image'])
-
         creator = Creator.objects.get(cvid=cvid)
         creator.desc = data['desc']
         creator.save()
+        if data['image']:
+            self.queueImage(creator, 'image', data['image'], CREATORS_FOLDERS)
         self.logger.info('Refresh metadata for: %s' % creator)
 
         return True
 
     def refreshIssueData(self, cvid):
-        issue_params = self.base_params
-        issue_params['field_list'] = self.refresh_issue_fields
-
-        try:
-            resp = requests.get(
-                self.baseurl + '/issue/' + CVTypeID.Issue + '-' + str(cvid),
-                params=issue_params,
-                headers=self.headers,
-            ).json()
-        except requests.exceptions.RequestException as e:
-            self.logger.error('%s' % e)
+        resp = self.getResponse(self.fetch(
+            self.baseurl + '/issue/' + CVTypeID.Issue + '-' + str(cvid),
+            self.refresh_issue_fields, refresh=True))
+        if resp is None:
             return False
 
         data = self.getCVObjectData(resp['results'])
@@ -268,17 +234,10 @@ class ComicImporter(object):
         return True
 
     def refreshSeriesData(self, cvid):
-        issue_params = self.base_params
-        issue_params['field_list'] = self.series_fields
-
-        try:
-            resp = requests.get(
-                self.baseurl + '/volume/' + CVTypeID.Volume + '-' + str(cvid),
-                params=issue_params,
-                headers=self.headers,
-            ).json()
-        except requests.exceptions.RequestException as e:
-            self.logger.error('%s' % e)
+        resp = self.getResponse(self.fetch(
+            self.baseurl + '/volume/' + CVTypeID.Volume + '-' + str(cvid),
+            self.series_fields, refresh=True))
+        if resp is None:
             return False
 
         data = self.getCVObjectData(resp['results'])
@@ -292,181 +251,174 @@ class ComicImporter(object):
         return True
 
     def refreshPublisherData(self, cvid):
-        issue_params = self.base_params
-        issue_params['field_list'] = self.publisher_fields
-
-        try:
-            resp = requests.get(
-                self.baseurl + '/publisher/' +
-                CVTypeID.Publisher + '-' + str(cvid),
-                params=issue_params,
-                headers=self.headers,
-            ).json()
-        except requests.exceptions.RequestException as e:
-            self.logger.error('%s' % e)
+        resp = self.getResponse(self.fetch(
+            self.baseurl + '/publisher/' + CVTypeID.Publisher + '-' + str(cvid),
+            self.publisher_fields, refresh=True))
+        if resp is None:
             return False
 
         data = self.getCVObjectData(resp['results'])
 
-        # Currently I'm not refreshing the image until the
-        # cropping code is refactored, so let's remove the image.
-        os.remove(data['image'])
-
         publisher = Publisher.objects.get(cvid=cvid)
         publisher.desc = data['desc']
         publisher.save()
+        if data['image']:
+            self.queueImage(publisher, 'logo', data['image'], PUBLISHERS_FOLDER)
         self.logger.info('Refresh metadata for: %s' % publisher)
 
         return True
 
     def refreshTeamData(self, cvid):
-        issue_params = self.base_params
-        issue_params['field_list'] = self.team_fields
-
-        try:
-            resp = requests.get(
-                self.baseurl + '/team/' + CVTypeID.Team + '-' + str(cvid),
-                params=issue_params,
-                headers=self.headers,
-            ).json()
-        except requests.exceptions.RequestException as e:
-            self.logger.error('%s' % e)
+        resp = self.getResponse(self.fetch(
+            self.baseurl + '/team/' + CVTypeID.Team + '-' + str(cvid),
+            self.team_fields, refresh=True))
+        if resp is None:
             return False
 
         data = self.getCVObjectData(resp['results'])
 
-        # Currently I'm not refreshing the image until the
-        # cropping code is refactored, so let's remove the image.
-        os.remove(data['image'])
-
         team = Team.objects.get(cvid=cvid)
         team.desc = data['desc']
         team.save()
+        if data['image']:
+            self.queueImage(team, 'image', data['image'], TEAMS_FOLDERS)
         self.logger.info('Refreshed metadata for: %s' % team)
 
         return True
 
     def refreshArcData(self, cvid):
-        issue_params = self.base_params
-        issue_params['field_list'] = self.arc_fields
-
-        try:
-            resp = requests.get(
-                self.baseurl + '/story_arc/' +
-                CVTypeID.StoryArc + '-' + str(cvid),
-                params=issue_params,
-                headers=self.headers,
-            ).json()
-        except requests.exceptions.RequestException as e:
-            self.logger.error('%s' % e)
+        resp = self.getResponse(self.fetch(
+            self.baseurl + '/story_arc/' + CVTypeID.StoryArc + '-' + str(cvid),
+            self.arc_fields, refresh=True))
+        if resp is None:
             return False
 
         data = self.getCVObjectData(resp['results'])
 
-        # Currently I'm not refreshing the image until the
-        # cropping code is refactored, so let's remove the image.
-        os.remove(data['image'])
-
         arc = Arc.objects.get(cvid=cvid)
         arc.desc = data['desc']
         arc.save()
+        if data['image']:
+            self.queueImage(arc, 'image', data['image'], ARCS_FOLDER)
         self.logger.info('Refreshed metadata for: %s' % arc)
 
         return True
 
-    def getIssue(self, issue_cvid):
-        issue_params = self.base_params
-        issue_params['field_list'] = self.issue_fields
+    def fetch(self, api_url, fields, refresh=False):
+        '''
+        Starts fetching a Comic Vine resource in the background, returning a
+        Future with its json response. With refresh, any stored response is
+        revalidated with Comic Vine.
+        '''
+        params = dict(self.base_params, field_list=fields)
+        return self.cv.fetch(api_url, params, self.headers, refresh)
 
+    def getResponse(self, future):
         try:
-            response = requests.get(
-                self.baseurl + '/issue/' +
-                CVTypeID.Issue + '-' + str(issue_cvid),
-                params=issue_params,
-                headers=self.headers,
-            ).json()
+            return future.result()
         except (requests.exceptions.RequestException, json.decoder.JSONDecodeError) as e:
             self.logger.error('%s' % e)
-            response = None
+            return None
 
-        return response
+    def fetchIssues(self, md_list):
+        '''
+        Starts fetching the Comic Vine issue of every metadata object in
+        md_list, so they download while the earlier issues are being added.
+        '''
+        for md in md_list:
+            cvID = None if md.isEmpty else self.getIssueCVID(md)
+            if cvID is not None and cvID not in self.issue_futures:
+                self.issue_futures[cvID] = self.fetch(
+                    self.baseurl + '/issue/' + CVTypeID.Issue + '-' + str(cvID),
+                    self.issue_fields)
 
-    def setIssueDetail(self, issue_cvid, issue_response):
+    def fetchCredits(self, results):
+        '''
+        Starts fetching the detail information for all the characters, story
+        arcs, teams and creators in an issue that aren't in the database yet,
+        plus the rosters of all its teams.
 
-        data = self.getCVObjectData(issue_response['results'])
+        The Futures are kept in credit_futures, keyed by their api_detail_url.
+        '''
+        credits = (('character_credits', Character, self.character_fields),
+                   ('story_arc_credits', Arc, self.arc_fields),
+                   ('team_credits', Team, self.team_fields),
+                   ('person_credits', Creator, self.creator_fields))
+
+        for key, model, fields in credits:
+            existing = set(model.objects.filter(
+                cvid__in=[c['id'] for c in results[key]]).values_list('cvid', flat=True))
+            for credit in results[key]:
+                # Teams are always needed, to add any existing characters to them.
+                if credit['id'] not in existing or model is Team:
+                    url = credit['api_detail_url']
+                    if url not in self.credit_futures:
+                        self.credit_futures[url] = self.fetch(url, fields)
+
+    def getIssue(self, issue_cvid):
+        future = self.issue_futures.pop(issue_cvid, None)
+        if future is None:
+            future = self.fetch(
+                self.baseurl + '/issue/' + CVTypeID.Issue + '-' + str(issue_cvid),
+                self.issue_fields)
+
+        return self.getResponse(future)
+
+    def setIssueDetail(self, issue_cvid, issue_response, cover=None):
+        results = issue_response['results']
+        if cover:
+            # The cover was read from the archive, so don't download it.
+            results = dict(results, image=None)
+
+        data = self.getCVObjectData(results)
 
         issue = Issue.objects.get(cvid=issue_cvid)
-        if data['image'] != None:
-            issue.cover = utils.resize_images(data['image'], ISSUES_FOLDER)
-            os.remove(data['image'])
+        if cover:
+            issue.cover = cover
         issue.desc = data['desc']
         issue.save()
+        if data['image']:
+            self.queueImage(issue, 'cover', data['image'], ISSUES_FOLDER)
 
         return True
 
-    def getSeries(self, api_url):
-        params = self.base_params
-        params['field_list'] = self.series_fields
+    def getSeries(self, api_url, future=None):
+        if future is None:
+            future = self.fetch(api_url, self.series_fields)
 
-        try:
-            response = requests.get(
-                api_url,
-                params=params,
-                headers=self.headers,
-            ).json()
-        except requests.exceptions.RequestException as e:
-            self.logger.error('s' % e)
+        response = self.getResponse(future)
+        if response is None:
             return None
 
         data = self.getCVObjectData(response['results'])
 
         return data
 
-    def getPublisher(self, response_issue):
-        series_params = self.base_params
-        series_params['field_list'] = 'publisher'
+    def getPublisher(self, response_issue, future=None):
+        if future is None:
+            future = self.fetch(
+                response_issue['results']['volume']['api_detail_url'], 'publisher')
 
-        try:
-            response_series = requests.get(
-                response_issue['results']['volume']['api_detail_url'],
-                params=series_params,
-                headers=self.headers,
-            ).json()
-        except requests.exceptions.RequestException as e:
-            self.logger.error('%s' % e)
+        response_series = self.getResponse(future)
+        if response_series is None:
             return None
 
-        params = self.base_params
-        params['field_list'] = self.publisher_fields
-
         api_url = response_series['results']['publisher']['api_detail_url']
 
-        try:
-            response = requests.get(
-                api_url,
-                params=params,
-                headers=self.headers,
-            ).json()
-        except requests.exceptions.RequestException as e:
-            self.logger.error('%s', e)
+        response = self.getResponse(self.fetch(api_url, self.publisher_fields))
+        if response is None:
             return None
 
         data = self.getCVObjectData(response['results'])
 
         return data
 
-    def getDetailInfo(self, db_obj, fields, api_url):
-        params = self.base_params
-        params['field_list'] = fields
+    def getDetailInfo(self, db_obj, fields, api_url, img_dir, future=None):
+        if future is None:
+            future = self.fetch(api_url, fields)
 
-        try:
-            response = requests.get(
-                api_url,
-                params=params,
-                headers=self.headers,
-            ).json()
-        except (requests.exceptions.RequestException, json.decoder.JSONDecodeError) as e:
-            self.logger.error('%s' % e)
+        response = self.getResponse(future)
+        if response is None:
             return False
 
         data = self.getCVObjectData(response['results'])
@@ -476,37 +428,26 @@ class ComicImporter(object):
             db_obj.year = data['year']
         db_obj.cvurl = data['cvurl']
         db_obj.desc = data['desc']
-        # If the image name from Comic Vine is too large, don't save it since it will
-        # cause a DB error. Using 132 as the value since that will take into account the
-        # upload_to value from the longest models (Characters & Pubishers).
-        if (len(data['image']) < 132):
-            db_obj.image = data['image']
         db_obj.save()
+        if data['image']:
+            self.queueImage(db_obj, 'image', data['image'], img_dir)
 
         return True
 
-    def getTeamCharacters(self, api_url):
-        params = self.base_params
-        params['field_list'] = self.team_fields
-
-        try:
-            response = requests.get(
-                api_url,
-                params=params,
-                headers=self.headers,
-            ).json()
-        except (requests.exceptions.RequestException, json.decoder.JSONDecodeError) as e:
-            self.logger.error('%s' % e)
-            response = None
+    def getTeamCharacters(self, api_url, future=None):
+        if future is None:
+            future = self.fetch(api_url, self.team_fields)
 
-        return response
+        return self.getResponse(future)
 
-    def create_images(self, db_obj, img_dir):
-        base_name = os.path.basename(db_obj.image.name)
-        old_image_path = settings.MEDIA_ROOT + '/images/' + base_name
-        db_obj.image = utils.resize_images(db_obj.image, img_dir)
-        db_obj.save()
-        os.remove(old_image_path)
+    def queueImage(self, db_obj, field, url, img_dir):
+        '''
+        Queues the download of an object's image, which is saved to its field
+        once it arrives.
+        '''
+        # Imported here, since the tasks module imports this one.
+        from comics.tasks import download_image_task
+        download_image_task(db_obj._meta.model_name, db_obj.pk, field, url, img_dir)
 
     def getIssueCVID(self, md):
         # Get the issues cvid
@@ -531,47 +472,39 @@ class ComicImporter(object):
         return cvID
 
     def getComicMetadata(self, path):
-        # TODO: Need to fix the default image path
-        ca = ComicArchive(path, default_image_path=None)
-        if ca.seemsToBeAComicArchive():
-            self.logger.info(
-                "Reading in {0} {1}".format(self.read_count, path))
-            self.read_count += 1
-            if ca.hasMetadata(MetaDataStyle.CIX):
-                style = MetaDataStyle.CIX
-            elif ca.hasMetadata(MetaDataStyle.CBI):
-                style = MetaDataStyle.CBI
-            else:
-                style = None
+        md = read_comic_metadata(path, settings.MEDIA_ROOT)
+        if md is not None:
+            self.logReadIn(md)
+        return md
 
-            if style is not None:
-                md = ca.readMetadata(style)
-            else:
-                # No metadata in comic. Make some guesses from filename.
-                md = ca.metadataFromFilename()
-
-            md.path = ca.path
-            md.page_count = ca.page_count
-            md.mod_ts = datetime.utcfromtimestamp(os.path.getmtime(ca.path))
+    def logReadIn(self, md):
+        self.logger.info(
+            "Reading in {0} {1}".format(self.read_count, md.path))
+        self.read_count += 1
 
-            return md
-        return None
+    def addIssueFromMetadata(self, md):
+        '''
+        Adds the issue for a comic's metadata, along with its series and
+        publisher. Its credits are added later by addCredits.
 
-    def addComicFromMetadata(self, md):
+        Returns a tuple of the issue and its Comic Vine results, or None if the
+        issue couldn't be added.
+        '''
         if not md.isEmpty:
             # Let's get the issue Comic Vine id from the archive's metadata
             # If it's not there we'll skip the issue.
             cvID = self.getIssueCVID(md)
             if cvID is None:
-                issue_name = md.series + ' #' + md.number
+                issue_name = md.series + ' #' + md.issue
                 self.logger.info(
                     'No Comic Vine ID for: %s... skipping.' % issue_name)
-                return False
+                return None
 
             # let's get the issue info from CV.
             issue_response = self.getIssue(cvID)
             if issue_response is None:
-                return False
+                self.failed_paths.add(md.path)
+                return None
 
             # Add the Publisher to the database.
             if md.publisher is not None:
@@ -582,31 +515,33 @@ class ComicImporter(object):
             # Check the series cvid to see if we've already added
             # the series. If not, call the detail api for it.
             series_cvid = issue_response['results']['volume']['id']
+            series_url = issue_response['results']['volume']['api_detail_url']
+            series_future = None
             if series_cvid is not None:
                 series_obj, s_create = Series.objects.get_or_create(
                     cvid=int(series_cvid),)
                 if s_create:
-                    series_url = issue_response['results'][
-                        'volume']['api_detail_url']
-                    data = self.getSeries(series_url)
-                    if data is not None:
-                        # Create the slug & make sure it's not a duplicate
-                        new_slug = orig = slugify(data['name'])
-                        for x in itertools.count(1):
-                            if not Series.objects.filter(slug=new_slug).exists():
-                                break
-                            new_slug = '%s-%d' % (orig, x)
-
-                        sort_name = utils.create_series_sortname(data['name'])
-                        series_obj.slug = new_slug
-                        series_obj.cvurl = data['cvurl']
-                        series_obj.name = data['name']
-                        series_obj.sort_title = sort_name
-                        series_obj.publisher = publisher_obj
-                        series_obj.year = data['year']
-                        series_obj.desc = data['desc']
-                        series_obj.save()
-                        self.logger.info('Added series: %s' % series_obj)
+                    series_future = self.fetch(series_url, self.series_fields)
+
+            # Start fetching everything else we need from Comic Vine, so that
+            # the requests run concurrently instead of one after another.
+            if p_create:
+                publisher_future = self.fetch(series_url, 'publisher')
+            self.fetchCredits(issue_response['results'])
+
+            if series_future is not None:
+                data = self.getSeries(series_url, series_future)
+                if data is not None:
+                    sort_name = utils.create_series_sortname(data['name'])
+                    series_obj.cvurl = data['cvurl']
+                    series_obj.name = data['name']
+                    series_obj.sort_title = sort_name
+                    series_obj.publisher = publisher_obj
+                    series_obj.year = data['year']
+                    series_obj.desc = data['desc']
+                    # Create the slug & make sure it's not a duplicate
+                    self.slugs[Series].save(series_obj, data['name'])
+                    self.logger.info('Added series: %s' % series_obj)
 
             # Ugh, deal wih the timezone
             current_timezone = timezone.get_current_timezone()
@@ -634,19 +569,11 @@ class ComicImporter(object):
             else:
                 slugy = series_obj.name + ' ' + fixed_number
 
-            new_slug = orig = slugify(slugy)
-
-            for x in itertools.count(1):
-                if not Issue.objects.filter(slug=new_slug).exists():
-                    break
-                new_slug = '%s-%d' % (orig, x)
-
             try:
                 # Create the issue
-                issue_obj = Issue.objects.create(
+                issue_obj = Issue(
                     file=md.path,
                     name=str(md.title),
-                    slug=new_slug,
                     number=fixed_number,
                     date=pub_date,
                     page_count=md.page_count,
@@ -654,13 +581,16 @@ class ComicImporter(object):
                     cvid=int(cvID),
                     mod_ts=tz,
                     series=series_obj,)
+                self.slugs[Issue].save(issue_obj, slugy)
             except IntegrityError as e:
                 self.logger.error('%s' % e)
                 self.logger.info('Skipping: %s' % md.path)
-                return
+                return None
+
+            create_pages(issue_obj, md.page_index)
 
             # Set the issue image & short description.
-            res = self.setIssueDetail(cvID, issue_response)
+            res = self.setIssueDetail(cvID, issue_response, md.cover)
             if res:
                 self.logger.info("Added: %s" % issue_obj)
             else:
@@ -670,206 +600,295 @@ class ComicImporter(object):
             # Adding new publisher we need to grab
             # some additional data from Comic Vine.
             if p_create:
-                p = self.getPublisher(issue_response)
+                p = self.getPublisher(issue_response, publisher_future)
                 if p is not None:
                     publisher_obj.cvid = int(p['cvid'])
                     publisher_obj.cvurl = p['cvurl']
                     publisher_obj.desc = p['desc']
                     publisher_obj.save()
-                    if p['image'] is not '':
-                        publisher_obj.logo = utils.resize_images(p['image'],
-                                                                 PUBLISHERS_FOLDER)
-                        # Delete the original image
-                        os.remove(p['image'])
+                    if p['image']:
+                        self.queueImage(publisher_obj, 'logo', p['image'],
+                                        PUBLISHERS_FOLDER)
                     self.logger.info('Added publisher: %s' % publisher_obj)
 
-            # Add the characters.
-            for ch in issue_response['results']['character_credits']:
-                character_obj, ch_create = Character.objects.get_or_create(
-                    cvid=ch['id'],)
-                issue_obj.characters.add(character_obj)
-
-                if ch_create:
-                    new_slug = orig = slugify(ch['name'])
-                    for x in itertools.count(1):
-                        if not Character.objects.filter(slug=new_slug).exists():
-                            break
-                        new_slug = '%s-%d' % (orig, x)
-
-                    character_obj.name = ch['name']
-                    character_obj.slug = new_slug
-                    character_obj.save()
-                    # Alright get the detail information now.
-                    res = self.getDetailInfo(character_obj,
-                                             self.character_fields,
-                                             ch['api_detail_url'])
-
-                    if character_obj.image:
-                        self.create_images(character_obj, CHARACTERS_FOLDERS)
-
-                    if res:
-                        self.logger.info('Added character: %s' % character_obj)
-                    else:
-                        self.logger.warning(
-                            'No Character detail was saved for: %s' % character_obj)
-
-            # Add the storyarc.
-            for story_arc in issue_response['results']['story_arc_credits']:
-                story_obj, s_create = Arc.objects.get_or_create(
-                    cvid=story_arc['id'],)
-                issue_obj.arcs.add(story_obj)
+            return issue_obj, issue_response['results']
 
-                if s_create:
-                    new_slug = orig = slugify(story_arc['name'])
-                    for x in itertools.count(1):
-                        if not Arc.objects.filter(slug=new_slug).exists():
-                            break
-                        new_slug = '%s-%d' % (orig, x)
-
-                    story_obj.name = story_arc['name']
-                    story_obj.slug = new_slug
-                    story_obj.save()
-
-                    res = self.getDetailInfo(story_obj,
-                                             self.arc_fields,
-                                             story_arc['api_detail_url'])
-
-                    if story_obj.image:
-                        self.create_images(story_obj, ARCS_FOLDER)
-
-                    if res:
-                        self.logger.info('Added storyarc: %s' % story_obj)
-                    else:
-                        self.logger.info('Not Story Arc detail info available for: %s'
-                                         % story_obj)
-
-            # Add the teams
-            for team in issue_response['results']['team_credits']:
-                team_obj, t_create = Team.objects.get_or_create(
-                    cvid=team['id'],)
-                issue_obj.teams.add(team_obj)
-
-                # Add any existing character to the team.
-                c_response = self.getTeamCharacters(team['api_detail_url'])
-                if c_response is not None:
-                    for character in c_response['results']['characters']:
-                        match = Character.objects.filter(cvid=character['id'])
-                        if match:
-                            match[0].teams.add(team_obj)
-
-                if t_create:
-                    new_slug = orig = slugify(team['name'])
-                    for x in itertools.count(1):
-                        if not Team.objects.filter(slug=new_slug).exists():
-                            break
-                        new_slug = '%s-%d' % (orig, x)
-
-                    team_obj.name = team['name']
-                    team_obj.slug = new_slug
-                    team_obj.save()
-
-                    res = self.getDetailInfo(team_obj,
-                                             self.team_fields,
-                                             team['api_detail_url'])
-
-                    if team_obj.image:
-                        self.create_images(team_obj, TEAMS_FOLDERS)
-
-                    if res:
-                        self.logger.info('Added team: %s' % team_obj)
-                    else:
-                        self.logger.info('No Team detail info available for: %s'
-                                         % team_obj)
-
-            # Add the creators
-            for p in issue_response['results']['person_credits']:
-                creator_obj, c_create = Creator.objects.get_or_create(
-                    cvid=p['id'],)
-
-                role_obj = Roles.objects.create(
-                    creator=creator_obj, issue=issue_obj)
-
-                roles = p['role'].split(',')
-                for role in roles:
-                    # Remove any whitespace
-                    role = role.strip()
-                    r, r_create = Role.objects.get_or_create(name=role.title())
-                    role_obj.role.add(r)
-
-                if c_create:
-                    new_slug = orig = slugify(p['name'])
-                    for x in itertools.count(1):
-                        if not Creator.objects.filter(slug=new_slug).exists():
-                            break
-                        new_slug = '%s-%d' % (orig, x)
-
-                    creator_obj.name = p['name']
-                    creator_obj.slug = new_slug
-                    creator_obj.save()
-
-                    res = self.getDetailInfo(creator_obj,
-                                             self.creator_fields,
-                                             p['api_detail_url'])
-
-                    if creator_obj.image:
-                        self.create_images(creator_obj, CREATORS_FOLDERS)
-
-                    if res:
-                        self.logger.info('Added creator: %s' % creator_obj)
-                    else:
-                        self.logger.info('No Creator detail info available for: %s'
-                                         % creator_obj)
-
-            return True
+    def getObjectsByCVID(self, model, cvids):
+        objs = {}
+        for chunk in fileindex.chunks(set(cvids)):
+            for obj in model.objects.filter(cvid__in=chunk):
+                objs[obj.cvid] = obj
+        return objs
 
-    def commitMetadataList(self, md_list):
-        for md in md_list:
-            self.addComicFromMetadata(md)
+    def resolveCredits(self, model, credits, fields, img_dir):
+        '''
+        Returns a dictionary of objects keyed by cvid for a list of credits,
+        creating the ones that aren't in the database yet with a single bulk
+        insert and then adding their detail information.
+        '''
+        credits = dict((credit['id'], credit) for credit in credits)
+        objs = self.getObjectsByCVID(model, credits)
 
-    def import_comic_files(self):
-        filelist = get_recursive_filelist(self.directory_path)
-        filelist = sorted(filelist, key=os.path.getmtime)
+        missing = [credit for cvid, credit in credits.items() if cvid not in objs]
+        if not missing:
+            return objs
+
+        new_objs = [model(cvid=credit['id'],
+                          name=credit['name'],
+                          slug=self.slugs[model].allocate(credit['name']))
+                    for credit in missing]
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(new_objs)
+        except IntegrityError:
+            # Another import added some of them at the same time,
+            # so fall back to adding them one at a time.
+            for obj in new_objs:
+                try:
+                    self.slugs[model].save(obj, obj.name)
+                except IntegrityError as e:
+                    self.logger.error('%s' % e)
 
-        # Grab the entire issue table into memory
-        comics_list = Issue.objects.all()
+        # Bulk inserts don't set the primary keys on every database.
+        created = self.getObjectsByCVID(model, (credit['id'] for credit in missing))
+        objs.update(created)
 
-        # Remove from the database any missing or changed files
-        for comic in comics_list:
-            self.checkIfRemovedOrModified(comic, self.directory_path)
+        name = model._meta.verbose_name
+        for credit in missing:
+            obj = created.get(credit['id'])
+            if obj is None:
+                continue
 
-        comics_list = None
+            url = credit['api_detail_url']
+            res = self.getDetailInfo(obj, fields, url, img_dir,
+                                     self.credit_futures.get(url))
 
-        # Load the issue table again to take into account any
-        # issues remove from the database
-        c_list = Issue.objects.all()
+            if res:
+                self.logger.info('Added %s: %s' % (name, obj))
+            else:
+                self.logger.warning('No %s detail was saved for: %s' % (name, obj))
+
+        return objs
+
+    def addIssueLinks(self, field, objs, issues, key):
+        # The issues were just created, so none of the rows exist yet.
+        through = field.through
+        column = field.field.related_model._meta.model_name + '_id'
+        rows = set()
+        for issue, results in issues:
+            for credit in results[key]:
+                if credit['id'] in objs:
+                    rows.add((issue.id, objs[credit['id']].id))
+
+        through.objects.bulk_create([through(**{'issue_id': issue_id, column: obj_id})
+                                     for issue_id, obj_id in rows])
+
+    def addTeamCharacters(self, teams, credits):
+        # Add any existing characters to the teams.
+        members = {}
+        for credit in credits:
+            team = teams.get(credit['id'])
+            if team is None or team.id in members:
+                continue
+            url = credit['api_detail_url']
+            response = self.getTeamCharacters(url, self.credit_futures.get(url))
+            if response is not None:
+                members[team.id] = [c['id'] for c in response['results']['characters']]
+
+        characters = self.getObjectsByCVID(
+            Character, itertools.chain.from_iterable(members.values()))
+
+        through = Character.teams.through
+        existing = set(through.objects.filter(
+            team_id__in=list(members)).values_list('character_id', 'team_id'))
+        rows = set()
+        for team_id, cvids in members.items():
+            for cvid in cvids:
+                if cvid in characters:
+                    row = (characters[cvid].id, team_id)
+                    if row not in existing:
+                        rows.add(row)
+
+        through.objects.bulk_create([through(character_id=character_id, team_id=team_id)
+                                     for character_id, team_id in rows])
+        # Let clients that sync the catalog know about the new teams.
+        Character.objects.filter(id__in=set(row[0] for row in rows)).update(
+            modified=timezone.now())
+
+    def getRoles(self, names):
+        roles = dict((r.name, r) for r in Role.objects.filter(name__in=names))
+        missing = [name for name in names if name not in roles]
+        if missing:
+            Role.objects.bulk_create([Role(name=name) for name in missing])
+            roles = dict((r.name, r) for r in Role.objects.filter(name__in=names))
+        return roles
+
+    def addCreatorRoles(self, creators, issues):
+        credited = {}
+        for issue, results in issues:
+            for p in results['person_credits']:
+                if p['id'] not in creators:
+                    continue
+                names = credited.setdefault((issue.id, creators[p['id']].id), set())
+                # Remove any whitespace
+                names.update(role.strip().title() for role in p['role'].split(','))
+
+        Roles.objects.bulk_create([Roles(issue_id=issue_id, creator_id=creator_id)
+                                   for issue_id, creator_id in credited])
+
+        # Re-read the rows, since bulk inserts don't set the primary keys
+        # on every database.
+        roles_ids = dict(((r.issue_id, r.creator_id), r.id) for r in Roles.objects.filter(
+            issue_id__in=[issue.id for issue, results in issues]))
+        roles = self.getRoles(set(itertools.chain.from_iterable(credited.values())))
+
+        through = Roles.role.through
+        through.objects.bulk_create([through(roles_id=roles_ids[key], role_id=roles[name].id)
+                                     for key, names in credited.items()
+                                     for name in names])
+
+    def addCredits(self, issues):
+        '''
+        Adds the characters, story arcs, teams and creators for a list of
+        (issue, results) tuples. The credits for all the issues are resolved
+        together, so the number of queries doesn't grow with each credit.
+        '''
+        if not issues:
+            return
+
+        def credits(key):
+            return [credit for issue, results in issues for credit in results[key]]
+
+        characters = self.resolveCredits(Character, credits('character_credits'),
+                                         self.character_fields, CHARACTERS_FOLDERS)
+        self.addIssueLinks(Issue.characters, characters, issues, 'character_credits')
+
+        arcs = self.resolveCredits(Arc, credits('story_arc_credits'),
+                                   self.arc_fields, ARCS_FOLDER)
+        self.addIssueLinks(Issue.arcs, arcs, issues, 'story_arc_credits')
 
-        # Make a list of all path string in issue table
-        db_pathlist = []
-        for comic in c_list:
-            db_pathlist.append(comic.file)
+        teams = self.resolveCredits(Team, credits('team_credits'),
+                                    self.team_fields, TEAMS_FOLDERS)
+        self.addIssueLinks(Issue.teams, teams, issues, 'team_credits')
+        self.addTeamCharacters(teams, credits('team_credits'))
 
-        c_list = None
+        creators = self.resolveCredits(Creator, credits('person_credits'),
+                                       self.creator_fields, CREATORS_FOLDERS)
+        self.addCreatorRoles(creators, issues)
 
-        # Now let's remove any existing files in the database
-        # from the directory list of files.
-        for f in db_pathlist:
-            if f in filelist:
-                filelist.remove(f)
-        db_pathlist = None
+        # The issues were saved before their credits were added.
+        Issue.objects.filter(id__in=[issue.id for issue, results in issues]).update(
+            modified=timezone.now())
+
+    def addComicFromMetadata(self, md):
+        return self.commitMetadataList([md]) > 0
+
+    def commitMetadataList(self, md_list):
+        self.fetchIssues(md_list)
+        issues = []
+        for md in md_list:
+            issue = self.addIssueFromMetadata(md)
+            if issue is not None:
+                issues.append(issue)
+
+        # Credits shared by several issues are only looked up once.
+        self.addCredits(issues)
+        self.issue_futures = {}
+        self.credit_futures = {}
+
+        return len(issues)
+
+    def removeComicFiles(self, paths):
+        for chunk in fileindex.chunks(paths):
+            for comic in Issue.objects.filter(file__in=chunk):
+                self.logger.info("Removing {0}".format(comic.file))
+                self.removeComic(comic)
+
+    def getNewComicFiles(self, paths):
+        # Files that aren't in the file index yet may have been imported
+        # before the index existed, so leave out any already in the database.
+        existing = set()
+        for chunk in fileindex.chunks(paths):
+            existing.update(Issue.objects.filter(
+                file__in=chunk).values_list('file', flat=True))
+
+        return [path for path in paths if path not in existing]
+
+    def importChanges(self, indexed, current):
+        changes = {fileindex.ADDED: [],
+                   fileindex.MODIFIED: [],
+                   fileindex.REMOVED: []}
+        for change, path in fileindex.diff_file_index(indexed, current):
+            changes[change].append(path)
+
+        added = changes[fileindex.ADDED]
+        modified = changes[fileindex.MODIFIED]
+        removed = changes[fileindex.REMOVED]
+
+        # Remove from the database any missing or changed files
+        self.removeComicFiles(removed + modified)
 
+        filelist = self.getNewComicFiles(added) + modified
+        filelist.sort(key=lambda path: current[path].mtime)
+        self.failed_paths = set()
+
+        # The archives are read in parallel by the scanner, while the
+        # database work is done here as the metadata comes in.
         md_list = []
         self.read_count = 0
-        for filename in filelist:
-            md = self.getComicMetadata(filename)
-            if md is not None:
-                md_list.append(md)
+        for md in scan_comic_files(filelist, workers=self.workers,
+                                   media_root=settings.MEDIA_ROOT,
+                                   failed=self.failed_paths):
+            self.logReadIn(md)
+            md_list.append(md)
 
-            if self.read_count % 100 == 0 and self.read_count != 0:
-                if len(md_list) > 0:
-                    self.commitMetadataList(md_list)
-                    md_list = []
+            if len(md_list) >= 100:
+                self.commitMetadataList(md_list)
+                md_list = []
 
         if len(md_list) > 0:
             self.commitMetadataList(md_list)
 
+        # Files that couldn't be read, or couldn't be imported because of a
+        # Comic Vine error, are left out of the index, so that they are
+        # retried on the next import.
+        fileindex.update_file_index(
+            current,
+            (path for path in added + modified if path not in self.failed_paths),
+            removed)
+
+    def import_comic_files(self):
+        indexed = fileindex.load_file_index()
+        current = fileindex.get_file_states(self.directory_path)
+
+        if not indexed:
+            # Without a file index we have to check every issue instead.
+            for comic in Issue.objects.select_related('series'):
+                self.checkIfRemovedOrModified(comic, self.directory_path)
+
+        self.importChanges(indexed, current)
+
         self.logger.info('Finished importing..')
+
+    def import_comic_paths(self, paths):
+        '''
+        Imports only the given files, instead of scanning the whole comics
+        directory. Any directories in paths are scanned recursively, and
+        paths that no longer exist are removed from the database. A path in
+        a folder comic imports the whole folder.
+        '''
+        paths = [path for path in paths
+                 if os.path.abspath(path).startswith(
+                     os.path.abspath(self.directory_path) + os.sep)]
+        if not paths:
+            return
+
+        paths = sorted(set(fileindex.get_folder_comic(path, self.directory_path) or path
+                           for path in paths))
+
+        indexed = fileindex.load_file_index(paths)
+        current = fileindex.get_path_states(paths)
+
+        self.importChanges(indexed, current)
+
+        self.logger.info('Finished importing %d paths..' % len(paths))
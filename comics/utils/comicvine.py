@@ -0,0 +1,301 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+from django.conf import settings
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# Comic Vine allows 200 requests per resource (issue, volume, etc.) per hour.
+REQUESTS_PER_HOUR = 200
+WORKERS = 8
+# Seconds to wait for Comic Vine to connect or send data.
+TIMEOUT = 30
+
+DAY = 24 * 60 * 60
+# How long stored responses are used before they are revalidated, in seconds.
+CACHE_TTLS = {
+    'character': 30 * DAY,
+    'issue': 30 * DAY,
+    'person': 30 * DAY,
+    'publisher': 30 * DAY,
+    'story_arc': 30 * DAY,
+    # Team rosters and series change more often.
+    'team': 7 * DAY,
+    'volume': 7 * DAY,
+}
+DEFAULT_TTL = DAY
+
+# e.g. /api/issue/4000-1234/
+RESOURCE_RE = re.compile(r'/api/(?P<resource>\w+)/\d+-(?P<cvid>\d+)/?$')
+
+
+class OfflineError(requests.exceptions.RequestException):
+    ''' Raised for a response that isn't stored, when working offline. '''
+
+
+class TokenBucket(object):
+    '''
+    Thread-safe token bucket, which allows bursts of up to capacity
+    requests and then refills at rate tokens per second.
+    '''
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        ''' Blocks until a token is available and takes it. '''
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity,
+                                  self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class RateLimiter(object):
+    ''' Keeps a separate token bucket for each Comic Vine resource type. '''
+
+    def __init__(self, requests_per_hour):
+        self.requests_per_hour = requests_per_hour
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def getResource(self, url):
+        # e.g. https://comicvine.gamespot.com/api/issue/4000-1234/
+        parts = urlparse(url).path.strip('/').split('/')
+        if len(parts) > 1:
+            return parts[1]
+        return ''
+
+    def acquire(self, url):
+        resource = self.getResource(url)
+        with self.lock:
+            bucket = self.buckets.get(resource)
+            if bucket is None:
+                bucket = TokenBucket(self.requests_per_hour / 3600.0,
+                                     self.requests_per_hour)
+                self.buckets[resource] = bucket
+        bucket.acquire()
+
+
+class ResponseStore(object):
+    '''
+    Keeps Comic Vine responses on disk, with one file for each resource,
+    e.g. issue/1234.json.
+
+    Requests for different fields of the same resource share its file: a
+    request for fields that are already stored is answered from it, and the
+    fields of a new response are merged into it.
+
+    Responses older than their resource's TTL are revalidated with a
+    conditional request. When offline, stored responses are always used
+    and nothing is ever requested.
+    '''
+
+    def __init__(self, directory, ttls=None, offline=False):
+        self.directory = directory
+        self.ttls = dict(CACHE_TTLS, **(ttls or {}))
+        self.offline = offline
+
+    def getKey(self, url):
+        match = RESOURCE_RE.search(urlparse(url).path)
+        if match is None:
+            return None
+        return match.group('resource'), match.group('cvid')
+
+    def getPath(self, key):
+        resource, cvid = key
+        return os.path.join(self.directory, resource, cvid + '.json')
+
+    def load(self, key):
+        try:
+            with open(self.getPath(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, key, entry):
+        path = self.getPath(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first, so a reader never sees half a file.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            os.remove(tmp_path)
+            raise
+
+    def isFresh(self, key, entry, now=None):
+        if now is None:
+            now = time.time()
+        ttl = self.ttls.get(key[0], DEFAULT_TTL)
+        return now - entry['fetched'] < ttl
+
+    def hasFields(self, entry, fields):
+        # A field list of None means all the fields.
+        if entry['fields'] is None:
+            return True
+        if fields is None:
+            return False
+        return set(fields.split(',')) <= set(entry['fields'])
+
+    def update(self, key, entry, fields, data, headers):
+        ''' Stores a new response, merging it with any fresh stored one. '''
+        new_entry = {
+            'fetched': time.time(),
+            'fields': fields.split(',') if fields is not None else None,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'response': data,
+        }
+
+        if (entry is not None and self.isFresh(key, entry) and
+                entry['fields'] is not None and fields is not None):
+            results = dict(entry['response']['results'])
+            results.update(data['results'])
+            new_entry['response'] = dict(data, results=results)
+            new_entry['fields'] = sorted(set(entry['fields']) | set(fields.split(',')))
+            new_entry['fetched'] = entry['fetched']
+            # The validators only apply to one set of fields.
+            new_entry['etag'] = new_entry['last_modified'] = None
+
+        self.save(key, new_entry)
+        return new_entry
+
+
+class ComicVineSession(object):
+    '''
+    Fetches Comic Vine resources from a pool of threads, sharing a keep-alive
+    connection pool and a rate limiter between them.
+
+    Identical requests that are made while the first one is still running
+    share its result instead of making another request. Responses are kept
+    in the ResponseStore, if there is one.
+    '''
+
+    def __init__(self, workers=WORKERS, requests_per_hour=REQUESTS_PER_HOUR,
+                 store=None):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.limiter = RateLimiter(requests_per_hour)
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.store = store
+
+    def download(self, url, params, headers):
+        self.limiter.acquire(url)
+        return self.session.get(url, params=params, headers=headers, timeout=TIMEOUT)
+
+    def request(self, url, params, headers, refresh=False):
+        key = self.store.getKey(url) if self.store is not None else None
+        if key is None:
+            return self.download(url, params, headers).json()
+
+        fields = params.get('field_list')
+        entry = self.store.load(key)
+        usable = entry is not None and self.store.hasFields(entry, fields)
+        if usable and (self.store.offline or
+                       (not refresh and self.store.isFresh(key, entry))):
+            return entry['response']
+        if self.store.offline:
+            raise OfflineError('No stored response for %s %s' % key)
+
+        headers = dict(headers or {})
+        if usable:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            response = self.download(url, params, headers)
+        except requests.exceptions.RequestException:
+            # Better a stale response than none at all.
+            if usable:
+                return entry['response']
+            raise
+
+        if usable and response.status_code == 304:
+            entry['fetched'] = time.time()
+            self.store.save(key, entry)
+            return entry['response']
+
+        data = response.json()
+        # Only keep successful responses.
+        if data.get('status_code') == 1:
+            self.store.update(key, entry, fields, data, response.headers)
+
+        return data
+
+    def fetch(self, url, params, headers=None, refresh=False):
+        '''
+        Starts fetching url and returns a Future with its decoded json
+        response. With refresh, a stored response is revalidated even if it
+        hasn't expired yet.
+        '''
+        key = (url, tuple(sorted(params.items())), refresh)
+        with self.lock:
+            future = self.in_flight.get(key)
+            if future is not None:
+                return future
+            future = self.executor.submit(self.request, url, params, headers, refresh)
+            self.in_flight[key] = future
+
+        # Outside the lock, since the callback runs right away (in this thread)
+        # if the request has already finished.
+        future.add_done_callback(lambda f: self.done(key, f))
+
+        return future
+
+    def done(self, key, future):
+        with self.lock:
+            if self.in_flight.get(key) is future:
+                del self.in_flight[key]
+
+    def get(self, url, params, headers=None, refresh=False):
+        ''' Fetches url and waits for its decoded json response. '''
+        return self.fetch(url, params, headers, refresh).result()
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    ''' Returns the ComicVineSession shared by everything in this process. '''
+    global _session
+    with _session_lock:
+        if _session is None:
+            store = None
+            directory = getattr(settings, 'COMICVINE_CACHE_DIR', None)
+            if directory:
+                store = ResponseStore(directory,
+                                      ttls=getattr(settings, 'COMICVINE_CACHE_TTLS', None),
+                                      offline=getattr(settings, 'COMICVINE_OFFLINE', False))
+            _session = ComicVineSession(
+                workers=getattr(settings, 'COMICVINE_WORKERS', WORKERS),
+                requests_per_hour=getattr(settings, 'COMICVINE_REQUESTS_PER_HOUR',
+                                          REQUESTS_PER_HOUR),
+                store=store)
+        return _session
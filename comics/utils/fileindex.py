@@ -0,0 +1,215 @@
+from collections import namedtuple
+from functools import reduce
+import operator
+import os
+
+from django.db import transaction
+from django.db.models import Q
+
+from comics.models import ComicFile
+
+
+ADDED = 'added'
+MODIFIED = 'modified'
+REMOVED = 'removed'
+
+# Number of paths used in a single 'path__in' query.
+CHUNK_SIZE = 500
+
+FileState = namedtuple('FileState', ['size', 'mtime', 'inode'])
+
+# A directory of images, with no comic archives anywhere under it, is a
+# folder comic.
+ARCHIVE_EXTENSIONS = ('.cbz', '.cbr', '.cb7', '.zip', '.rar', '.7z', '.pdf')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+
+def chunks(items, size=CHUNK_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def is_folder_comic(path):
+    '''
+    Returns whether the directory at path is a folder comic: it has images in
+    it, and no comic archives in it or in any of its subdirectories. A
+    directory with a cover image next to a subdirectory of archives isn't one.
+    '''
+    try:
+        names = [entry.name.lower() for entry in os.scandir(path)
+                 if not entry.name.startswith('.') and entry.is_file()]
+    except OSError:
+        return False
+
+    if not any(name.endswith(IMAGE_EXTENSIONS) for name in names):
+        return False
+
+    for root, dirs, files in os.walk(path):
+        dirs[:] = [name for name in dirs if not name.startswith('.')]
+        if any(name.lower().endswith(ARCHIVE_EXTENSIONS) for name in files
+               if not name.startswith('.')):
+            return False
+
+    return True
+
+
+def get_folder_state(path):
+    '''
+    Returns the FileState of a folder comic, which changes whenever any of the
+    files or directories in it do.
+    '''
+    st = os.stat(path)
+    size = 0
+    mtime = st.st_mtime_ns
+    for root, dirs, files in os.walk(path):
+        # Renaming a file only changes its directory's mtime.
+        for item in [root] + [os.path.join(root, name) for name in files]:
+            try:
+                item_st = os.stat(item)
+            except OSError:
+                continue
+            if item != root:
+                size += item_st.st_size
+            mtime = max(mtime, item_st.st_mtime_ns)
+
+    return FileState(size, mtime, st.st_ino)
+
+
+def get_folder_comic(path, directory):
+    '''
+    Returns the folder comic that path is (or is in), or None if it isn't
+    part of one. Like get_file_states(), this is the highest folder comic
+    under the comics directory, which is never one itself.
+    '''
+    directory = os.path.abspath(directory)
+    folder = None
+    parent = os.path.abspath(path)
+    while parent.startswith(directory + os.sep):
+        if is_folder_comic(parent):
+            folder = parent
+        parent = os.path.dirname(parent)
+
+    return folder
+
+
+def get_file_states(directory):
+    '''
+    Walks the directory and returns a dictionary of the FileState of every
+    file under it, keyed by the file's path. Each folder comic has a single
+    FileState, and isn't walked any further.
+    '''
+    states = {}
+    if not os.path.isdir(directory):
+        return states
+
+    dirs = [directory]
+    while dirs:
+        path = dirs.pop()
+        if path != directory and is_folder_comic(path):
+            try:
+                states[path] = get_folder_state(path)
+            except OSError:
+                pass
+            continue
+
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            continue
+
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.path)
+                elif entry.is_file():
+                    st = entry.stat()
+                    states[entry.path] = FileState(
+                        st.st_size, st.st_mtime_ns, st.st_ino)
+            except OSError:
+                # The file was removed while we were walking the directory.
+                pass
+
+    return states
+
+
+def get_path_states(paths):
+    '''
+    Returns the FileState of each of the paths that still exists, keyed by
+    path. Folder comics have a single FileState, and other directories are
+    walked with get_file_states().
+    '''
+    states = {}
+    for path in paths:
+        if is_folder_comic(path):
+            try:
+                states[path] = get_folder_state(path)
+            except OSError:
+                pass
+        elif os.path.isdir(path):
+            states.update(get_file_states(path))
+        elif os.path.isfile(path):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            states[path] = FileState(st.st_size, st.st_mtime_ns, st.st_ino)
+
+    return states
+
+
+def load_file_index(paths=None):
+    '''
+    Returns the persisted FileState of every file, keyed by path. If paths is
+    given, only the entries for those paths (or any files under them, in case
+    they are directories) are returned.
+    '''
+    queryset = ComicFile.objects.all()
+    if paths is not None:
+        if not paths:
+            return {}
+        queryset = queryset.filter(
+            reduce(operator.or_,
+                   (Q(path=path) | Q(path__startswith=path.rstrip(os.sep) + os.sep)
+                    for path in paths)))
+
+    index = {}
+    for path, size, mtime, inode in queryset.values_list(
+            'path', 'size', 'mtime', 'inode').iterator():
+        index[path] = FileState(size, mtime, inode)
+
+    return index
+
+
+def diff_file_index(indexed, current):
+    '''
+    Compares the persisted file index against the current file states, and
+    yields an (ADDED|MODIFIED|REMOVED, path) tuple for every file that changed.
+    '''
+    for path, state in current.items():
+        old_state = indexed.get(path)
+        if old_state is None:
+            yield ADDED, path
+        elif old_state != state:
+            yield MODIFIED, path
+
+    for path in indexed:
+        if path not in current:
+            yield REMOVED, path
+
+
+def update_file_index(current, paths, removed):
+    '''
+    Writes the current FileState of each path in paths to the index, and
+    removes the entries for any removed paths.
+    '''
+    paths = list(paths)
+    with transaction.atomic():
+        for chunk in chunks(paths + list(removed)):
+            ComicFile.objects.filter(path__in=chunk).delete()
+
+        ComicFile.objects.bulk_create(
+            (ComicFile(path=path, size=current[path].size,
+                       mtime=current[path].mtime, inode=current[path].inode)
+             for path in paths),
+            batch_size=CHUNK_SIZE)
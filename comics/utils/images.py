@@ -0,0 +1,69 @@
+'''
+Downloads the Comic Vine images of the imported objects.
+
+The downloads are made by the download_image_task, outside of the import, so
+a slow image host never holds it up. Every download shares one pool of
+keep-alive connections, and at most DOWNLOADS run at the same time.
+'''
+
+import io
+import threading
+
+from django.conf import settings
+from PIL import Image
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import thumbnails
+
+
+# Number of images downloaded at the same time.
+DOWNLOADS = 4
+# Seconds to wait for the image host to connect or send data.
+TIMEOUT = 30
+# Number of times a failed download is retried, and the seconds to wait before
+# the first retry, which is doubled for each one after it.
+RETRIES = 5
+RETRY_DELAY = 60
+
+_session = None
+_session_lock = threading.Lock()
+_downloads = threading.BoundedSemaphore(getattr(settings, 'IMAGE_DOWNLOADS', DOWNLOADS))
+
+
+def get_session():
+    ''' Returns the requests Session shared by every image download. '''
+    global _session
+    with _session_lock:
+        if _session is None:
+            size = getattr(settings, 'IMAGE_DOWNLOADS', DOWNLOADS)
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+            _session.headers['user-agent'] = 'bamf'
+        return _session
+
+
+def get_retry_delay(attempt):
+    return getattr(settings, 'IMAGE_RETRY_DELAY', RETRY_DELAY) * 2 ** attempt
+
+
+def download_image(url):
+    ''' Returns the contents of the image at url. '''
+    with _downloads:
+        response = get_session().get(url, timeout=TIMEOUT)
+    response.raise_for_status()
+    return response.content
+
+
+def save_image(data, folder, media_root):
+    '''
+    Saves the thumbnails of the image in data, and returns its name. Raises
+    OSError if data isn't an image Pillow can open.
+    '''
+    # Only reads the header, the image is decoded by create_thumbnails.
+    Image.open(io.BytesIO(data))
+    name = thumbnails.get_image_name(data, folder)
+    thumbnails.create_thumbnails(data, name, media_root)
+    return name
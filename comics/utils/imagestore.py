@@ -0,0 +1,76 @@
+'''
+Keeps track of which images in MEDIA_ROOT/images are still used.
+
+Images are named after their contents (see thumbnails), so several objects
+can share one image. An image's reference count is the number of rows in the
+IMAGE_FIELDS that point to it: when the last of them lets go of it, its files
+are deleted. collect_garbage removes whatever is left over, such as the
+files of an import that was interrupted.
+'''
+
+import os
+import time
+
+from django.apps import apps
+
+from . import thumbnails
+
+
+# The models (in the comics app) and fields that point to images.
+IMAGE_FIELDS = (('Arc', 'image'), ('Character', 'image'), ('Creator', 'image'),
+                ('Issue', 'cover'), ('Publisher', 'logo'), ('Team', 'image'))
+
+# Files newer than this (in seconds) are never collected, since they may belong
+# to an image whose download hasn't been saved to its object yet.
+GRACE_PERIOD = 60 * 60
+
+
+def get_image_fields():
+    return [(apps.get_model('comics', model), field) for model, field in IMAGE_FIELDS]
+
+
+def count_references(name):
+    count = 0
+    for model, field in get_image_fields():
+        count += model.objects.filter(**{field: name}).count()
+    return count
+
+
+def get_referenced_names():
+    names = set()
+    for model, field in get_image_fields():
+        names.update(model.objects.exclude(**{field: ''}).values_list(field, flat=True))
+    return names
+
+
+def release(name, media_root, references=0):
+    '''
+    Deletes the files of the image called name if no more than references
+    rows still point to it, e.g. 1 for an object that is about to be deleted.
+    '''
+    if name and count_references(name) <= references:
+        thumbnails.delete_thumbnails(name, media_root)
+
+
+def collect_garbage(media_root, grace_period=GRACE_PERIOD, dry_run=False):
+    '''
+    Deletes every file in media_root/images that doesn't belong to an image
+    in the database, and returns their names.
+    '''
+    keep = set()
+    for name in get_referenced_names():
+        keep.update(thumbnails.get_thumbnail_names(name))
+
+    cutoff = time.time() - grace_period
+    removed = []
+    for root, dirs, files in os.walk(os.path.join(media_root, 'images')):
+        for filename in files:
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, media_root).replace(os.sep, '/')
+            if name in keep or os.path.getmtime(path) > cutoff:
+                continue
+            if not dry_run:
+                os.remove(path)
+            removed.append(name)
+
+    return removed
@@ -0,0 +1,153 @@
+'''
+Keeps the pages a reader is about to turn to in memory.
+
+Every page that's requested, and every update of a reader's position, starts
+reading the next few pages of the archive in the background, so turning the
+page doesn't have to wait for the archive to be decompressed. If the reader
+asks for its pages at a size, they are scaled down to it as well. The pages
+of all the users share a budget of CACHE_SIZE bytes, and the least recently
+used go first. Each process serving pages has its own cache, so the most memory
+used is CACHE_SIZE times the number of processes.
+'''
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import logging
+import os
+import threading
+
+from django.conf import settings
+
+from comics.models import Page
+from . import pageresize
+from .reader import ImageAPIHandler, read_page
+
+
+# The number of pages read ahead of the reader.
+PREFETCH = 4
+
+# The most memory (in bytes) used by the pages of all the users.
+CACHE_SIZE = 128 * 1024 * 1024
+
+# The number of pages read at the same time.
+WORKERS = 2
+
+logger = logging.getLogger('bamf')
+
+
+def get_page_key(path, st, index, size=None):
+    # The key changes whenever the archive does. Pages scaled down to a size
+    # are kept apart from the whole page.
+    key = (path, st.st_mtime_ns, st.st_size, index)
+    return key if size is None else key + (size,)
+
+
+class PageCache(object):
+    '''
+    Holds an OrderedDict mapping (user_id, page key) to the page's (data,
+    content_type), with the least recently used first. The pages of all the
+    users count towards the same cache_size.
+    '''
+
+    def __init__(self, prefetch=PREFETCH, cache_size=CACHE_SIZE, executor=None):
+        self.prefetch = prefetch
+        self.cache_size = cache_size
+        self.executor = executor or ThreadPoolExecutor(max_workers=WORKERS)
+        self.pages = OrderedDict()
+        self.size = 0
+        self.loading = set()
+        self.lock = threading.Lock()
+
+    def get(self, user_id, key):
+        with self.lock:
+            page = self.pages.get((user_id, key))
+            if page is not None:
+                self.pages.move_to_end((user_id, key))
+            return page
+
+    def put(self, user_id, key, data, content_type):
+        if len(data) > self.cache_size:
+            return
+
+        with self.lock:
+            if (user_id, key) in self.pages:
+                self.size -= len(self.pages.pop((user_id, key))[0])
+            self.pages[(user_id, key)] = (data, content_type)
+            self.size += len(data)
+
+            while self.size > self.cache_size:
+                old_data, old_type = self.pages.popitem(last=False)[1]
+                self.size -= len(old_data)
+
+    def load(self, user_id, path, st, pages, size=None):
+        '''
+        Starts reading the pages that aren't cached yet in the background,
+        scaled down to size if it isn't None.
+        '''
+        for page in pages:
+            key = get_page_key(path, st, page.index, size)
+            with self.lock:
+                if (user_id, key) in self.pages or (user_id, key) in self.loading:
+                    continue
+                self.loading.add((user_id, key))
+            self.executor.submit(self.read, user_id, path, st, page, size)
+
+    def read(self, user_id, path, st, page, size=None):
+        key = get_page_key(path, st, page.index, size)
+        try:
+            if size is None:
+                data, content_type = read_page_data(path, page)
+            else:
+                # The scaled page is saved the same way as the page view does,
+                # so it's only made once. PDF pages are rendered at the size,
+                # like the page view does, instead of being scaled down.
+                data, content_type = pageresize.get_resized_page(
+                    get_page_key(path, st, page.index), size,
+                    partial(read_page_data, path, page, size), pageresize.get_cache_dir())
+            self.put(user_id, key, data, content_type)
+        except Exception as e:
+            logger.warning('Unable to read page %d of %s: %s' % (page.index, path, e))
+        finally:
+            with self.lock:
+                self.loading.discard((user_id, key))
+
+
+def read_page_data(path, page, size=None):
+    # Only the pages of a PDF are read at size.
+    data = read_page(path, page, size)
+    return data, page.media_type or ImageAPIHandler().getMimeType(data)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    ''' Returns the PageCache shared by everything in this process. '''
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PageCache(getattr(settings, 'PAGE_PREFETCH', PREFETCH),
+                               getattr(settings, 'PAGE_CACHE_SIZE', CACHE_SIZE))
+        return _cache
+
+
+def prefetch_pages(user_id, issue, start, st=None, size=None):
+    '''
+    Starts reading the issue's pages from index start for the user, scaled
+    down to size if it isn't None.
+    '''
+    cache = get_cache()
+    if cache.prefetch <= 0:
+        return
+
+    if st is None:
+        try:
+            st = os.stat(issue.file)
+        except OSError:
+            return
+
+    pages = Page.objects.filter(issue=issue, index__gte=start,
+                                index__lt=start + cache.prefetch)
+    cache.load(user_id, issue.file, st, list(pages), size)
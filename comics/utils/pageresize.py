@@ -0,0 +1,153 @@
+'''
+Scales pages down to the size they are shown at.
+
+The page view can be given the width (w) and/or height (h) in CSS pixels that
+a page is shown at, and the device pixel ratio (dpr). Pages bigger than that
+are scaled down to fit, and saved as WebP (or JPEG if this Pillow can't write
+WebP) in CACHE_DIR, named after the archive, the page and the size, so each
+size of a page is only made once. Sizes are rounded up to a multiple of STEP,
+so that screens of about the same size share their pages.
+'''
+
+import hashlib
+import io
+import logging
+import math
+import os
+
+from django.conf import settings
+from PIL import Image
+
+from .thumbnails import FORMATS, JPEG, WEBP, save_atomic
+
+
+MAX_SIZE = 4096
+MAX_DPR = 4
+STEP = 64
+
+# The most disk space (in bytes) used by the scaled pages.
+CACHE_SIZE = 1024 * 1024 * 1024
+
+FORMAT = WEBP if WEBP in FORMATS else JPEG
+
+logger = logging.getLogger('bamf')
+
+
+def get_cache_dir():
+    return getattr(settings, 'PAGE_RESIZE_CACHE_DIR',
+                   os.path.join(settings.BASE_DIR, 'page-cache'))
+
+
+def get_target_size(params):
+    '''
+    Returns the (width, height) in pixels asked for by params, either of which
+    can be None, or None if no size was asked for.
+    '''
+    try:
+        dpr = float(params.get('dpr', 1))
+    except ValueError:
+        dpr = 1
+    if not dpr >= 1:
+        dpr = 1
+    dpr = min(dpr, MAX_DPR)
+
+    size = []
+    for key in ('w', 'h'):
+        try:
+            value = int(params.get(key, 0))
+        except ValueError:
+            value = 0
+        if value > 0:
+            size.append(min(int(math.ceil(value * dpr / STEP)) * STEP, MAX_SIZE))
+        else:
+            size.append(None)
+
+    if size == [None, None]:
+        return None
+    return tuple(size)
+
+
+def scale(data, width, height):
+    '''
+    Returns the image in data scaled down to fit width x height, or None if
+    it already fits.
+    '''
+    img = Image.open(io.BytesIO(data))
+    box = (width or img.width, height or img.height)
+    if img.width <= box[0] and img.height <= box[1]:
+        return None
+
+    # JPEGs are decoded at the smallest scale that's still at least as big as
+    # box, which is much faster than decoding all of a scan.
+    img.draft('RGB', box)
+    if img.mode in ('RGBA', 'LA') or 'transparency' in img.info:
+        img = img.convert('RGBA')
+    else:
+        img = img.convert('RGB')
+    img.thumbnail(box, Image.LANCZOS)
+
+    return img
+
+
+def get_cache_name(key, size):
+    digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+    width, height = size
+    return os.path.join(digest[:2], '%s-%dx%d%s' % (digest, width or 0, height or 0,
+                                                    FORMAT.ext))
+
+
+def get_resized_page(key, size, read, cache_dir):
+    '''
+    Returns the (data, content_type) of the page with the pagecache key,
+    scaled down to size. read returns the page's own (data, content_type),
+    and is only called if the scaled page isn't in cache_dir yet.
+    '''
+    path = os.path.join(cache_dir, get_cache_name(key, size))
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        # Used pages are the last to be pruned.
+        os.utime(path)
+        return data, FORMAT.media_type
+    except FileNotFoundError:
+        pass
+
+    data, content_type = read()
+    try:
+        img = scale(data, *size)
+        if img is None:
+            return data, content_type
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        save_atomic(img, path, FORMAT)
+        with open(path, 'rb') as f:
+            return f.read(), FORMAT.media_type
+    except (OSError, SyntaxError, ValueError) as e:
+        logger.error('Unable to scale page: %s' % e)
+        return data, content_type
+
+
+def prune(cache_dir, max_size=CACHE_SIZE):
+    ''' Deletes the least recently used pages over max_size bytes. '''
+    files = []
+    for root, dirs, filenames in os.walk(cache_dir):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for mtime, size, path in files)
+    removed = 0
+    for mtime, size, path in sorted(files):
+        if total <= max_size:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+
+    return removed
@@ -1,10 +1,16 @@
-import base64
 import imghdr
 import io
+import re
 
+from django.db import IntegrityError
+from django.http import HttpResponse
 from PIL import Image
 
-from .comicapi.comicarchive import ComicArchive
+from comics.models import Page
+from .comicapi.comicarchive import ComicArchive, ZipArchiver
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
 
 
 class ImageAPIHandler(object):
@@ -21,18 +27,126 @@ class ImageAPIHandler(object):
         i = Image.open(io.BytesIO(image_data))
         w, h = i.size
         if max_height < h:
-            i.thumbnail((w, max), Image.ANTIALIAS)
+            i.draft('RGB', (w, max_height))
+            i = i.convert('RGB')
+            i.thumbnail((w, max_height), Image.LANCZOS)
             output = io.BytesIO()
             i.save(output, format='JPEG')
             return output.getvalue()
         else:
             return image_data
 
-    def get_uri(self, issue_file, page_num):
-        ca = ComicArchive(issue_file)
-        image_data = ca.getPage(int(page_num))
-        image_type = self.getContentType(image_data)
-        base64_data = base64.b64encode(image_data).decode('ascii')
-        uri = 'data:%s;base64,%s' % (image_type, base64_data)
+    def getMimeType(self, image_data):
+        return 'image/' + self.getContentType(image_data).replace('jpg', 'jpeg')
+
+
+def create_pages(issue, page_index):
+    ''' Saves the page index that was read from the issue's archive. '''
+    pages = [Page(issue=issue, index=index, **info)
+             for index, info in enumerate(page_index)]
+    Page.objects.bulk_create(pages)
+
+    return pages
+
+
+def get_pages(issue):
+    '''
+    Returns the pages of the issue. Issues imported before the page index
+    existed have theirs built from the archive the first time.
+    '''
+    pages = list(Page.objects.filter(issue=issue))
+    if not pages:
+        ca = ComicArchive(issue.file)
+        try:
+            pages = create_pages(issue, ca.getPageInfoList())
+        except IntegrityError:
+            # Another request built the index at the same time.
+            pages = list(Page.objects.filter(issue=issue))
+
+    return pages
+
+
+def get_page(issue, index):
+    ''' Returns the issue's page at index, or None if it doesn't exist. '''
+    try:
+        return Page.objects.get(issue=issue, index=index)
+    except Page.DoesNotExist:
+        pass
+
+    pages = get_pages(issue)
+    if index < len(pages):
+        return pages[index]
+
+    return None
+
+
+def read_page(path, page, size=None):
+    '''
+    Reads the page's image from the archive at path. Pages from zip archives
+    are read straight from their offset, without listing the archive. The
+    pages of a PDF are rendered to fit size, if it's given.
+    '''
+    if page.offset is not None:
+        return ZipArchiver(path).readArchiveFileAt(
+            page.name, page.offset, page.size)
+
+    ca = ComicArchive(path)
+    if ca.isPdf():
+        return ca.archiver.readArchiveFile(page.name, size)
+    return ca.archiver.readArchiveFile(page.name)
+
+
+def get_byte_range(header, size):
+    '''
+    Returns the (start, end) of a single byte range header for a body of size
+    bytes, or None for the whole body. Raises ValueError if the range can't
+    be satisfied.
+    '''
+    match = RANGE_RE.match(header.strip())
+    if not match or not any(match.groups()):
+        return None
+
+    start, end = match.groups()
+    if start:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    else:
+        # A suffix range, e.g. the last 500 bytes.
+        start = max(size - int(end), 0)
+        end = size - 1
+
+    if start > end:
+        raise ValueError('Unsatisfiable range: %s' % header)
+
+    return start, end
+
+
+def image_response(request, image_data, content_type, etag):
+    '''
+    Returns a response for the image, supporting single byte ranges.
+    '''
+    size = len(image_data)
+    status = 200
+    content_range = None
+    try:
+        byte_range = get_byte_range(request.META.get('HTTP_RANGE', ''), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = 'bytes */%d' % size
+        return response
+
+    if byte_range is not None:
+        start, end = byte_range
+        image_data = image_data[start:end + 1]
+        status = 206
+        content_range = 'bytes %d-%d/%d' % (start, end, size)
+
+    response = HttpResponse(image_data, content_type=content_type,
+                            status=status)
+    response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = 'private, max-age=86400'
+    if content_range is not None:
+        response['Content-Range'] = content_range
 
-        return uri
+    return response
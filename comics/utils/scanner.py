@@ -0,0 +1,152 @@
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from itertools import chain
+import logging
+import os
+
+from . import thumbnails
+from .comicapi.comicarchive import MetaDataStyle, ComicArchive
+
+
+# Folder in MEDIA_ROOT/images that the issue covers are saved in.
+COVERS_FOLDER = 'issues'
+
+logger = logging.getLogger('bamf')
+
+
+def read_cover(ca, md, media_root):
+    '''
+    Saves the thumbnails of a comic's cover, which is the page marked as the
+    FrontCover in its metadata, or else the first page.
+
+    Returns the name of the cover image, or None if it couldn't be read.
+    '''
+    index = md.getCoverPageIndexList()[0]
+    try:
+        data = ca.getPage(index)
+        if not data:
+            return None
+        name = thumbnails.get_image_name(data, COVERS_FOLDER)
+        thumbnails.create_thumbnails(data, name, media_root)
+    except Exception:
+        return None
+
+    return name
+
+
+def read_comic_metadata(path, media_root=None):
+    '''
+    Reads the metadata from a comic archive. If media_root is given, the
+    thumbnails of its cover are saved there too.
+
+    This needs to be a module level function (and this module shouldn't import
+    any models) so that it can be run in the scanner's worker processes.
+
+    Returns a GenericMetadata object, or None if the file isn't a comic archive.
+    '''
+    # TODO: Need to fix the default image path
+    ca = ComicArchive(path, default_image_path=None)
+    if not ca.seemsToBeAComicArchive():
+        return None
+
+    if ca.hasMetadata(MetaDataStyle.CIX):
+        style = MetaDataStyle.CIX
+    elif ca.hasMetadata(MetaDataStyle.CBI):
+        style = MetaDataStyle.CBI
+    else:
+        style = None
+
+    if style is not None:
+        md = ca.readMetadata(style)
+    else:
+        # No metadata in comic. Make some guesses from filename.
+        md = ca.metadataFromFilename()
+
+    md.path = ca.path
+    md.page_count = ca.page_count
+    md.page_index = ca.getPageInfoList()
+    md.mod_ts = datetime.utcfromtimestamp(os.path.getmtime(ca.path))
+    md.cover = read_cover(ca, md, media_root) if media_root else None
+
+    return md
+
+
+def scan_comic_files(filelist, workers=1, queue_size=None, media_root=None,
+                     failed=None):
+    '''
+    Reads the metadata from each file in filelist, yielding the GenericMetadata
+    of every comic archive as soon as it has been parsed.
+
+    The archives are read by a pool of worker processes, while the caller
+    (which is the only one touching the database) consumes the results. At most
+    queue_size files are in flight at a time, so a slow consumer stops the
+    workers from getting too far ahead of it. Results are yielded in the order
+    they finish, not the order of filelist.
+
+    Files that can't be read are logged and skipped, and if failed is given
+    their paths are added to it, so that they can be tried again later. If a
+    worker dies the files it had in flight are skipped too, and the rest are
+    read by a new pool.
+    '''
+    def skip(path, e):
+        logger.error('Unable to read %s: %s' % (path, e))
+        if failed is not None:
+            failed.add(path)
+
+    if workers <= 1:
+        for path in filelist:
+            try:
+                md = read_comic_metadata(path, media_root)
+            except Exception as e:
+                skip(path, e)
+                continue
+            if md is not None:
+                yield md
+        return
+
+    if queue_size is None:
+        queue_size = workers * 4
+
+    files = iter(filelist)
+    pending = {}
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        while True:
+            broken = False
+            for path in files:
+                try:
+                    future = executor.submit(read_comic_metadata, path, media_root)
+                except BrokenProcessPool:
+                    files = chain([path], files)
+                    broken = True
+                    break
+                pending[future] = path
+                if len(pending) >= queue_size:
+                    break
+
+            if not pending and not broken:
+                break
+
+            done = wait(pending, return_when=ALL_COMPLETED if broken else FIRST_COMPLETED).done
+            while done:
+                for future in done:
+                    path = pending.pop(future)
+                    try:
+                        md = future.result()
+                    except Exception as e:
+                        skip(path, e)
+                        broken = broken or isinstance(e, BrokenProcessPool)
+                        continue
+                    if md is not None:
+                        yield md
+
+                # A dead worker fails everything left in the pool, so all of it
+                # is collected before the pool is replaced.
+                done = wait(pending).done if broken else ()
+
+            if broken:
+                executor.shutdown(wait=False)
+                executor = ProcessPoolExecutor(max_workers=workers)
+    finally:
+        executor.shutdown()
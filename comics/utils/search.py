@@ -0,0 +1,83 @@
+'''
+Searches the names, descriptions and issue numbers of the comics models.
+
+On PostgreSQL every word of a query is matched as a prefix (so "bat sup"
+finds "Batman/Superman" while it's being typed) against a full-text document
+of each object, which has a GIN index, and the results are ranked by how well
+they match. Names also match when the words are anywhere in them, using a
+trigram index. The indexes are created by the add_search_indexes migration,
+from the same expressions as get_document_sql.
+
+Other databases match every word of a query anywhere in the name.
+'''
+
+from functools import reduce
+import operator
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+
+# Names aren't English words, so they shouldn't be stemmed.
+CONFIG = 'simple'
+
+# The fields of each model's document, with their weights.
+DOCUMENTS = {
+    'arc': (('name', 'A'), ('desc', 'C')),
+    'character': (('name', 'A'), ('desc', 'C')),
+    'creator': (('name', 'A'), ('desc', 'C')),
+    'issue': (('name', 'A'), ('number', 'B'), ('desc', 'C')),
+    'publisher': (('name', 'A'), ('desc', 'C')),
+    'series': (('name', 'A'), ('desc', 'C')),
+    'team': (('name', 'A'), ('desc', 'C')),
+}
+
+WORD_RE = re.compile(r'\w+')
+
+
+def get_document_sql(model, qualified=True):
+    quote_name = connection.ops.quote_name
+    table = quote_name(model._meta.db_table) + '.' if qualified else ''
+    parts = []
+    for field, weight in DOCUMENTS[model._meta.model_name]:
+        column = table + quote_name(model._meta.get_field(field).column)
+        parts.append("setweight(to_tsvector('%s', coalesce(%s, '')), '%s')"
+                     % (CONFIG, column, weight))
+    return ' || '.join(parts)
+
+
+def get_tsquery(query):
+    ''' Returns a tsquery matching every word in query as a prefix. '''
+    return ' & '.join(word + ':*' for word in WORD_RE.findall(query))
+
+
+def search(queryset, query):
+    '''
+    Filters queryset down to the objects that match query, annotating each
+    with its search_rank and putting the best matches first.
+    '''
+    words = query.split()
+    if not words:
+        return queryset.none()
+
+    name_matches = reduce(operator.and_, (Q(name__icontains=word) for word in words))
+
+    tsquery = get_tsquery(query)
+    if connection.vendor != 'postgresql' or not tsquery:
+        return queryset.filter(name_matches).annotate(
+            search_rank=Value(0.0, output_field=FloatField()))
+
+    model = queryset.model
+    document = get_document_sql(model)
+    ts_query = "to_tsquery('%s', %%s)" % CONFIG
+    return (
+        queryset
+        .annotate(search_match=RawSQL('%s @@ %s' % (document, ts_query), (tsquery,),
+                                      output_field=BooleanField()),
+                  search_rank=RawSQL('ts_rank(%s, %s)' % (document, ts_query), (tsquery,),
+                                     output_field=FloatField()))
+        .filter(Q(search_match=True) | name_matches)
+        .order_by('-search_rank', *model._meta.ordering)
+    )
@@ -0,0 +1,78 @@
+from django.db import IntegrityError, transaction
+from django.utils.text import slugify
+
+
+class SlugAllocator(object):
+    '''
+    Hands out unique slugs for a model.
+
+    The first time a base slug is seen, the suffixes already used with it
+    (e.g. batman-3) are found with a single query. After that they are kept
+    in memory, so later slugs with the same base don't need any queries.
+    Like probing batman, batman-1, batman-2... each slug gets the first free
+    suffix, so a number that is part of a name (spider-man-2099) is only
+    skipped over, not counted on from.
+
+    Other processes can add slugs while the cached suffixes are in use, so
+    save() allocates a fresh slug and tries again when its slug was taken.
+    '''
+
+    def __init__(self, model, field='slug'):
+        self.model = model
+        self.field = field
+        self.taken = {}
+        self.next_suffix = {}
+
+    def getTakenSuffixes(self, base):
+        ''' Returns the suffixes used with base. Suffix 0 is the base slug itself. '''
+        lookup = {self.field + '__regex': r'^%s(-[0-9]+)?$' % base}
+        slugs = self.model.objects.filter(**lookup).values_list(self.field, flat=True)
+
+        taken = set()
+        for slug in slugs:
+            if slug == base:
+                taken.add(0)
+            else:
+                taken.add(int(slug[len(base) + 1:]))
+
+        return taken
+
+    def allocate(self, name):
+        base = slugify(name)
+        if base not in self.taken:
+            self.taken[base] = self.getTakenSuffixes(base)
+
+        taken = self.taken[base]
+        suffix = self.next_suffix.get(base, 0)
+        while suffix in taken:
+            suffix += 1
+        taken.add(suffix)
+        self.next_suffix[base] = suffix + 1
+
+        if suffix == 0:
+            return base
+        return '%s-%d' % (base, suffix)
+
+    def forget(self, name):
+        ''' Drops the cached suffix for name, so it's read again. '''
+        self.taken.pop(slugify(name), None)
+        self.next_suffix.pop(slugify(name), None)
+
+    def isTaken(self, slug):
+        return self.model.objects.filter(**{self.field: slug}).exists()
+
+    def save(self, obj, name, retries=3):
+        '''
+        Gives obj a unique slug for name and saves it. Any IntegrityError that
+        isn't caused by the slug is raised.
+        '''
+        for attempt in range(retries):
+            setattr(obj, self.field, self.allocate(name))
+            try:
+                with transaction.atomic():
+                    obj.save()
+                return obj
+            except IntegrityError:
+                if attempt == retries - 1 or not self.isTaken(getattr(obj, self.field)):
+                    raise
+                self.forget(name)
@@ -0,0 +1,211 @@
+'''
+Creates the thumbnails used by the list and detail pages.
+
+Every image is saved in several sizes and formats, named after a hash of the
+source image and the sizes and formats it's saved in, e.g.
+images/issues/<hash>.jpg (the detail size JPEG, which is what the model's image
+field points to) and images/issues/<hash>-grid.webp. Templates find the other
+files from the image field's name.
+
+Since the name only depends on the contents, the same image is only ever saved
+once, however many objects use it. See imagestore for how unused images are
+removed.
+'''
+
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import hashlib
+import io
+import logging
+import os
+import tempfile
+
+from PIL import Image
+
+
+Size = namedtuple('Size', ['name', 'width', 'height'])
+
+GRID = Size('grid', 160, 243)
+DETAIL = Size('detail', 320, 487)
+RETINA = Size('retina', 640, 974)
+SIZES = (GRID, DETAIL, RETINA)
+
+Format = namedtuple('Format', ['name', 'ext', 'media_type', 'options'])
+
+AVIF = Format('AVIF', '.avif', 'image/avif', {'quality': 60})
+WEBP = Format('WEBP', '.webp', 'image/webp', {'quality': 80, 'method': 4})
+JPEG = Format('JPEG', '.jpg', 'image/jpeg', {'quality': 85, 'optimize': True,
+                                             'progressive': True})
+
+
+def get_formats():
+    ''' Returns the formats this Pillow can write, best compression first. '''
+    Image.init()
+    return [fmt for fmt in (AVIF, WEBP, JPEG) if fmt.name in Image.SAVE]
+
+
+FORMATS = get_formats()
+
+# Part of every image's hash, so changing the sizes or the format options gives
+# the images new names instead of leaving the old thumbnails in place.
+TRANSFORM = repr((SIZES, [(fmt.name, sorted(fmt.options.items()))
+                          for fmt in (AVIF, WEBP, JPEG)])).encode()
+
+logger = logging.getLogger('bamf')
+
+
+def get_image_name(data, folder):
+    key = hashlib.sha1(TRANSFORM)
+    key.update(data)
+    return 'images/' + folder + '/' + key.hexdigest() + JPEG.ext
+
+
+def get_thumbnail_name(name, size, fmt):
+    # The detail size JPEG is the image itself.
+    stem = os.path.splitext(name)[0]
+    if size is DETAIL and fmt is JPEG:
+        return stem + JPEG.ext
+    return stem + '-' + size.name + fmt.ext
+
+
+def get_thumbnail_names(name):
+    ''' Returns the names of every file that can belong to an image. '''
+    names = set([name])
+    for size in SIZES:
+        for fmt in (AVIF, WEBP, JPEG):
+            names.add(get_thumbnail_name(name, size, fmt))
+    return names
+
+
+def delete_thumbnails(name, media_root):
+    for thumb in get_thumbnail_names(name):
+        try:
+            os.remove(os.path.join(media_root, thumb))
+        except FileNotFoundError:
+            pass
+
+
+def fit(img, width, height):
+    '''
+    Crops img from the center to the aspect ratio of width x height, then
+    scales it down to that size. Small images are never enlarged.
+    '''
+    if img.width * height > img.height * width:
+        crop_width, crop_height = int(round(img.height * width / height)), img.height
+    else:
+        crop_width, crop_height = img.width, int(round(img.width * height / width))
+
+    left = (img.width - crop_width) // 2
+    top = (img.height - crop_height) // 2
+    img = img.crop((left, top, left + crop_width, top + crop_height))
+
+    if crop_width > width:
+        img = img.resize((width, height), Image.LANCZOS)
+
+    return img
+
+
+def save_atomic(img, path, fmt):
+    if fmt is JPEG and img.mode == 'RGBA':
+        # JPEG has no transparency, so put the image on a white background.
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[3])
+        img = background
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            img.save(f, fmt.name, **fmt.options)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+def create_thumbnails(data, name, media_root):
+    '''
+    Saves every size and format of the image in data. Files that already
+    exist are skipped, since their names come from the image's contents.
+
+    This is a module level function so that it can be run by a ThumbnailPool.
+    '''
+    todo = [(size, fmt) for size in SIZES for fmt in FORMATS
+            if not os.path.exists(os.path.join(media_root, get_thumbnail_name(name, size, fmt)))]
+    if not todo:
+        return
+
+    os.makedirs(os.path.dirname(os.path.join(media_root, name)), exist_ok=True)
+
+    img = Image.open(io.BytesIO(data))
+    # Only the largest size needs the full image decoded.
+    img.draft('RGB', (RETINA.width, RETINA.height))
+    if img.mode in ('RGBA', 'LA') or 'transparency' in img.info:
+        img = img.convert('RGBA')
+    else:
+        img = img.convert('RGB')
+
+    for size in SIZES:
+        thumb = None
+        for fmt in FORMATS:
+            if (size, fmt) not in todo:
+                continue
+            if thumb is None:
+                thumb = fit(img, size.width, size.height)
+            save_atomic(thumb, os.path.join(media_root, get_thumbnail_name(name, size, fmt)), fmt)
+
+
+def read_image(path):
+    ''' Returns the contents of path if it is an image Pillow can open. '''
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        # Only reads the header, the image is decoded by create_thumbnails.
+        Image.open(io.BytesIO(data))
+    except (OSError, SyntaxError, ValueError) as e:
+        logger.error('%s' % e)
+        return None
+
+    return data
+
+
+class ThumbnailPool(object):
+    '''
+    Creates thumbnails in a pool of worker processes, so the caller doesn't
+    have to wait on Pillow. At most queue_size images are in flight at once.
+    '''
+
+    def __init__(self, media_root, workers=1, queue_size=None):
+        self.media_root = media_root
+        self.workers = workers
+        self.queue_size = queue_size or workers * 4
+        self.executor = None
+        self.pending = set()
+
+    def submit(self, data, name):
+        if self.workers <= 1:
+            create_thumbnails(data, name, self.media_root)
+            return
+
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+
+        if len(self.pending) >= self.queue_size:
+            done, self.pending = wait(self.pending, return_when=FIRST_COMPLETED)
+            self.check(done)
+
+        self.pending.add(self.executor.submit(create_thumbnails, data, name, self.media_root))
+
+    def check(self, futures):
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                logger.error('Unable to create thumbnails: %s' % e)
+
+    def wait(self):
+        ''' Waits for all the submitted images, and shuts down the workers. '''
+        if self.executor is not None:
+            done, self.pending = wait(self.pending)
+            self.check(done)
+            self.executor.shutdown()
+            self.executor = None
@@ -0,0 +1,141 @@
+import logging
+import os
+import threading
+import time
+
+from . import fileindex
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    watchdog_available = True
+except ImportError:
+    FileSystemEventHandler = object
+    watchdog_available = False
+
+
+class ComicEventHandler(FileSystemEventHandler):
+    ''' Passes the paths of any filesystem events on to the watcher. '''
+
+    def __init__(self, watcher):
+        super(ComicEventHandler, self).__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        # A file changing inside a directory also modifies the directory,
+        # but there's no need to rescan the whole directory for that.
+        if event.is_directory and event.event_type == 'modified':
+            return
+
+        self.watcher.add(event.src_path)
+        dest_path = getattr(event, 'dest_path', None)
+        if dest_path:
+            self.watcher.add(dest_path)
+
+
+class ComicWatcher(object):
+    '''
+    Watches the comics directory and calls on_batch with the list of paths
+    that were created, modified, moved or deleted.
+
+    It uses inotify (through watchdog) when it's available, otherwise it falls
+    back to polling the directory against the file index. A path is only
+    passed on once its size and mtime haven't changed for settle seconds, so
+    files that are still being written aren't imported half finished.
+    '''
+
+    def __init__(self, directory, on_batch, settle=5, interval=1,
+                 poll_interval=30, use_polling=False):
+        self.logger = logging.getLogger('bamf')
+        self.directory = directory
+        self.on_batch = on_batch
+        self.settle = settle
+        self.interval = interval
+        self.poll_interval = poll_interval
+        self.use_polling = use_polling or not watchdog_available
+        self.lock = threading.Lock()
+        # path -> (time of the last change, last FileState)
+        self.pending = {}
+        self.states = None
+        self.last_poll = 0
+
+    def add(self, path, now=None):
+        if now is None:
+            now = time.time()
+        with self.lock:
+            self.pending[path] = (now, self.getState(path))
+
+    def getState(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return fileindex.FileState(st.st_size, st.st_mtime_ns, st.st_ino)
+
+    def getReady(self, now=None):
+        '''
+        Returns the pending paths that haven't changed in the last settle
+        seconds, and removes them from the pending list.
+        '''
+        if now is None:
+            now = time.time()
+
+        ready = []
+        with self.lock:
+            for path, (changed, state) in list(self.pending.items()):
+                new_state = self.getState(path)
+                if new_state != state:
+                    self.pending[path] = (now, new_state)
+                elif now - changed >= self.settle:
+                    ready.append(path)
+                    del self.pending[path]
+
+        return sorted(ready)
+
+    def poll(self, now=None):
+        ''' Adds any files that changed since the last poll. '''
+        current = fileindex.get_file_states(self.directory)
+        if self.states is None:
+            # Compare the first poll against the file index, to pick up any
+            # changes made while we weren't watching.
+            self.states = fileindex.load_file_index([self.directory])
+
+        for change, path in fileindex.diff_file_index(self.states, current):
+            self.add(path, now)
+        self.states = current
+
+    def runOnce(self, now=None):
+        if now is None:
+            now = time.time()
+
+        if self.use_polling and now - self.last_poll >= self.poll_interval:
+            self.poll(now)
+            self.last_poll = now
+
+        ready = self.getReady(now)
+        if ready:
+            self.logger.info('Found %d changed paths' % len(ready))
+            self.on_batch(ready)
+
+        return ready
+
+    def run(self):
+        observer = None
+        if not self.use_polling:
+            observer = Observer()
+            observer.schedule(ComicEventHandler(self), self.directory,
+                              recursive=True)
+            observer.start()
+            self.logger.info('Watching %s for changes' % self.directory)
+        else:
+            self.logger.info('Polling %s for changes every %d seconds'
+                             % (self.directory, self.poll_interval))
+
+        try:
+            while True:
+                self.runOnce()
+                time.sleep(self.interval)
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
@@ -1,11 +1,8 @@
-from functools import reduce
-import operator
-
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q
 from django.views.generic import ListView, DetailView
 
 from comics.models import Arc
+from comics.utils import search
 
 
 PAGINATE = 30
@@ -36,9 +33,6 @@ class SearchArcList(ArcList):
         result = super(SearchArcList, self).get_queryset()
         query = self.request.GET.get('q')
         if query:
-            query_list = query.split()
-            result = result.filter(
-                reduce(operator.and_,
-                       (Q(name__icontains=q) for q in query_list)))
+            result = search.search(result, query)
 
         return result
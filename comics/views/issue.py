@@ -1,19 +1,30 @@
+from functools import partial
+import hashlib
+import os
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import ObjectDoesNotExist
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, JsonResponse
 from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_vary_headers
 from django.views.generic import DetailView, ListView
 
 from comics.models import Issue, Roles
+from comics.utils import pagecache, pageresize, thumbnails
 from comics.utils.comicapi.comicarchive import ComicArchive
-from comics.utils.reader import ImageAPIHandler
+from comics.utils.reader import (ImageAPIHandler, get_page, get_pages,
+                                 image_response, read_page)
 
 
 PAGINATE = 30
 
 LIMIT_RESULTS = PAGINATE * 3
 
+COVER_SIZES = dict((size.name, size) for size in thumbnails.SIZES)
+
 
 class IssueList(LoginRequiredMixin, ListView):
     model = Issue
@@ -62,19 +73,132 @@ class IssueDetail(LoginRequiredMixin, DetailView):
 def reader(request, slug):
     issue = get_object_or_404(Issue, slug=slug)
 
-    # Let's get the total number pages from the comic archive
-    # instead of from the db in case the file has been modified.
-    # If I ever implement a file monitor function this can be removed.
-    ca = ComicArchive(issue.file)
-    page_count = ca.getNumberOfPages()
+    # The pages themselves are loaded by the browser as they're needed.
+    page_list = [reverse('issue:page', args=(issue.slug, page.index))
+                 for page in get_pages(issue)]
+
+    return render(request, 'comics/reader.html', {'issue': issue, 'page_list': page_list})
+
+
+def get_page_etag(path, st, page, size):
+    # The ETag changes whenever the archive does, so browsers can
+    # revalidate the page without us having to read the archive.
+    key = '%s:%d:%d:%d' % (path, st.st_mtime_ns, st.st_size, page)
+    if size is not None:
+        key += ':%sx%s' % size
+    return '"%s"' % hashlib.md5(key.encode('utf-8')).hexdigest()
+
+
+def get_page_image(user_id, issue, page, st, size):
+    '''
+    Returns the (data, content_type) of the issue's page, scaled down to size
+    if it isn't None, and starts reading the next pages for the user.
+    '''
+    cache = pagecache.get_cache()
+    cache_key = pagecache.get_page_key(issue.file, st, page)
+
+    def read(size=None):
+        # A PDF's pages are rendered at the size they're shown at, instead of
+        # being rendered and then scaled down. Other pages are read whole.
+        if size is not None and not ComicArchive(issue.file).isPdf():
+            size = None
+
+        if size is None:
+            cached = cache.get(user_id, cache_key)
+            if cached is not None:
+                return cached
+
+        page_obj = get_page(issue, page)
+        if page_obj is None:
+            raise Http404('Page not found.')
+
+        try:
+            image_data = read_page(issue.file, page_obj, size)
+        except IOError:
+            raise Http404('Page not found.')
+
+        content_type = page_obj.media_type
+        if not content_type:
+            content_type = ImageAPIHandler().getMimeType(image_data)
+
+        return image_data, content_type
+
+    if size is not None:
+        image = cache.get(user_id, pagecache.get_page_key(issue.file, st, page, size))
+        if image is None:
+            image = pageresize.get_resized_page(cache_key, size, partial(read, size),
+                                                pageresize.get_cache_dir())
+    else:
+        image = read()
+
+    # Have the next pages ready, at the same size, before the reader gets to them.
+    pagecache.prefetch_pages(user_id, issue, page + 1, st, size)
+
+    return image
 
-    uri_list = []
-    for page in range(page_count):
-        i = ImageAPIHandler()
-        data_uri = i.get_uri(issue.file, page)
-        uri_list.append(data_uri)
 
-    return render(request, 'comics/reader.html', {'issue': issue, 'data_uri': uri_list})
+def get_cover_file(issue, size_name, accept):
+    '''
+    Returns the path and media type of the issue's cover in the named size,
+    in the best format the client accepts.
+    '''
+    if not issue.cover:
+        raise Http404('Cover not found.')
+
+    size = COVER_SIZES.get(size_name, thumbnails.DETAIL)
+    for fmt in thumbnails.FORMATS:
+        if fmt is not thumbnails.JPEG and fmt.media_type not in accept:
+            continue
+        path = os.path.join(settings.MEDIA_ROOT,
+                            thumbnails.get_thumbnail_name(issue.cover.name, size, fmt))
+        if os.path.exists(path):
+            return path, fmt.media_type
+
+    raise Http404('Cover not found.')
+
+
+def get_cover_etag(path):
+    # Covers are named after their contents.
+    return '"%s"' % os.path.basename(path)
+
+
+@login_required
+def page(request, slug, page):
+    issue = get_object_or_404(Issue.objects.only('file'), slug=slug)
+
+    try:
+        st = os.stat(issue.file)
+    except OSError:
+        raise Http404('Comic archive not found.')
+
+    # The page can be scaled down to the size it's shown at.
+    size = pageresize.get_target_size(request.GET)
+
+    etag = get_page_etag(issue.file, st, page, size)
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        return response
+
+    image_data, content_type = get_page_image(request.user.pk, issue, page, st, size)
+
+    return image_response(request, image_data, content_type, etag)
+
+
+@login_required
+def cover(request, slug):
+    issue = get_object_or_404(Issue.objects.only('cover'), slug=slug)
+    path, content_type = get_cover_file(issue, request.GET.get('size', ''),
+                                        request.META.get('HTTP_ACCEPT', ''))
+
+    etag = get_cover_etag(path)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, max-age=86400'
+    patch_vary_headers(response, ('Accept',))
+
+    return response
 
 
 @login_required
@@ -90,6 +214,11 @@ def update_issue_status(request, slug):
         issue.status = 1
         issue.save()
 
+        # The leaf is the page being read, counting from 1. The reader sends
+        # the size it shows the pages at, like it does for the pages.
+        pagecache.prefetch_pages(request.user.pk, issue, issue.leaf,
+                                 size=pageresize.get_target_size(request.GET))
+
     data = {'saved': 1}
 
     return JsonResponse(data)
@@ -1,11 +1,8 @@
-from functools import reduce
-import operator
-
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q
 from django.views.generic import ListView, DetailView
 
 from comics.models import Publisher
+from comics.utils import search
 
 
 PAGINATE = 30
@@ -14,6 +11,7 @@ PAGINATE = 30
 class PublisherList(LoginRequiredMixin, ListView):
     model = Publisher
     paginate_by = PAGINATE
+    queryset = Publisher.objects.with_counts()
 
 
 class PublisherDetail(LoginRequiredMixin, DetailView):
@@ -26,9 +24,6 @@ class SearchPublisherList(PublisherList):
         result = super(SearchPublisherList, self).get_queryset()
         query = self.request.GET.get('q')
         if query:
-            query_list = query.split()
-            result = result.filter(
-                reduce(operator.and_,
-                       (Q(name__icontains=q) for q in query_list)))
+            result = search.search(result, query)
 
         return result
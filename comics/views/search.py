@@ -0,0 +1,68 @@
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.urls import reverse
+
+from comics.models import (Arc, Character, Creator, Issue,
+                           Publisher, Series, Team)
+from comics.utils import autocomplete, search
+
+
+LIMIT = 10
+MAX_LIMIT = 100
+
+SEARCH_MODELS = (
+    ('series', Series.objects.all()),
+    ('issue', Issue.objects.select_related('series')),
+    ('character', Character.objects.all()),
+    ('creator', Creator.objects.all()),
+    ('team', Team.objects.all()),
+    ('arc', Arc.objects.all()),
+    ('publisher', Publisher.objects.all()),
+)
+
+
+@login_required
+def search_all(request):
+    '''
+    Searches every type of object for the q parameter, returning the best
+    limit matches as json, e.g. for a search box's suggestions.
+    '''
+    query = request.GET.get('q', '')
+    try:
+        limit = max(1, min(int(request.GET.get('limit', LIMIT)), MAX_LIMIT))
+    except ValueError:
+        limit = LIMIT
+
+    results = []
+    for kind, queryset in SEARCH_MODELS:
+        for obj in search.search(queryset, query)[:limit]:
+            results.append({'type': kind,
+                            'name': str(obj),
+                            'url': obj.get_absolute_url(),
+                            'rank': obj.search_rank})
+
+    # Sorting is stable, so equal ranks keep the order of SEARCH_MODELS.
+    results.sort(key=lambda result: -result['rank'])
+
+    return JsonResponse({'results': results[:limit]})
+
+
+@login_required
+def suggest(request):
+    '''
+    Returns the objects with a word in their name that starts with the q
+    parameter as json. They come from memory, so this is fast enough to call
+    on every keystroke.
+    '''
+    query = request.GET.get('q', '')
+    try:
+        limit = max(1, min(int(request.GET.get('limit', LIMIT)), MAX_LIMIT))
+    except ValueError:
+        limit = LIMIT
+
+    results = [{'type': kind,
+                'name': name,
+                'url': reverse(kind + ':detail', args=[slug])}
+               for kind, name, slug in autocomplete.get_index().complete(query, limit)]
+
+    return JsonResponse({'results': results})
@@ -1,11 +1,8 @@
-from functools import reduce
-import operator
-
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q
 from django.views.generic import ListView, DetailView
 
 from comics.models import Series
+from comics.utils import search
 
 
 PAGINATE = 30
@@ -16,7 +13,7 @@ class SeriesList(LoginRequiredMixin, ListView):
     paginate_by = PAGINATE
     queryset = (
         Series.objects
-        .prefetch_related('issue_set')
+        .with_counts()
     )
 
 
@@ -35,9 +32,6 @@ class SearchSeriesList(SeriesList):
         result = super(SearchSeriesList, self).get_queryset()
         query = self.request.GET.get('q')
         if query:
-            query_list = query.split()
-            result = result.filter(
-                reduce(operator.and_,
-                       (Q(name__icontains=q) for q in query_list)))
+            result = search.search(result, query)
 
         return result
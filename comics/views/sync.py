@@ -0,0 +1,148 @@
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ParseError
+
+from comics.models import (Arc, Character, Creator, Issue,
+                           Publisher, Roles, Series, Team, Tombstone)
+
+
+# The number of objects loaded at a time.
+CHUNK_SIZE = 500
+
+# The models in the order they are sent, so that an object's relations have
+# always been sent before it. Each has its fields, with related objects as
+# ids, the field with its image and its many-to-many fields.
+SYNC_MODELS = (
+    ('publisher', Publisher,
+     ('id', 'cvid', 'name', 'slug', 'desc', 'modified'), 'logo', ()),
+    ('series', Series,
+     ('id', 'cvid', 'name', 'slug', 'sort_title', 'publisher_id', 'year', 'desc',
+      'rating', 'modified'), None, ()),
+    ('arc', Arc,
+     ('id', 'cvid', 'name', 'slug', 'desc', 'modified'), 'image', ()),
+    ('team', Team,
+     ('id', 'cvid', 'name', 'slug', 'desc', 'modified'), 'image', ()),
+    ('character', Character,
+     ('id', 'cvid', 'name', 'slug', 'desc', 'modified'), 'image', ('teams',)),
+    ('creator', Creator,
+     ('id', 'cvid', 'name', 'slug', 'desc', 'modified'), 'image', ()),
+    ('issue', Issue,
+     ('id', 'cvid', 'series_id', 'name', 'slug', 'number', 'date', 'desc', 'status',
+      'leaf', 'page_count', 'import_date', 'modified'), 'cover',
+     ('arcs', 'characters', 'teams')),
+)
+
+
+def encode(row):
+    return json.dumps(row, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n'
+
+
+def get_image_url(name):
+    return settings.MEDIA_URL + name if name else None
+
+
+def get_related_ids(model, field, ids):
+    ''' Returns a dict of the ids related to each of ids through field. '''
+    through = getattr(model, field).through
+    column = model._meta.model_name + '_id'
+    related_column = getattr(model, field).field.related_model._meta.model_name + '_id'
+    related = dict((pk, []) for pk in ids)
+    rows = through.objects.filter(**{column + '__in': ids}).values_list(column, related_column)
+    for pk, related_pk in rows:
+        related[pk].append(related_pk)
+    return related
+
+
+def get_credits(ids):
+    ''' Returns a dict of the creators of each issue in ids, with their roles. '''
+    credits = dict((pk, {}) for pk in ids)
+    rows = Roles.objects.filter(issue_id__in=ids).values_list(
+        'issue_id', 'creator_id', 'role__name')
+    for issue_id, creator_id, role in rows:
+        roles = credits[issue_id].setdefault(creator_id, [])
+        if role is not None:
+            roles.append(role)
+    return dict((pk, [{'creator': creator_id, 'roles': sorted(roles)}
+                      for creator_id, roles in sorted(issue_credits.items())])
+                for pk, issue_credits in credits.items())
+
+
+def get_changes(kind, model, fields, image_field, m2m_fields, since):
+    queryset = model.objects.order_by('id')
+    if since is not None:
+        queryset = queryset.filter(modified__gte=since)
+    values = list(fields)
+    if image_field:
+        values.append(image_field)
+
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).values(*values)[:CHUNK_SIZE])
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+
+        ids = [row['id'] for row in rows]
+        related = dict((field, get_related_ids(model, field, ids)) for field in m2m_fields)
+        credits = get_credits(ids) if model is Issue else None
+
+        for row in rows:
+            obj = {'type': kind}
+            for field in fields:
+                # Related objects are sent as their ids.
+                obj[field[:-3] if field.endswith('_id') else field] = row[field]
+            if image_field:
+                obj[image_field] = get_image_url(row[image_field])
+            for field in m2m_fields:
+                obj[field] = sorted(related[field][row['id']])
+            if credits is not None:
+                obj['credits'] = credits[row['id']]
+            yield encode(obj)
+
+
+def get_sync_lines(since, timestamp):
+    # The next sync should start from when this one did.
+    yield encode({'type': 'sync', 'timestamp': timestamp})
+
+    # Deletions come first, in case an id has been used again since.
+    if since is not None:
+        tombstones = Tombstone.objects.filter(deleted__gte=since).order_by('deleted', 'id')
+        for model, object_id in tombstones.values_list('model', 'object_id').iterator():
+            yield encode({'type': 'deleted', 'model': model, 'id': object_id})
+
+    for kind, model, fields, image_field, m2m_fields in SYNC_MODELS:
+        yield from get_changes(kind, model, fields, image_field, m2m_fields, since)
+
+
+@api_view(['GET'])
+@permission_classes((permissions.IsAuthenticated,))
+def sync(request):
+    '''
+    Streams the objects changed since the since parameter (the timestamp
+    returned by the previous sync) as newline-delimited json, one object per
+    line, with related objects as ids. The first line is the timestamp to
+    send next time, and objects that were deleted are sent as
+    {"type": "deleted", "model": ..., "id": ...}. Without since, every object
+    is sent.
+    '''
+    timestamp = timezone.now()
+    since = request.query_params.get('since')
+    if since is not None:
+        try:
+            since = parse_datetime(since)
+        except ValueError:
+            since = None
+        if since is None:
+            raise ParseError('since must be an ISO 8601 timestamp.')
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since, timezone.utc)
+
+    return StreamingHttpResponse(get_sync_lines(since, timestamp),
+                                 content_type='application/x-ndjson')
@@ -79,7 +79,7 @@ class PublisherViewSet(viewsets.ReadOnlyModelViewSet):
     read:
     Returns the information of an individual publisher.
     """
-    queryset = Publisher.objects.all()
+    queryset = Publisher.objects.with_counts()
     serializer_class = PublisherSerializer
     lookup_field = 'slug'
     permission_classes = (permissions.IsAuthenticated,)
@@ -96,6 +96,7 @@ class SeriesViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = (
         Series.objects
         .select_related('publisher')
+        .with_counts()
     )
     serializer_class = SeriesSerializer
     lookup_field = 'slug'
@@ -50,7 +50,8 @@ $(window).load(function(){
 			var complete = $('.flex-active-slide').next('li').length ? '0' : '1'
 			$.ajax({
 		        type: "GET",
-		        url: '/issue/' + issueId + '/update-status/?leaf=' + leaf + '&complete=' + complete
+		        url: '/issue/' + issueId + '/update-status/?leaf=' + leaf + '&complete=' + complete +
+		             '&w=' + getReaderWidth() + '&dpr=' + (window.devicePixelRatio || 1)
 		    });
 			lazyLoadImages(lazyImages, parseInt(pageNumber, 10));
 		}
@@ -95,14 +96,28 @@ $(window).load(function(){
 	function lazyLoadImages(lazyImages, start) {
 		for (i = start; i < start + 2; i++) {
 			if (lazyImages[i]) {
-				lazyImages[i].src = lazyImages[i].getAttribute('data-source');
+				lazyImages[i].src = getPageSource(lazyImages[i]);
 			}
 		}
 		for (i = start - 1; i > start - 4; i--) {
 			if (lazyImages[i]) {
-				lazyImages[i].src = lazyImages[i].getAttribute('data-source');
+				lazyImages[i].src = getPageSource(lazyImages[i]);
 			}
 		}
 	}
 
+	/*
+	 * Pages are asked for at the width of the reader, so that the server
+	 * can scale them down to the size they're shown at.
+	 */
+	function getPageSource(img) {
+		return img.getAttribute('data-source')
+			.replace('{width}', getReaderWidth())
+			.replace('{dpr}', window.devicePixelRatio || 1);
+	}
+
+	function getReaderWidth() {
+		return Math.ceil($('.reader-slider').width() || window.innerWidth);
+	}
+
 });